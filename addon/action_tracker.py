@@ -0,0 +1,101 @@
+"""
+Running record of the actions the learner has taken on the current problem.
+
+Hint and Submit used to walk all of `window_manager.operators`, check each
+label against a filter list and build the action string with repeated
+`+=`, every time they ran. An ActionTracker is fed new operators as they
+happen (from a `depsgraph_update_post` handler, plus a catch-up call before
+each read). It keeps a running count and the most recent actions with
+timestamps in a fixed-size ring buffer, and builds the action summary with
+one `join` that is cached until the next action. Reads are O(1) and each
+update only looks at the operators added since the last one.
+
+Nothing here imports `bpy`: `sync` takes anything shaped like the
+`window_manager.operators` collection.
+"""
+
+import os
+import threading
+import time
+from collections import Counter, deque
+
+# Recent actions kept with their timestamps; older ones only count
+ACTION_HISTORY_SIZE = int(os.environ.get("BLEET_ACTION_HISTORY_SIZE", "256"))
+# Operators that don't count as modelling actions
+IGNORED_ACTIONS = frozenset(("Select", "Add Cube", "Edit Mode", "Submit"))
+
+
+class ActionTracker:
+    def __init__(self, size: int = ACTION_HISTORY_SIZE, ignored=IGNORED_ACTIONS):
+        self.ignored = frozenset(ignored)
+        # (timestamp, label) of the most recent actions, oldest first
+        self._recent = deque(maxlen=size)
+        self._counts = Counter()
+        self._total = 0
+        self._summary = None
+        # Pointer of the newest operator already seen, to find the new ones
+        self._last_operator = None
+        self._lock = threading.Lock()
+
+    def reset(self, operators=()):
+        """Forget all actions; operators already in `operators` won't be counted."""
+        with self._lock:
+            self._recent.clear()
+            self._counts.clear()
+            self._total = 0
+            self._summary = None
+            self._last_operator = operators[-1].as_pointer() if len(operators) else None
+
+    def record(self, label: str, timestamp: float = None):
+        with self._lock:
+            self._record(label, timestamp)
+
+    def _record(self, label: str, timestamp: float = None):
+        if label in self.ignored:
+            return
+        self._recent.append((time.time() if timestamp is None else timestamp, label))
+        self._counts[label] += 1
+        self._total += 1
+        self._summary = None
+
+    def sync(self, operators):
+        """
+        Record the operators added to `operators` (Blender's operator
+        history, newest last) since the previous call, walking back from
+        the end only as far as the last one already seen.
+        """
+        with self._lock:
+            new_labels = []
+            for index in range(len(operators) - 1, -1, -1):
+                operator = operators[index]
+                if operator.as_pointer() == self._last_operator:
+                    break
+                new_labels.append(operator.bl_label)
+            if len(operators):
+                self._last_operator = operators[-1].as_pointer()
+
+            now = time.time()
+            for label in reversed(new_labels):
+                self._record(label, now)
+
+    @property
+    def count(self) -> int:
+        """Number of actions taken, including ones no longer in the ring buffer."""
+        return self._total
+
+    def counts(self) -> dict:
+        """How many times each action was taken."""
+        with self._lock:
+            return dict(self._counts)
+
+    def actions(self) -> list:
+        """(timestamp, label) of the recent actions, oldest first."""
+        with self._lock:
+            return list(self._recent)
+
+    def summary(self) -> str:
+        """The recent actions, one per line, as shown to the LLM."""
+        with self._lock:
+            if self._summary is None:
+                self._summary = "".join(label + "\n" for _, label in self._recent)
+            return self._summary
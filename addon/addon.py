@@ -1,30 +1,68 @@
 import bpy
-import bpy_extras
+import gpu
 import os
 import json
-import bmesh
 import blf
 import textwrap
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-import subprocess
-import uuid
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
 import json
 import os
 import uvicorn
 import threading
 import langchain
 from langchain.messages import HumanMessage, SystemMessage, AIMessage
-from langchain_ollama import ChatOllama
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.output_parsers import StrOutputParser
 import PIL
 from PIL import Image
 from io import BytesIO
 import base64
+import tempfile
+import time
 from datetime import datetime, timezone
-import requests
 from dotenv import load_dotenv
+import sys
+
+# Make the helper modules next to this script importable when it is run
+# from Blender's text editor
+_ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+if _ADDON_DIR not in sys.path:
+    sys.path.insert(0, _ADDON_DIR)
+
+import numpy as np
+
+from matching import face_match_scores, match_vertices, point_tree
+from mesh_data import (
+    edge_vertex_pairs,
+    fill_mesh,
+    polygon_face_arrays,
+    problem_mesh_arrays,
+    set_polygon_materials,
+    vertex_coordinates,
+)
+from worker_pool import BlenderWorkerPool, WorkerError
+from conversion_cache import ConversionCache, binary_cache_key
+import mesh_format
+from mesh_format import MeshFormatError
+from jobs import JobQueue, QueueFullError, jobs_router
+from json_ingest import IngestError, UploadedProblem, ingest_request, load_problem_file
+from llm_router import create_router
+from message_history import MessageHistory, request_stats
+from hint_cache import HintCache, geometry_signature, hint_key
+from geometry_diff import format_geometry_diff, geometry_diff
+from edge_overlay import EdgeLengthOverlay
+from screenshot import get_screenshot_base64
+from submission_reporter import SUBMIT_URL, SubmissionReporter
+from action_tracker import ActionTracker
+from shape_metrics import compare_shapes, format_shape_metrics, shape_accuracy
+from target_analysis import (
+    analyse_mesh,
+    grid_for,
+    load_analysis,
+    matches_mesh,
+    sidecar_path,
+    write_sidecar,
+)
 
 
 IMPORTED_OBJECT_NAME = "TARGET"
@@ -32,8 +70,22 @@ TOLERANCE = 0.1
 
 total_time = 0
 
-hints_remaining = 3
+HINTS_PER_PROBLEM = 3
+hints_remaining = HINTS_PER_PROBLEM
 submitted = False
+# Precomputed facts about the current TARGET mesh (see target_analysis.py)
+loaded_target_analysis = None
+# (analysis, point_tree over its vertices) for the shape metrics, built once
+# per analysis
+loaded_target_tree = None
+# Label every TARGET edge with its length in the viewport
+SHOW_EDGE_LENGTHS = os.environ.get("BLEET_SHOW_EDGE_LENGTHS", "0") == "1"
+edge_overlay = EdgeLengthOverlay()
+edge_overlay_handler = None
+# Delivers Submit results to the progress API, spooling them while it is down
+submission_reporter = SubmissionReporter(
+    SUBMIT_URL, os.path.join(_ADDON_DIR, "submission_spool")
+)
 bpy.types.Scene.submit_button_text = bpy.props.StringProperty(default="Submit")
 bpy.types.Scene.llm_response = bpy.props.StringProperty(default="")
 bpy.types.Scene.show_llm_in_panel = bpy.props.BoolProperty(default=False)
@@ -49,22 +101,30 @@ bpy.types.Scene.replace_with_llm = bpy.props.BoolProperty(default=False)
 # Globals used to communicate between the worker thread and the main thread
 llm_thread_result = None
 llm_thread_done = False
+# Chunks streamed so far that the main thread hasn't shown yet
+llm_thread_chunks = []
 llm_thread_lock = threading.Lock()
 
+# Show LLM answers token by token as they are generated instead of all at once
+STREAM_LLM_RESPONSES = os.environ.get("BLEET_STREAM_LLM", "1") != "0"
+
+
+# Actions taken on the current problem, updated as operators run
+action_tracker = ActionTracker()
 
-def filtered_operators_len_and_string():
-    operators_to_filter = ["Select", "Add Cube", "Edit Mode", "Submit"]
-    filtered_operators = []
-    for operator in bpy.context.window_manager.operators:
-        if not operator.bl_label in operators_to_filter:
-            filtered_operators.append(operator.bl_label)
-    number_of_actions = len(filtered_operators)
 
-    operators_string = ""
-    for operator in filtered_operators:
-        operators_string += operator + "\n"
+def track_actions(scene=None, depsgraph=None):
+    """depsgraph_update_post handler: record operators run since the last call."""
+    try:
+        action_tracker.sync(bpy.context.window_manager.operators)
+    except Exception as e:
+        print("Action tracking failed:", e)
 
-    return number_of_actions, operators_string
+
+def filtered_operators_len_and_string():
+    # Catch anything that ran without a depsgraph update
+    track_actions()
+    return action_tracker.count, action_tracker.summary()
 
 
 def read_info_json():
@@ -85,57 +145,6 @@ def get_current_timestamp():
 start_time = get_current_timestamp()
 
 
-def convert_to_base64(pil_image):
-    """
-    Convert PIL images to Base64 encoded strings
-
-    :param pil_image: PIL image
-    :return: Re-sized Base64 string
-    """
-
-    buffered = BytesIO()
-    pil_image.save(buffered, format="JPEG")  # You can change the format if needed
-    img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
-    return img_str
-
-
-def get_screenshot_base64():
-    area = None
-    for current_area in bpy.context.window.screen.areas:
-        if current_area.type == "VIEW_3D":
-            area = current_area
-            break
-
-    if area == None:
-        print("No area??")
-        return ""
-
-    region = None
-    for current_region in area.regions:
-        if current_region.type == "WINDOW":
-            region = current_region
-            break
-
-    if region == None:
-        print("No region??")
-        return ""
-
-    with bpy.context.temp_override(
-        window=bpy.context.window,
-        screen=bpy.context.window.screen,
-        area=area,
-        region=region,
-        space=area.spaces[0],
-    ):
-        # Save screenshot to the addon directory (next to this file)
-        addon_dir = os.path.dirname(__file__) + "\\images"
-        out_path = os.path.join(addon_dir + "\\images", "woah.png")
-        bpy.ops.screen.screenshot_area(filepath=out_path)
-
-        base_64 = convert_to_base64(Image.open(out_path))
-        return base_64
-
-
 SYSTEM_PROMPT = """
 You are an assistant that helps a user learn how to 3D model in Blender.
 
@@ -146,9 +155,17 @@ When giving feedback after a submission do NOT describe or refer to the screensh
 Keep feedback concise. DO NOT GIVE ANY MARKDOWN. Answer in at most 2 sentences. Do not say "the user"; speak directly to them.
 """
 
-message_history: list[SystemMessage | HumanMessage | AIMessage] = [
-    SystemMessage(SYSTEM_PROMPT)
-]
+# Only the last few turns are re-sent, with older screenshots left out and
+# older answers folded into a summary
+message_history = MessageHistory(SYSTEM_PROMPT)
+
+# Shared by every Hint and Submit, so the HTTP connections and the loaded
+# models are reused. Several backends can be listed (see llm_router); each
+# request goes to the fastest healthy one.
+hint_llm = create_router(os.environ.get("BLEET_LLM_BACKENDS", "ollama:llava"))
+
+# Hints already given for the same problem, mesh state and actions
+hint_cache = HintCache(os.path.join(_ADDON_DIR, "hint_cache.sqlite3"))
 
 
 def prompt_func(data):
@@ -170,7 +187,14 @@ def prompt_func(data):
     return [HumanMessage(content=content_parts)]
 
 
-def send_llm_message(prompt: str, base64_image: str):
+def send_llm_message(prompt: str, base64_image: str, on_chunk=None):
+    """
+    Send the prompt and screenshot to the LLM along with the conversation so
+    far and return its answer.
+
+    :param on_chunk: optional callback; when given the answer is streamed and
+        `on_chunk` is called with each piece of text as it arrives
+    """
     image_part = {
         "type": "image_url",
         "image_url": f"data:image/jpeg;base64,{base64_image}",
@@ -178,18 +202,24 @@ def send_llm_message(prompt: str, base64_image: str):
     text_part = {"type": "text", "text": prompt}
 
     new_msg = HumanMessage(content=[image_part, text_part])
-    message_history.append(new_msg)
+    messages = message_history.messages(new_msg)
 
-    llm = ChatOllama(
-        model="llava",
-        temperature=0,
+    stats = request_stats(messages)
+    print(
+        f"LLM request: {stats['messages']} messages, {stats['bytes']} bytes "
+        f"({stats['image_bytes']} image), ~{stats['text_tokens']} text tokens"
     )
 
-    chain = llm | StrOutputParser()
-
-    output = chain.invoke(message_history)
+    if on_chunk is None:
+        output = hint_llm.invoke(messages)
+    else:
+        chunks = []
+        for chunk in hint_llm.stream(messages):
+            chunks.append(chunk)
+            on_chunk(chunk)
+        output = "".join(chunks)
 
-    message_history.append(AIMessage(content=output))
+    message_history.add_turn(new_msg, str(output))
     return str(output)
 
 
@@ -201,15 +231,29 @@ class LLMResponseThread:
     prompt = ""
     screenshot_b64 = ""
 
-    def __init__(self, prompt: str, screenshot_b64: str) -> None:
+    def __init__(self, prompt: str, screenshot_b64: str, cache_key: str = None) -> None:
         self.prompt = prompt
         self.screenshot_b64 = screenshot_b64
+        # When set, a successful answer is stored in hint_cache under this key
+        self.cache_key = cache_key
+
+    # Called from the worker for every streamed chunk
+    def _append_chunk(self, chunk: str):
+        with llm_thread_lock:
+            llm_thread_chunks.append(chunk)
 
     # Worker will only set the module-level result flag under lock
     def _worker(self):
         global llm_thread_result, llm_thread_done
         try:
-            res = send_llm_message(self.prompt, self.screenshot_b64)
+            started = time.perf_counter()
+            res = send_llm_message(
+                self.prompt,
+                self.screenshot_b64,
+                on_chunk=self._append_chunk if STREAM_LLM_RESPONSES else None,
+            )
+            if self.cache_key and res:
+                hint_cache.put(self.cache_key, res, time.perf_counter() - started)
         except Exception as e:
             print("LLM worker exception:", e)
             res = ""
@@ -217,10 +261,12 @@ class LLMResponseThread:
             llm_thread_result = res
             llm_thread_done = True
 
-    # Keep checking if the response is ready
+    # Keep checking if the response is ready, showing partial text meanwhile
     def _poll_timer(self):
         global llm_thread_result, llm_thread_done
         with llm_thread_lock:
+            new_text = "".join(llm_thread_chunks)
+            llm_thread_chunks.clear()
             if llm_thread_done:
                 res = llm_thread_result
                 llm_thread_result = None
@@ -235,8 +281,17 @@ class LLMResponseThread:
                 except Exception as e:
                     print("Error updating scene in timer poll:", e)
                 return None
+
+        if new_text:
+            try:
+                bpy.context.scene.llm_response += new_text
+                for area in bpy.context.screen.areas:
+                    if area.type == "VIEW_3D":
+                        area.tag_redraw()
+            except Exception as e:
+                print("Error showing partial LLM response:", e)
         # Not ready yet, check again shortly
-        return 0.2
+        return 0.1 if STREAM_LLM_RESPONSES else 0.2
 
 
 def reset_viewport():
@@ -335,22 +390,21 @@ class SubmitButton(bpy.types.Operator):
         # Switch display to solid so face materials become visible after submitting
         imported_object.display_type = "SOLID"
 
-        imported_verts = [v.co.copy() for v in imported_object.data.vertices]
-        user_verts = [
-            v.co.copy()
-            for u in user_objects
-            if u.type == "MESH"
-            for v in u.data.vertices
-        ]
+        analysis = current_target_analysis(imported_object)
+        imported_verts = analysis["vertices"]
+        user_verts = user_vertex_coordinates(user_objects)
 
-        if not user_verts:
+        if not len(user_verts):
             return {"CANCELLED"}
 
         # Mark each imported vertex as matched if any user vertex is within tolerance
-        matched = [
-            any((uv - iv).length <= TOLERANCE for uv in user_verts)
-            for iv in imported_verts
-        ]
+        matched = match_vertices(imported_verts, user_verts, TOLERANCE)
+
+        # How close the shapes are in both directions, which scales the score
+        shape_metrics = compare_shapes(
+            imported_verts, user_verts, TOLERANCE, target_tree=current_target_tree(analysis)
+        )
+        print(format_shape_metrics(shape_metrics))
 
         # Create/get simple green/red materials
         green = bpy.data.materials.get("Match_Green") or bpy.data.materials.new(
@@ -434,18 +488,19 @@ class SubmitButton(bpy.types.Operator):
         user_object_mats.append(translucent)
 
         mesh = user_objects[0].data
-        for poly in mesh.polygons:
-            poly.material_index = 0
-
-        mesh = imported_object.data
-        all_faces_ok = True
-        for poly in mesh.polygons:
-            # Face is green only if all its vertices are matched; otherwise red
-            face_ok = all(matched[i] for i in poly.vertices)
-            poly.material_index = 0 if face_ok else 1
-            if not face_ok:
-                all_faces_ok = False
-        mesh.update()
+        set_polygon_materials(mesh, np.zeros(len(mesh.polygons), dtype=np.int32))
+
+        # Face is green only if all its vertices are matched; otherwise red
+        faces_ok, face_ratios = face_match_scores(
+            matched, analysis["face_offsets"], analysis["face_indices"]
+        )
+        set_polygon_materials(imported_object.data, np.where(faces_ok, 0, 1))
+        all_faces_ok = bool(faces_ok.all())
+        print(
+            f"Faces matched: {int(faces_ok.sum())} of {len(faces_ok)}, "
+            f"mean vertex match per face {face_ratios.mean() if len(face_ratios) else 1.0:.0%}, "
+            f"{int((face_ratios == 0).sum())} faces with no matched vertex"
+        )
 
         # Switch 3D View to Material Preview so materials are visible, then redraw
         for area in bpy.context.screen.areas:
@@ -473,6 +528,7 @@ class SubmitButton(bpy.types.Operator):
             100
             * ((expectedNumOfActions / number_of_actions) * 0.5)
             * ((expectedCompletionTime / total_time) * 0.5)
+            * shape_accuracy(shape_metrics)
         )
 
         submission_info = {
@@ -485,7 +541,9 @@ class SubmitButton(bpy.types.Operator):
 
         print(submission_info)
 
-        requests.post("http://localhost:3000/api/submit", json=submission_info)
+        # Sent from a background thread, so a slow or offline web app can't
+        # hold up Blender
+        submission_reporter.submit(submission_info)
 
         if all_faces_ok:
             # Prepare an LLM prompt summarizing the submission for feedback
@@ -579,36 +637,65 @@ class HintButton(bpy.types.Operator):
 
         # Get the information on the user object
         user_object = None
+        user_objects = []
         target_object = None
         for obj in bpy.context.visible_objects:
             if obj.name == IMPORTED_OBJECT_NAME:
                 target_object = obj
             else:
                 user_object = obj
+                user_objects.append(obj)
 
         if user_object is None or target_object is None:
             print("NO user object?")
             return {"FINISHED"}
 
-        user_object_data = {
-            "vertex_count": len(user_object.data.vertices),
-            "vertex_coordinates": [
-                f"({v.co.x}, {v.co.y}, {v.co.z})," for v in user_object.data.vertices
-            ],
-            "location": f"({user_object.location.x}, {user_object.location.y}, {user_object.location.z})",
-        }
-
-        target_object_data = {
-            "vertex_count": len(target_object.data.vertices),
-            "vertex_coordinates": [
-                f"({v.co.x}, {v.co.y}, {v.co.z})," for v in target_object.data.vertices
-            ],
-            "location": f"({target_object.location.x}, {target_object.location.y}, {target_object.location.z})",
-        }
+        # Summarise how the two meshes differ instead of listing every vertex.
+        # Everything about the target comes from its precomputed analysis.
+        analysis = current_target_analysis(target_object)
+        diff = geometry_diff(
+            analysis["vertices"],
+            vertex_coordinates(user_object.data),
+            analysis["edges"],
+            edge_vertex_pairs(user_object.data),
+            TOLERANCE,
+            target_grid=grid_for(analysis, TOLERANCE),
+            target_box=analysis["box"],
+        )
+        diff["target"]["summary"] = analysis["summary"]
+        diff["user"]["faces"] = len(user_object.data.polygons)
+        for key, obj in (("target", target_object), ("user", user_object)):
+            diff[key]["location"] = tuple(obj.location)
+        # Same vertex set and target tree as Submit, so the prompt agrees
+        # with the score
+        shape_metrics = compare_shapes(
+            analysis["vertices"],
+            user_vertex_coordinates(user_objects),
+            TOLERANCE,
+            target_tree=current_target_tree(analysis),
+        )
+        geometry_summary = format_geometry_diff(diff) + "\n" + format_shape_metrics(shape_metrics)
 
         # Get the actions the user has taken up to this point
         actions_length, operators_string = filtered_operators_len_and_string()
-        _, expectedNumOfActions, __ = read_info_json()
+        _, expectedNumOfActions, questionName = read_info_json()
+
+        # Someone may already have asked for a hint in this exact state
+        cache_key = hint_key(
+            questionName,
+            geometry_signature(
+                vertex_coordinates(user_object.data, user_object.matrix_world),
+                TOLERANCE,
+            ),
+            operators_string.splitlines(),
+            hint_number=HINTS_PER_PROBLEM - hints_remaining,
+        )
+        cached_hint = hint_cache.get(cache_key)
+        stats = hint_cache.stats()
+        print(
+            f"Hint cache: {stats['hits']}/{stats['hits'] + stats['misses']} hits, "
+            f"{stats['llm_seconds_saved']:.1f}s of LLM time saved"
+        )
 
         prompt = f"""
         The user is current stuck on create a 3D model.
@@ -619,13 +706,10 @@ class HintButton(bpy.types.Operator):
 
         These are the actions they have taken: {operators_string}
 
-        Here is some information about the object they are trying to model. Everything is given in (x, y, z) coordinates according to Blender's standards:
-
-        {json.dumps(target_object_data)}
+        Here is how the object they have modeled so far ("Current") compares to the object they are trying to model ("Target").
+        Everything is given in (x, y, z) coordinates according to Blender's standards, relative to each object's location:
 
-        Here is what the object the user has modeled so far is like:
-
-        {json.dumps(user_object_data)}
+        {geometry_summary}
 
         Please provide them with information about how they can continue on. Do not give them the answer.
 
@@ -654,6 +738,18 @@ class HintButton(bpy.types.Operator):
 
         print(f"Hint prompt: {prompt}")
 
+        if cached_hint is not None:
+            # Keep the conversation aware of the hint so it isn't repeated
+            message_history.add_turn(HumanMessage(content=prompt), cached_hint)
+            context.scene.llm_response = cached_hint
+            context.scene.llm_loading = False
+            context.scene.llm_response_title = "Hint:"
+            for area in bpy.context.screen.areas:
+                if area.type == "VIEW_3D":
+                    area.tag_redraw()
+            hints_remaining -= 1
+            return {"FINISHED"}
+
         # Capture screenshot on the main thread (Blender API must not be called from worker)
         try:
             screenshot_b64 = get_screenshot_base64() or ""
@@ -672,7 +768,7 @@ class HintButton(bpy.types.Operator):
             if area.type == "VIEW_3D":
                 area.tag_redraw()
 
-        llmResponseThread = LLMResponseThread(prompt, screenshot_b64)
+        llmResponseThread = LLMResponseThread(prompt, screenshot_b64, cache_key)
         threading.Thread(target=llmResponseThread._worker, daemon=True).start()
         # Register the polling timer once from the main thread
         try:
@@ -754,7 +850,8 @@ class ResetButton(bpy.types.Operator):
             # Reset globals and scene state
             submitted = False
             start_time = get_current_timestamp()
-            hints_remaining = 3
+            hints_remaining = HINTS_PER_PROBLEM
+            action_tracker.reset(bpy.context.window_manager.operators)
 
             for sc in bpy.data.scenes:
                 try:
@@ -809,10 +906,10 @@ class Panel(bpy.types.Panel):
         if layout is None:
             return
         # If the panel should be entirely replaced with the LLM output,
-        # show only a "Loading..." label while the LLM is running, then
-        # switch to the LLM response text once available.
+        # show only a "Loading..." label until the LLM starts answering, then
+        # switch to the LLM response text as it streams in.
         if getattr(context.scene, "replace_with_llm", False):
-            if getattr(context.scene, "llm_loading", False):
+            if getattr(context.scene, "llm_loading", False) and not context.scene.llm_response:
                 layout.label(text="Loading...")
                 # Always show Reset so user can clear state without restarting
                 layout.separator()
@@ -929,8 +1026,19 @@ classes = [Panel, HintButton, SubmitButton, LLMResponsePopup, ResetButton]
 
 
 def register_panel():
+    global edge_overlay_handler
+
     for ui_class in classes:
         bpy.utils.register_class(ui_class)
+    submission_reporter.start()
+    if track_actions not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(track_actions)
+    if SHOW_EDGE_LENGTHS and edge_overlay_handler is None:
+        edge_overlay_handler = bpy.types.SpaceView3D.draw_handler_add(
+            draw_lengths, (), "WINDOW", "POST_PIXEL"
+        )
+    # Have Ollama load the model now rather than on the first Hint
+    hint_llm.warm_up()
     for sc in bpy.data.scenes:
         sc.submit_button_text = "Submit"
         # initialize llm_response for existing scenes
@@ -947,8 +1055,16 @@ def register_panel():
 
 
 def unregister_panel():
+    global edge_overlay_handler
+
     for ui_class in classes:
         bpy.utils.unregister_class(ui_class)
+    submission_reporter.stop(timeout=1.0)
+    if track_actions in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(track_actions)
+    if edge_overlay_handler is not None:
+        bpy.types.SpaceView3D.draw_handler_remove(edge_overlay_handler, "WINDOW")
+        edge_overlay_handler = None
 
 
 def load_model(path: str):
@@ -1002,46 +1118,134 @@ def load_model(path: str):
         print("FBX import failed:", e)
 
     # Name the imported objects and set display
-    for obj in bpy.context.selected_objects:
+    mark_target(bpy.context.selected_objects)
+    set_target_analysis(bpy.context.selected_objects, load_analysis(sidecar_path(path)))
+
+
+def mark_target(objects):
+    for obj in objects:
         obj.name = IMPORTED_OBJECT_NAME
         obj.display_type = "WIRE"
         obj.hide_select = True
+    # A new problem starts with no actions; loading it doesn't count
+    action_tracker.reset(bpy.context.window_manager.operators)
 
 
-def draw_lengths():
-    current_object = None
-    for obj in bpy.context.visible_objects:
-        if obj.name == IMPORTED_OBJECT_NAME:
-            current_object = obj
-            break
-    if current_object == None or current_object.name != IMPORTED_OBJECT_NAME:
+def set_target_analysis(objects, analysis):
+    """
+    Keep `analysis` for the newly loaded TARGET objects. If it is missing or
+    doesn't describe the first object's mesh (e.g. the importer reordered
+    vertices or faces, or the problem has several objects), analyse that
+    mesh instead.
+    """
+    global loaded_target_analysis
+
+    loaded_target_analysis = None
+    meshes = [obj for obj in objects if obj.type == "MESH"]
+    if not meshes:
         return
-    object_data = current_object.data
+    loaded_target_analysis = analysis
+    current_target_analysis(meshes[0], check_vertices=True)
 
-    region = bpy.context.region
-    view_3d = bpy.context.region_data
 
-    if region == None or view_3d == None:
-        return
+def current_target_tree(analysis):
+    """`point_tree` over the vertices of `analysis`, built the first time it is asked for."""
+    global loaded_target_tree
 
-    b_mesh = bmesh.new()
-    b_mesh.from_mesh(object_data)
+    if loaded_target_tree is None or loaded_target_tree[0] is not analysis:
+        loaded_target_tree = (analysis, point_tree(analysis["vertices"]))
+    return loaded_target_tree[1]
 
-    for edge in b_mesh.edges:
-        vertex_one_coordinate = edge.verts[0].co
-        vertex_two_coordinate = edge.verts[1].co
 
-        length = (vertex_one_coordinate - vertex_two_coordinate).length
-        midpoint = (vertex_one_coordinate + vertex_two_coordinate) / 2
+def user_vertex_coordinates(objects) -> np.ndarray:
+    """Vertex positions of all meshes among the user's `objects`, as one array."""
+    return np.concatenate(
+        [np.empty((0, 3), dtype=np.float32)]
+        + [vertex_coordinates(obj.data) for obj in objects if obj.type == "MESH"]
+    )
 
-        midpoint_2d = bpy_extras.view3d_utils.location_3d_to_region_2d(
-            region, view_3d, midpoint
-        )
 
-        blf.position(0, midpoint_2d.x, midpoint_2d.y, 0)
-        blf.draw(0, f"{length}")
+def current_target_analysis(target_object, check_vertices: bool = False) -> dict:
+    """
+    Analysis of `target_object`'s mesh, computed from the mesh only if the
+    loaded one doesn't fit it.
+
+    :param check_vertices: compare every vertex position and face rather
+        than only the vertex and face counts
+    """
+    global loaded_target_analysis
+
+    mesh = target_object.data
+    analysis = loaded_target_analysis
+    if analysis is not None:
+        if check_vertices:
+            fits = matches_mesh(
+                analysis, vertex_coordinates(mesh), *polygon_face_arrays(mesh)
+            )
+        else:
+            fits = len(analysis["vertices"]) == len(mesh.vertices) and len(
+                analysis["face_offsets"]
+            ) - 1 == len(mesh.polygons)
+        if fits:
+            return analysis
+
+    print("Analysing the target mesh")
+    loaded_target_analysis = analyse_mesh(
+        vertex_coordinates(mesh),
+        *polygon_face_arrays(mesh),
+        edges=edge_vertex_pairs(mesh),
+        tolerance=TOLERANCE,
+    )
+    return loaded_target_analysis
+
 
-    b_mesh.free()
+def build_model(problem: dict, analysis: dict = None):
+    """
+    Create the TARGET objects straight from a problem dict, without going
+    through an FBX file. Must run on the main thread.
+
+    :param analysis: the problem's target analysis, if already computed
+    """
+    bpy.ops.object.select_all(action="DESELECT")
+
+    objects = []
+    for obj_data in problem["objects"]:
+        mesh = bpy.data.meshes.new(obj_data["name"] + "_mesh")
+        fill_mesh(mesh, *problem_mesh_arrays(obj_data))
+
+        obj = bpy.data.objects.new(obj_data["name"], mesh)
+        bpy.context.collection.objects.link(obj)
+        obj.select_set(True)
+        objects.append(obj)
+
+    if objects:
+        bpy.context.view_layer.objects.active = objects[0]
+    mark_target(objects)
+    set_target_analysis(objects, analysis)
+
+
+def draw_lengths():
+    """POST_PIXEL draw handler labelling each visible TARGET edge with its length."""
+    target_object = bpy.data.objects.get(IMPORTED_OBJECT_NAME)
+    region = bpy.context.region
+    view_3d = bpy.context.region_data
+    if target_object is None or target_object.type != "MESH":
+        return
+    if region is None or view_3d is None or not target_object.visible_get():
+        return
+
+    edge_overlay.set_target(current_target_analysis(target_object))
+    labels = edge_overlay.layout(
+        target_object.matrix_world,
+        view_3d.view_matrix,
+        view_3d.perspective_matrix,
+        view_3d.is_perspective,
+        region.width,
+        region.height,
+    )
+    for x, y, text in labels:
+        blf.position(0, x, y, 0)
+        blf.draw(0, text)
 
 
 """
@@ -1055,13 +1259,30 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 JSON_INPUT_DIR = os.path.join(BASE_DIR, "json_inputs_test")
 FBX_OUTPUT_DIR = os.path.join(BASE_DIR, "json_output_test")
 EXTRA_INFORMATION_JSON_DIR = os.path.join(BASE_DIR, "extra_information_json")
-CONVERTER_SCRIPT = os.path.join(BASE_DIR, "converters", "json_to_fbx.py")
 
 os.makedirs(JSON_INPUT_DIR, exist_ok=True)
 os.makedirs(FBX_OUTPUT_DIR, exist_ok=True)
 os.makedirs(EXTRA_INFORMATION_JSON_DIR, exist_ok=True)
 
-
+# Headless Blender process that does the JSON -> FBX conversions for
+# mode=fbx and export_fbx. Problems are loaded one at a time through the
+# shared model.json/model.fbx paths, so a single worker is enough here. It
+# is only launched when an FBX is first needed (or at startup when "fbx" is
+# the default mode), so direct loads never keep an idle Blender around.
+conversion_pool = BlenderWorkerPool(size=1)
+# Converted FBX files, keyed by a hash of the mesh payload
+conversion_cache = ConversionCache(os.path.join(FBX_OUTPUT_DIR, "cache"))
+
+# How /convert puts a problem in the scene: "direct" builds the TARGET mesh in
+# this Blender, "fbx" converts on a worker and imports the FBX
+CONVERT_MODES = ("direct", "fbx")
+CONVERT_MODE = os.environ.get("BLEET_CONVERT_MODE", "direct")
+# Longest a direct load waits for the main thread to build the model
+MAIN_THREAD_TIMEOUT = 30
+
+
+# Schema of a problem upload. `objects` is checked separately by json_ingest
+# while the upload streams in.
 class ConvertRequest(BaseModel):
     questionName: str
     expectedCompletionTime: int
@@ -1069,58 +1290,123 @@ class ConvertRequest(BaseModel):
     objects: list
 
 
-@app.post("/convert")
-def convert_json_to_fbx(payload: ConvertRequest):
-    job_id = str(uuid.uuid4())
+def _read_problem(path: str) -> dict:
+    """
+    Read a problem as flat mesh arrays: .bmesh files are memory-mapped, JSON
+    is streamed through the same pull parser that validated the upload.
+    """
+    if mesh_format.is_mesh_file(path):
+        return mesh_format.read(path)
+    return load_problem_file(path)
+
+
+def _run_on_main_thread(func, *args):
+    """
+    Run `func(*args)` from a timer on Blender's main thread and wait for it,
+    re-raising anything it raised.
+    """
+    done = threading.Event()
+    outcome = {}
+
+    def _callback():
+        try:
+            outcome["result"] = func(*args)
+        except Exception as e:
+            outcome["error"] = e
+        done.set()
+        # Return None to unregister the timer after one run
+        return None
+
+    bpy.app.timers.register(_callback, first_interval=0.0)
+    if not done.wait(MAIN_THREAD_TIMEOUT):
+        raise HTTPException(
+            status_code=500,
+            detail=f"Blender did not load the model within {MAIN_THREAD_TIMEOUT}s",
+        )
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome.get("result")
+
+
+def _convert_to_fbx(json_path: str, objects_hash: str):
+    """
+    Return (fbx_path, cached). Reuses an earlier conversion of the same mesh
+    if there is one, otherwise converts on one of the warm Blender workers.
+    """
+    cached_fbx_path = conversion_cache.get(objects_hash)
+    if cached_fbx_path is not None:
+        return cached_fbx_path, True
 
-    json_path = os.path.join(JSON_INPUT_DIR, f"model.json")
     fbx_path = os.path.join(FBX_OUTPUT_DIR, f"model.fbx")
+    try:
+        conversion_pool.convert(json_path, fbx_path)
+    except WorkerError as e:
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "error": "Blender conversion failed",
+                "reason": str(e),
+                "output": e.output,
+            },
+        )
+    return conversion_cache.put(objects_hash, fbx_path), False
+
 
-    # Save JSON
-    with open(json_path, "w") as f:
-        json.dump(payload.dict(), f, indent=2)
+def run_conversion(job_id: str, payload) -> dict:
+    """
+    Load an uploaded JSON problem, or raw .bmesh bytes, into the scene.
+
+    :param payload: (data, mode, export_fbx) where `data` is an
+        UploadedProblem or .bmesh bytes, `mode` one of CONVERT_MODES and
+        `export_fbx` whether a direct load should still write an FBX
+    """
+    data, mode, export_fbx = payload
+
+    if isinstance(data, bytes):
+        json_path = os.path.join(JSON_INPUT_DIR, f"model{mesh_format.EXTENSION}")
+        with open(json_path, "wb") as f:
+            f.write(data)
+        problem = mesh_format.read_meta(data)
+        objects_hash = binary_cache_key(mesh_format.objects_section(data))
+    else:
+        json_path = os.path.join(JSON_INPUT_DIR, f"model.json")
+        os.replace(data.path, json_path)
+        problem = data.fields
+        objects_hash = data.objects_hash
 
     other_information_json_path = os.path.join(EXTRA_INFORMATION_JSON_DIR, f"info.json")
     with open(other_information_json_path, "w") as f:
         json.dump(
             {
-                "expectedCompletionTime": payload.dict()["expectedCompletionTime"],
-                "expectedNumOfActions": payload.dict()["expectedNumOfActions"],
-                "questionName": payload.dict()["questionName"],
+                "expectedCompletionTime": problem.get("expectedCompletionTime"),
+                "expectedNumOfActions": problem.get("expectedNumOfActions"),
+                "questionName": problem.get("questionName"),
             },
             f,
             indent=2,
         )
 
-    # Call Blender
-    cmd = [
-        "blender",
-        "-b",
-        "-P",
-        CONVERTER_SCRIPT,
-        "--",
-        json_path,
-        fbx_path,
-    ]
-
-    result = subprocess.run(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-    )
-
-    if result.returncode != 0:
-        raise HTTPException(
-            status_code=500,
-            detail={
-                "error": "Blender conversion failed",
-                "stdout": result.stdout,
-                "stderr": result.stderr,
-            },
-        )
+    if mode == "direct":
+        # This Blender already has bpy, so build the mesh here instead of
+        # launching a conversion and importing its output. The file is parsed
+        # and the target analysed on this thread; only the mesh building runs
+        # on the main thread.
+        meshes = _read_problem(json_path)
+        analysis = write_sidecar(json_path, meshes)
+        _run_on_main_thread(build_model, meshes, analysis)
+        fbx_path, cached = None, False
+        if export_fbx:
+            fbx_path, cached = _convert_to_fbx(json_path, objects_hash)
+        return {
+            "status": "success",
+            "job_id": job_id,
+            "mode": mode,
+            "json_path": json_path,
+            "fbx_path": fbx_path,
+            "cached": cached,
+        }
 
-    fbx_path = os.path.join(FBX_OUTPUT_DIR, "model.fbx")
+    fbx_path, cached = _convert_to_fbx(json_path, objects_hash)
 
     # Blender's `bpy` API must run on the main thread. The FastAPI handler
     # runs in a worker thread, so schedule the import on the main thread
@@ -1141,11 +1427,123 @@ def convert_json_to_fbx(payload: ConvertRequest):
     return {
         "status": "success",
         "job_id": job_id,
+        "mode": mode,
         "json_path": json_path,
         "fbx_path": fbx_path,
+        "cached": cached,
     }
 
 
+# Conversions run as queued jobs so no request handler blocks on Blender
+conversion_jobs = JobQueue(run_conversion, concurrency=conversion_pool.size)
+app.include_router(jobs_router(conversion_jobs))
+
+
+@app.on_event("startup")
+async def start_conversions():
+    # A missing Blender must not take down the routes that don't need the
+    # workers; convert() retries the launch per job
+    if CONVERT_MODE == "fbx":
+        try:
+            conversion_pool.start()
+        except WorkerError as e:
+            print("Blender workers not started, FBX conversions will fail until they can be:", e)
+    await conversion_jobs.start()
+
+
+@app.on_event("shutdown")
+async def stop_conversions():
+    await conversion_jobs.stop()
+    conversion_pool.close()
+
+
+def _check_convert_mode(mode: str):
+    if mode not in CONVERT_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown mode {mode!r}, expected one of {', '.join(CONVERT_MODES)}",
+        )
+
+
+def _submit_conversion(payload, priority: str):
+    try:
+        return conversion_jobs.submit(payload, priority)
+    except (ValueError, QueueFullError) as e:
+        # The job will never run, so its upload is not needed
+        if isinstance(payload[0], UploadedProblem):
+            os.remove(payload[0].path)
+        if isinstance(e, QueueFullError):
+            raise HTTPException(status_code=429, detail=f"Conversion queue is full: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _read_convert_payload(request: Request):
+    """
+    Read a /convert body. Clients may send the problem as JSON, returned as
+    an UploadedProblem on disk, or with the .bmesh media type as a packed
+    binary buffer that is passed on as bytes.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type == mesh_format.MEDIA_TYPE:
+        body = await request.body()
+        try:
+            mesh_format.decode(body)
+            meta = mesh_format.read_meta(body)
+        except MeshFormatError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid mesh: {e}")
+        # The problem fields need the same checks as a JSON upload's
+        try:
+            ConvertRequest.parse_obj({**meta, "objects": []})
+        except ValidationError as e:
+            raise RequestValidationError(e.errors())
+        return body
+
+    # JSON goes straight to disk and is validated as it is read back, so a
+    # large mesh never becomes a Python object graph
+    try:
+        upload = await ingest_request(request, JSON_INPUT_DIR)
+    except IngestError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid problem: {e}")
+    try:
+        ConvertRequest.parse_obj({**upload.fields, "objects": []})
+    except ValidationError as e:
+        os.remove(upload.path)
+        raise RequestValidationError(e.errors())
+    return upload
+
+
+@app.post("/convert")
+async def convert_json_to_fbx(
+    request: Request, mode: str = CONVERT_MODE, export_fbx: bool = False
+):
+    _check_convert_mode(mode)
+    data = await _read_convert_payload(request)
+    # Interactive callers wait for the result, so jump ahead of batch jobs
+    job = _submit_conversion((data, mode, export_fbx), "high")
+    await job.wait()
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    return job.result
+
+
+@app.post("/jobs", status_code=202)
+async def create_conversion_job(
+    request: Request,
+    priority: str = "normal",
+    mode: str = CONVERT_MODE,
+    export_fbx: bool = False,
+):
+    _check_convert_mode(mode)
+    data = await _read_convert_payload(request)
+    job = _submit_conversion((data, mode, export_fbx), priority)
+    return {"job_id": job.id, "status": job.status}
+
+
+@app.get("/convert/cache/stats")
+def conversion_cache_stats():
+    return conversion_cache.stats()
+
+
 def run_server():
     uvicorn.run(app, host="127.0.0.1", port=8000, log_level="info")
 
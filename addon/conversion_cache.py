@@ -0,0 +1,196 @@
+"""
+Content-addressed cache of converted FBX files.
+
+The frontend sends the same few problem meshes over and over, so converted
+FBX files are kept on disk keyed by a hash of the mesh payload. A hit hands
+back the stored file without touching Blender. The cache is bounded in bytes
+and evicts the least recently used files first. The target analysis sidecar
+written by the conversion travels with its FBX.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from array import array
+from collections import OrderedDict
+
+from target_analysis import sidecar_path
+
+FBX_CACHE_MAX_BYTES = int(os.environ.get("FBX_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+
+def vertices_bytes(vertices) -> bytes:
+    """Canonical bytes of a list of [x, y, z] vertices (float64, so 1 == 1.0)."""
+    return array("d", (c for vertex in vertices for c in vertex)).tobytes()
+
+
+def faces_bytes(faces) -> bytes:
+    """Canonical bytes of a list of faces, each prefixed by its length."""
+    values = array("q")
+    for face in faces:
+        values.append(len(face))
+        values.extend(face)
+    return values.tobytes()
+
+
+def value_bytes(value) -> bytes:
+    """Canonical bytes of any other JSON value."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+class ObjectsHasher:
+    """
+    Builds the cache key of an `objects` list one object at a time, and each
+    field of an object in as many pieces as the caller likes, so streaming
+    readers never need the whole list in memory. Field order inside an object
+    does not change the key.
+    """
+
+    def __init__(self):
+        self._digest = hashlib.sha256()
+        self._fields = None
+
+    def begin_object(self):
+        self._fields = {}
+
+    def update_field(self, key: str, data: bytes):
+        if key not in self._fields:
+            self._fields[key] = hashlib.sha256(key.encode("utf-8") + b"\0")
+        self._fields[key].update(data)
+
+    def end_object(self):
+        obj_digest = hashlib.sha256()
+        for key in sorted(self._fields):
+            obj_digest.update(self._fields[key].digest())
+        self._digest.update(obj_digest.digest())
+        self._fields = None
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+def cache_key(objects) -> str:
+    """Hash the `objects` payload independently of key order and formatting."""
+    hasher = ObjectsHasher()
+    for obj in objects:
+        hasher.begin_object()
+        for key, value in obj.items():
+            if key == "vertices":
+                hasher.update_field(key, vertices_bytes(value))
+            elif key == "faces":
+                hasher.update_field(key, faces_bytes(value))
+            else:
+                hasher.update_field(key, value_bytes(value))
+        hasher.end_object()
+    return hasher.hexdigest()
+
+
+def _entry_size(path: str) -> int:
+    # An FBX plus its analysis sidecar, if the conversion wrote one
+    size = os.path.getsize(path)
+    try:
+        size += os.path.getsize(sidecar_path(path))
+    except OSError:
+        pass
+    return size
+
+
+def binary_cache_key(objects_section) -> str:
+    """Hash the mesh part of a .bmesh buffer (see mesh_format.objects_section)."""
+    return hashlib.sha256(b"bmesh:" + bytes(objects_section)).hexdigest()
+
+
+class ConversionCache:
+    def __init__(self, directory: str, max_bytes: int = FBX_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> file size, least recently used first
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_existing()
+
+    def _load_existing(self):
+        # Pick up files left by a previous run, oldest access first
+        files = []
+        for fname in os.listdir(self.directory):
+            key, ext = os.path.splitext(fname)
+            path = os.path.join(self.directory, fname)
+            if ext == ".fbx" and os.path.isfile(path):
+                files.append((os.path.getmtime(path), key, _entry_size(path)))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+        self._evict()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.fbx")
+
+    def get(self, key: str):
+        """Return the cached FBX path for `key`, or None on a miss."""
+        with self._lock:
+            path = self.path_for(key)
+            if key not in self._entries or not os.path.exists(path):
+                if key in self._entries:
+                    self._total_bytes -= self._entries.pop(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.bytes_saved += self._entries[key]
+        try:
+            # Keep the on-disk recency in step for the next startup
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def put(self, key: str, fbx_path: str) -> str:
+        """Move a freshly converted FBX into the cache and return its new path."""
+        path = self.path_for(key)
+        with self._lock:
+            os.replace(fbx_path, path)
+            try:
+                os.replace(sidecar_path(fbx_path), sidecar_path(path))
+            except FileNotFoundError:
+                pass
+            size = _entry_size(path)
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)
+            self._entries[key] = size
+            self._total_bytes += size
+            self._evict(keep=key)
+        return path
+
+    def _evict(self, keep: str = None):
+        while self._total_bytes > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            if key == keep:
+                break
+            self._total_bytes -= self._entries.pop(key)
+            path = self.path_for(key)
+            for evicted in (path, sidecar_path(path)):
+                try:
+                    os.remove(evicted)
+                except OSError:
+                    pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "bytes_saved": self.bytes_saved,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,50 @@
+import bpy #blender api
+import json
+import sys
+import os
+import traceback
+
+# Long-lived conversion worker started by worker_pool.BlenderWorkerPool
+# blender -b -P blender_worker.py
+#
+# Reads one JSON job per line from stdin:
+#   {"id": "...", "json_path": "...", "fbx_path": "..."}
+# and answers each with one line on stdout starting with RESULT_PREFIX.
+# Everything else Blender prints on stdout is treated as log output.
+
+RESULT_PREFIX = "@@bleet-worker "
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from json_to_fbx import convert
+
+
+def reply(message):
+    sys.stdout.write(RESULT_PREFIX + json.dumps(message) + "\n")
+    sys.stdout.flush()
+
+
+# Much cheaper than read_factory_settings: drop whatever the previous job
+# created and keep the rest of the session warm
+def clear_scene():
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj, do_unlink=True)
+    for mesh in list(bpy.data.meshes):
+        bpy.data.meshes.remove(mesh, do_unlink=True)
+    for material in list(bpy.data.materials):
+        bpy.data.materials.remove(material, do_unlink=True)
+
+
+bpy.ops.wm.read_factory_settings(use_empty=True)
+reply({"ready": True})
+
+for line in sys.stdin:
+    if not line.strip():
+        continue
+
+    job = json.loads(line)
+    try:
+        clear_scene()
+        convert(job["json_path"], job["fbx_path"])
+        reply({"id": job["id"], "ok": True})
+    except Exception:
+        reply({"id": job["id"], "ok": False, "error": traceback.format_exc()})
@@ -1,6 +1,9 @@
 import sys
 import os
 import json
+import glob
+import argparse
+import subprocess
 
 try:
     import bpy
@@ -8,8 +11,26 @@ except Exception:
     print("This script must be run inside Blender (bpy required).")
     sys.exit(1)
 
+# Usage:
+#   blender -b -P fbx_to_json.py
+#       converts hard.fbx to hard.json inside the addon folder
+#   blender -b -P fbx_to_json.py -- fbxs/ "more/*.fbx" one.fbx --out jsons/
+#       converts every matching FBX in this one Blender session
+# Options after "--":
+#   --out DIR   where to write the JSON files (default: next to each FBX)
+#   --binary    also write the packed .bmesh form
+#   --force     convert even if the output is newer than the FBX
+#   --jobs N    split the files across N Blender processes
+
 # Use fixed paths inside the addon folder
 base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Shared helpers live in the addon folder
+sys.path.insert(0, base_dir)
+from mesh_data import polygon_vertex_lists, vertex_coordinates
+import mesh_format
+from target_analysis import sidecar_path, write_sidecar
+
 fbx_path = os.path.join(base_dir, "hard.fbx")
 json_path = os.path.join(base_dir, "hard.json")
 
@@ -28,60 +49,168 @@ def clear_scene():
             bpy.data.meshes.remove(mesh, do_unlink=True)
         except Exception:
             pass
+    # remove materials, so they don't pile up across files in a batch
+    for material in list(bpy.data.materials):
+        try:
+            bpy.data.materials.remove(material, do_unlink=True)
+        except Exception:
+            pass
+    # and whatever else the previous import left unused (armatures, images...)
+    try:
+        bpy.data.orphans_purge(do_recursive=True)
+    except Exception:
+        pass
+
+
+def convert_file(fbx_path, json_path, binary=False):
+    clear_scene()
+
+    print("Importing FBX:", fbx_path)
+    bpy.ops.import_scene.fbx(filepath=fbx_path)
+
+    scene = bpy.context.scene
+    objects_out = []
+
+    # Use evaluated depsgraph so modifiers are applied
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+
+    for obj in list(scene.objects):
+        if obj.type != "MESH":
+            continue
+
+        eval_obj = obj.evaluated_get(depsgraph)
+        mesh = eval_obj.to_mesh()
+        if mesh is None:
+            continue
+
+        # Collect transformed vertex coordinates (world space)
+        verts = vertex_coordinates(mesh, obj.matrix_world).tolist()
+
+        # Collect polygon faces (preserve quads/ngons when available)
+        faces = polygon_vertex_lists(mesh)
+
+        objects_out.append({"name": obj.name, "vertices": verts, "faces": faces})
+
+        # free the evaluated mesh
+        eval_obj.to_mesh_clear()
+
+    # Build final JSON
+    out = {
+        "questionName": os.path.splitext(os.path.basename(fbx_path))[0],
+        "expectedCompletionTime": 10,
+        "expectedNumOfActions": 0,
+        "objects": objects_out,
+    }
+
+    os.makedirs(os.path.dirname(json_path) or ".", exist_ok=True)
+    with open(json_path, "w") as f:
+        json.dump(out, f, indent=2)
+
+    print("Wrote JSON to:", json_path)
+
+    write_sidecar(json_path, out)
+    print("Wrote target analysis to:", sidecar_path(json_path))
+
+    if binary:
+        bmesh_path = os.path.splitext(json_path)[0] + mesh_format.EXTENSION
+        mesh_format.write(bmesh_path, out)
+        print("Wrote binary mesh to:", bmesh_path)
+
+
+def find_fbx_files(inputs):
+    """Expand directories, globs and plain paths into a sorted list of FBX files."""
+    found = set()
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            paths = glob.glob(os.path.join(pattern, "*.fbx"))
+        else:
+            paths = glob.glob(pattern) or [pattern]
+        for path in paths:
+            if path.lower().endswith(".fbx"):
+                found.add(os.path.abspath(path))
+    return sorted(found)
+
+
+def output_path(fbx_path, out_dir):
+    name = os.path.splitext(os.path.basename(fbx_path))[0] + ".json"
+    return os.path.join(out_dir or os.path.dirname(fbx_path), name)
+
+
+def is_up_to_date(fbx_path, json_path, binary=False):
+    outputs = [json_path, sidecar_path(json_path)]
+    if binary:
+        outputs.append(os.path.splitext(json_path)[0] + mesh_format.EXTENSION)
+    try:
+        source_time = os.path.getmtime(fbx_path)
+        return all(os.path.getmtime(path) >= source_time for path in outputs)
+    except OSError:
+        return False
+
+
+def fan_out(files, args):
+    # Every child is another Blender running this script on its share of the
+    # files; the parent only waits for them
+    chunks = [files[i :: args.jobs] for i in range(args.jobs)]
+    processes = []
+    for chunk in chunks:
+        if not chunk:
+            continue
+        command = [bpy.app.binary_path, "-b", "-P", os.path.abspath(__file__), "--"]
+        command += chunk + ["--force", "--jobs", "1"]
+        if args.out:
+            command += ["--out", args.out]
+        if args.binary:
+            command.append("--binary")
+        processes.append(subprocess.Popen(command))
+
+    failed = sum(1 for process in processes if process.wait() != 0)
+    if failed:
+        print(f"{failed} of {len(processes)} Blender processes failed")
+    return failed == 0
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        prog="blender -b -P fbx_to_json.py --",
+        description="Convert FBX problem files to the JSON problem format.",
+    )
+    parser.add_argument("inputs", nargs="*", help="FBX files, directories or globs")
+    parser.add_argument("--out", help="directory for the JSON files")
+    parser.add_argument("--binary", action="store_true", help="also write .bmesh files")
+    parser.add_argument("--force", action="store_true", help="convert up-to-date files too")
+    parser.add_argument("--jobs", type=int, default=1, help="Blender processes to use")
+    args = parser.parse_args(argv)
+
+    if args.inputs:
+        files = find_fbx_files(args.inputs)
+        outputs = {path: output_path(path, args.out) for path in files}
+    else:
+        files = [fbx_path]
+        outputs = {fbx_path: json_path}
+
+    pending = []
+    for path in files:
+        if not os.path.exists(path):
+            print("FBX file not found:", path)
+            return False
+        if not args.force and is_up_to_date(path, outputs[path], args.binary):
+            print("Up to date, skipping:", path)
+            continue
+        pending.append(path)
+
+    if args.jobs > 1 and len(pending) > 1:
+        return fan_out(pending, args)
+
+    ok = True
+    for path in pending:
+        try:
+            convert_file(path, outputs[path], args.binary)
+        except Exception as e:
+            print("Failed to convert", path, "-", e)
+            ok = False
+    return ok
 
 
-clear_scene()
-
-# Import FBX
-if not os.path.exists(fbx_path):
-    print("FBX file not found:", fbx_path)
+argv = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else []
+if not main(argv):
     sys.exit(1)
-
-print("Importing FBX:", fbx_path)
-bpy.ops.import_scene.fbx(filepath=fbx_path)
-
-scene = bpy.context.scene
-objects_out = []
-
-# Use evaluated depsgraph so modifiers are applied
-depsgraph = bpy.context.evaluated_depsgraph_get()
-
-for obj in list(scene.objects):
-    if obj.type != "MESH":
-        continue
-
-    eval_obj = obj.evaluated_get(depsgraph)
-    mesh = eval_obj.to_mesh()
-    if mesh is None:
-        continue
-
-    # Collect transformed vertex coordinates (world space)
-    verts = []
-    for v in mesh.vertices:
-        co = obj.matrix_world @ v.co
-        verts.append([float(co.x), float(co.y), float(co.z)])
-
-    # Collect polygon faces (preserve quads/ngons when available)
-    faces = []
-    for poly in mesh.polygons:
-        verts_idx = [int(i) for i in poly.vertices]
-        faces.append(verts_idx)
-
-    objects_out.append({"name": obj.name, "vertices": verts, "faces": faces})
-
-    # free the evaluated mesh
-    eval_obj.to_mesh_clear()
-
-# Build final JSON
-out = {
-    "questionName": os.path.splitext(os.path.basename(fbx_path))[0],
-    "expectedCompletionTime": 10,
-    "expectedNumOfActions": 0,
-    "objects": objects_out,
-}
-
-os.makedirs(os.path.dirname(json_path) or ".", exist_ok=True)
-with open(json_path, "w") as f:
-    json.dump(out, f, indent=2)
-
-print("Wrote JSON to:", json_path)
@@ -3,42 +3,74 @@ import json
 import sys
 import os
 
-# Get arguments
-# blender -b -P json_to_fbx.py -- input.json output.fbx
-argv = sys.argv
-argv = argv[argv.index("--") + 1:]
+# Shared helpers live in the addon folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import mesh_format
+from mesh_data import fill_mesh, problem_mesh_arrays
+from target_analysis import write_sidecar
 
-json_path = argv[0]
-fbx_path = argv[1]
 
-# Reset scene
-bpy.ops.wm.read_factory_settings(use_empty=True)
+def build_objects(data):
+    # Create objects
+    for obj_data in data["objects"]:
+        name = obj_data["name"]
 
-# Load JSON
-with open(json_path, "r") as f:
-    data = json.load(f)
+        mesh = bpy.data.meshes.new(name + "_mesh")
+        fill_mesh(mesh, *problem_mesh_arrays(obj_data))
 
-# Create objects
-for obj_data in data["objects"]:
-    name = obj_data["name"]
-    vertices = obj_data["vertices"]
-    faces = obj_data["faces"]
+        obj = bpy.data.objects.new(name, mesh)
+        bpy.context.collection.objects.link(obj)
 
-    mesh = bpy.data.meshes.new(name + "_mesh")
-    mesh.from_pydata(vertices, [], faces)
-    mesh.update()
 
-    obj = bpy.data.objects.new(name, mesh)
-    bpy.context.collection.objects.link(obj)
+def export_fbx(fbx_path):
+    os.makedirs(os.path.dirname(fbx_path), exist_ok=True)
 
-# Export FBX
-os.makedirs(os.path.dirname(fbx_path), exist_ok=True)
+    bpy.ops.export_scene.fbx(
+        filepath=fbx_path,
+        use_selection=False,
+        object_types={'MESH'},
+        add_leaf_bones=False
+    )
 
-bpy.ops.export_scene.fbx(
-    filepath=fbx_path,
-    use_selection=False,
-    object_types={'MESH'},
-    add_leaf_bones=False
-)
 
-print("FBX exported to:", fbx_path)
+def load_problem(path):
+    # Either the JSON problem format or its packed .bmesh equivalent
+    if mesh_format.is_mesh_file(path):
+        return mesh_format.read(path)
+
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def convert(json_path, fbx_path):
+    data = load_problem(json_path)
+
+    # Converting to .bmesh only repacks the data, no scene needed
+    if mesh_format.is_mesh_file(fbx_path):
+        if mesh_format.is_mesh_file(json_path):
+            data = mesh_format.to_json_problem(data)
+        mesh_format.write(fbx_path, data)
+    else:
+        build_objects(data)
+        export_fbx(fbx_path)
+
+    # The addon loads this along with the mesh instead of re-deriving it
+    write_sidecar(fbx_path, data)
+
+
+if __name__ == "__main__":
+    # Get arguments
+    # blender -b -P json_to_fbx.py -- input.json output.fbx
+    # input may also be a .bmesh file, and output.bmesh writes .bmesh instead of FBX
+    argv = sys.argv
+    argv = argv[argv.index("--") + 1:]
+
+    json_path = argv[0]
+    fbx_path = argv[1]
+
+    # Reset scene
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+
+    convert(json_path, fbx_path)
+
+    print("Exported to:", fbx_path)
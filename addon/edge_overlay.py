@@ -0,0 +1,118 @@
+"""
+Edge length labels for the TARGET mesh, laid out for the 3D viewport.
+
+The old `draw_lengths` built a bmesh from the target on every redraw,
+recomputed every edge's length and midpoint, projected each midpoint with
+`location_3d_to_region_2d` and drew every label, so each viewport refresh
+cost more the bigger the mesh. EdgeLengthOverlay takes the edge midpoints,
+normals and lengths from the target analysis once per problem and formats
+the labels once. On a redraw it projects all midpoints with one matrix
+multiply, drops edges that are behind the viewer, off screen or facing
+away, and keeps the resulting layout until the view (or region size)
+changes.
+
+Only NumPy is used here; the addon draws the laid out labels with `blf`.
+"""
+
+import numpy as np
+
+# Labels this close to the region border (pixels) are still drawn
+SCREEN_MARGIN = 20
+
+
+def format_length(length: float) -> str:
+    return f"{length:.3g}"
+
+
+class EdgeLengthOverlay:
+    def __init__(self):
+        self._analysis = None
+        self._midpoints = np.empty((0, 4))
+        self._normals = np.empty((0, 3))
+        self._labels = []
+        self._view_key = None
+        self._layout = []
+
+    def set_target(self, analysis: dict):
+        """Take the edges of a newly loaded target; a no-op for the same analysis."""
+        if analysis is self._analysis:
+            return
+        self._analysis = analysis
+        self._view_key = None
+        self._layout = []
+        if analysis is None:
+            self._midpoints = np.empty((0, 4))
+            self._normals = np.empty((0, 3))
+            self._labels = []
+            return
+
+        midpoints = np.asarray(analysis["edge_midpoints"], dtype=np.float64)
+        # Homogeneous coordinates, so one 4x4 multiply projects them all
+        self._midpoints = np.hstack([midpoints, np.ones((len(midpoints), 1))])
+        self._normals = np.asarray(analysis["edge_normals"], dtype=np.float64)
+        self._labels = [format_length(length) for length in analysis["edge_lengths"].tolist()]
+
+    def layout(
+        self,
+        object_matrix,
+        view_matrix,
+        perspective_matrix,
+        is_perspective: bool,
+        width: int,
+        height: int,
+    ) -> list:
+        """
+        Region positions of the labels that should be drawn, as (x, y, text).
+        Recomputed only when one of the arguments differs from the last call.
+
+        :param object_matrix: the target object's world matrix
+        :param view_matrix: the region's view matrix (world -> camera)
+        :param perspective_matrix: the region's view projection matrix
+        """
+        object_matrix = np.asarray(object_matrix, dtype=np.float64).reshape(4, 4)
+        view_matrix = np.asarray(view_matrix, dtype=np.float64).reshape(4, 4)
+        perspective_matrix = np.asarray(perspective_matrix, dtype=np.float64).reshape(4, 4)
+        view_key = (
+            object_matrix.tobytes(),
+            perspective_matrix.tobytes(),
+            bool(is_perspective),
+            width,
+            height,
+        )
+        if view_key == self._view_key:
+            return self._layout
+        self._view_key = view_key
+
+        if not len(self._labels) or width <= 0 or height <= 0:
+            self._layout = []
+            return self._layout
+
+        clip = self._midpoints @ (perspective_matrix @ object_matrix).T
+        w = clip[:, 3]
+        visible = w > 1e-9
+        safe_w = np.where(visible, w, 1.0)
+        x = (clip[:, 0] / safe_w + 1.0) * (width / 2)
+        y = (clip[:, 1] / safe_w + 1.0) * (height / 2)
+        visible &= (x >= -SCREEN_MARGIN) & (x <= width + SCREEN_MARGIN)
+        visible &= (y >= -SCREEN_MARGIN) & (y <= height + SCREEN_MARGIN)
+
+        # Back-facing: the edge's faces point away from the viewer. Normals
+        # go through the inverse transpose so scaled objects work too.
+        camera_matrix = view_matrix @ object_matrix
+        camera_points = self._midpoints @ camera_matrix.T
+        normal_matrix = np.linalg.inv(camera_matrix[:3, :3]).T
+        camera_normals = self._normals @ normal_matrix.T
+        if is_perspective:
+            # The eye is at the camera-space origin
+            facing = np.einsum("ij,ij->i", camera_normals, camera_points[:, :3])
+        else:
+            # The view looks down -Z
+            facing = -camera_normals[:, 2]
+        has_normal = np.any(self._normals != 0, axis=1)
+        visible &= ~has_normal | (facing < 0)
+
+        self._layout = [
+            (float(x[i]), float(y[i]), self._labels[i])
+            for i in np.flatnonzero(visible).tolist()
+        ]
+        return self._layout
@@ -0,0 +1,208 @@
+"""
+Compact description of how the user's mesh differs from the target.
+
+The hint prompt used to list every vertex of both objects, which for the
+medium and hard problems is thousands of tokens that llava has to read
+before it can answer. `geometry_diff` boils the comparison down to a few
+numbers: vertex/face counts, bounding boxes, offset/scale/rotation estimates
+and the regions where vertices don't match, found with the same matcher and
+tolerance as Submit.
+"""
+
+import numpy as np
+
+from matching import VertexGrid, match_vertices
+
+# Unmatched regions listed in the summary, largest first
+MAX_CLUSTERS = 5
+# Pair-and-fit steps for the rotation estimate
+ICP_ITERATIONS = 10
+
+
+def bounding_box(points) -> dict:
+    if not len(points):
+        return None
+    low = points.min(axis=0)
+    high = points.max(axis=0)
+    return {"min": low, "max": high, "size": high - low, "center": (low + high) / 2}
+
+
+def unmatched_clusters(points, unmatched, edges, max_clusters: int = MAX_CLUSTERS) -> list:
+    """
+    Group the `unmatched` vertices into regions connected through mesh edges
+    and return the largest ones as {"count", "center", "size"} dicts.
+
+    :param edges: (E, 2) vertex index pairs of the mesh
+    """
+    indices = np.flatnonzero(unmatched)
+    if not len(indices):
+        return []
+
+    # Connected components by repeatedly giving both ends of an edge the
+    # smaller of their labels, only along edges between unmatched vertices
+    labels = np.arange(len(points))
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    edges = edges[unmatched[edges[:, 0]] & unmatched[edges[:, 1]]]
+    while len(edges):
+        lowest = np.minimum(labels[edges[:, 0]], labels[edges[:, 1]])
+        new_labels = labels.copy()
+        np.minimum.at(new_labels, edges[:, 0], lowest)
+        np.minimum.at(new_labels, edges[:, 1], lowest)
+        # Follow label chains so long strips settle in few passes
+        new_labels = new_labels[new_labels]
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+    cluster_ids, inverse, counts = np.unique(
+        labels[indices], return_inverse=True, return_counts=True
+    )
+    clusters = []
+    for cluster in np.argsort(-counts, kind="stable")[:max_clusters]:
+        members = points[indices[inverse == cluster]]
+        box = bounding_box(members)
+        clusters.append(
+            {"count": int(counts[cluster]), "center": box["center"], "size": box["size"]}
+        )
+    return clusters
+
+
+def _rotation_estimate(target, user, iterations: int = ICP_ITERATIONS):
+    """
+    Rough rotation (degrees) taking the target onto the user mesh: centre
+    both on their centroids, match their overall size, then alternate
+    pairing every user vertex with its nearest rotated target vertex and
+    fitting one rotation to the pairs (a few steps of ICP with Kabsch).
+    """
+    if len(target) < 3 or len(user) < 3:
+        return None
+    centred_target = target - target.mean(axis=0)
+    centred_user = user - user.mean(axis=0)
+    target_radius = np.sqrt((centred_target**2).sum(axis=1).mean())
+    user_radius = np.sqrt((centred_user**2).sum(axis=1).mean())
+    if target_radius < 1e-9 or user_radius < 1e-9:
+        return None
+    centred_target *= user_radius / target_radius
+
+    rotation = np.eye(3)
+    for _ in range(iterations):
+        rotated = centred_target @ rotation.T
+        _, nearest = VertexGrid(rotated, user_radius).nearest_within_cell(centred_user)
+        paired = nearest >= 0
+        if paired.sum() < 3:
+            return None
+        a = centred_target[nearest[paired]]
+        b = centred_user[paired]
+        u, _, vt = np.linalg.svd(a.T @ b)
+        d = np.sign(np.linalg.det(vt.T @ u.T))
+        new_rotation = vt.T @ np.diag([1.0, 1.0, d]) @ u.T
+        if np.allclose(new_rotation, rotation):
+            break
+        rotation = new_rotation
+
+    angle = np.degrees(np.arccos(np.clip((np.trace(rotation) - 1) / 2, -1.0, 1.0)))
+    return float(angle)
+
+
+def geometry_diff(
+    target_points,
+    user_points,
+    target_edges,
+    user_edges,
+    tolerance: float,
+    target_grid=None,
+    target_box=None,
+) -> dict:
+    """
+    Compare two meshes given as (N, 3) vertex positions and (E, 2) edges.
+    Face counts are not known here; callers add them to the result.
+
+    :param target_grid: VertexGrid over the target vertices with a cell size
+        of `tolerance`, if the caller already has one (see target_analysis)
+    :param target_box: `bounding_box` of the target, likewise
+    """
+    target = np.asarray(target_points, dtype=np.float64).reshape(-1, 3)
+    user = np.asarray(user_points, dtype=np.float64).reshape(-1, 3)
+    if target_box is None:
+        target_box = bounding_box(target)
+    user_box = bounding_box(user)
+
+    diff = {
+        "target": {"vertices": len(target), "box": target_box},
+        "user": {"vertices": len(user), "box": user_box},
+        "tolerance": tolerance,
+    }
+    if target_box is None or user_box is None:
+        return diff
+
+    target_matched = match_vertices(target, user, tolerance)
+    if target_grid is not None:
+        user_matched = target_grid.any_within_cell(user)
+    else:
+        user_matched = match_vertices(user, target, tolerance)
+    diff["target"]["matched"] = int(target_matched.sum())
+    diff["user"]["matched"] = int(user_matched.sum())
+    diff["missing"] = unmatched_clusters(target, ~target_matched, target_edges)
+    diff["extra"] = unmatched_clusters(user, ~user_matched, user_edges)
+
+    diff["offset"] = user_box["center"] - target_box["center"]
+    diff["scale"] = np.where(
+        target_box["size"] > 1e-9,
+        user_box["size"] / np.maximum(target_box["size"], 1e-9),
+        np.nan,
+    )
+    diff["rotation_degrees"] = _rotation_estimate(target, user)
+    return diff
+
+
+def _vector(values) -> str:
+    return "(" + ", ".join("?" if np.isnan(v) else f"{v:.3g}" for v in values) + ")"
+
+
+def describe_mesh(label: str, info: dict) -> str:
+    """One prompt line with a mesh's counts and bounding box."""
+    line = f"{label}: {info['vertices']} vertices"
+    if "faces" in info:
+        line += f", {info['faces']} faces"
+    if info["box"] is not None:
+        box = info["box"]
+        line += f", bounding box {_vector(box['min'])} to {_vector(box['max'])}"
+    return line
+
+
+def format_geometry_diff(diff: dict) -> str:
+    """
+    Render `geometry_diff` output as a few short lines for the prompt. A
+    precomputed `describe_mesh` line can be passed in as info["summary"].
+    """
+    lines = []
+    for label, key in (("Target", "target"), ("Current", "user")):
+        info = diff[key]
+        line = info.get("summary") or describe_mesh(label, info)
+        if "location" in info:
+            line += f", object location {_vector(info['location'])}"
+        lines.append(line)
+
+    if "offset" not in diff:
+        return "\n".join(lines)
+
+    lines.append(
+        f"Matched within {diff['tolerance']}: {diff['target']['matched']} of "
+        f"{diff['target']['vertices']} target vertices, {diff['user']['matched']} of "
+        f"{diff['user']['vertices']} current vertices"
+    )
+    lines.append(f"Center offset (current - target): {_vector(diff['offset'])}")
+    lines.append(f"Size ratio per axis (current / target): {_vector(diff['scale'])}")
+    if diff["rotation_degrees"] is not None:
+        lines.append(f"Estimated rotation from target: {diff['rotation_degrees']:.0f} degrees")
+
+    for label, key in (
+        ("Target regions not matched yet", "missing"),
+        ("Current regions not on the target", "extra"),
+    ):
+        for cluster in diff[key]:
+            lines.append(
+                f"{label}: {cluster['count']} vertices around "
+                f"{_vector(cluster['center'])}, spanning {_vector(cluster['size'])}"
+            )
+    return "\n".join(lines)
@@ -0,0 +1,148 @@
+"""
+Cache of LLM hints keyed by what the learner has done so far.
+
+Many learners reach the same intermediate state on the same problem, and
+asking llava again for each of them costs seconds per hint. A hint is
+stored under (questionName, a quantised signature of the user's mesh, the
+normalised action sequence) in a small SQLite file, so a later learner in
+the same state gets it immediately, even after a restart. Entries expire
+after a TTL and the least recently used ones are evicted past a size limit.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+HINT_CACHE_MAX_ENTRIES = int(os.environ.get("HINT_CACHE_MAX_ENTRIES", "2000"))
+HINT_CACHE_TTL = float(os.environ.get("HINT_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+def geometry_signature(points, quantum: float) -> str:
+    """
+    Hash a mesh's vertex positions snapped to a grid of `quantum`, ignoring
+    vertex order, so meshes that only differ by less than the matching
+    tolerance (or by vertex numbering) share a signature.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    snapped = np.round(points / quantum).astype(np.int64)
+    if len(snapped):
+        snapped = snapped[np.lexsort(snapped.T[::-1])]
+    return hashlib.sha256(snapped.tobytes()).hexdigest()
+
+
+def normalise_actions(actions) -> tuple:
+    """Collapse runs of the same action, e.g. three Moves in a row count once."""
+    normalised = []
+    for action in actions:
+        action = action.strip()
+        if action and (not normalised or normalised[-1] != action):
+            normalised.append(action)
+    return tuple(normalised)
+
+
+def hint_key(question_name: str, signature: str, actions, hint_number: int = 0) -> str:
+    """
+    :param hint_number: how many hints the learner already had on this
+        problem, so asking again in the same state gets the next hint
+        rather than the one they just read
+    """
+    digest = hashlib.sha256()
+    for part in (str(question_name), signature, str(hint_number), *normalise_actions(actions)):
+        digest.update(part.encode("utf-8") + b"\0")
+    return digest.hexdigest()
+
+
+class HintCache:
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = HINT_CACHE_MAX_ENTRIES,
+        ttl: float = HINT_CACHE_TTL,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.llm_seconds_saved = 0.0
+
+        # Used from the main thread and from the LLM worker threads
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS hints (
+                    key TEXT PRIMARY KEY,
+                    hint TEXT NOT NULL,
+                    llm_seconds REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS hints_last_used ON hints (last_used)"
+            )
+
+    def get(self, key: str):
+        """Return the stored hint for `key`, or None on a miss."""
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT hint, llm_seconds, created_at FROM hints WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is not None and now - row[2] > self.ttl:
+                self._db.execute("DELETE FROM hints WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._db.execute(
+                "UPDATE hints SET last_used = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+            self.llm_seconds_saved += row[1]
+            return row[0]
+
+    def put(self, key: str, hint: str, llm_seconds: float):
+        """Store a hint along with how long the LLM took to produce it."""
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO hints VALUES (?, ?, ?, ?, ?)",
+                (key, hint, llm_seconds, now, now),
+            )
+            self._db.execute(
+                "DELETE FROM hints WHERE created_at < ?", (now - self.ttl,)
+            )
+            self._db.execute(
+                """
+                DELETE FROM hints WHERE key IN (
+                    SELECT key FROM hints ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM hints").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "llm_seconds_saved": self.llm_seconds_saved,
+                "entries": entries,
+            }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
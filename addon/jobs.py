@@ -0,0 +1,201 @@
+"""
+Asynchronous job queue for conversions.
+
+Jobs are queued by priority on the server's event loop and run on a small
+thread pool, so a long Blender conversion never ties up a request handler.
+The queue is bounded: once `max_pending` jobs are waiting, new submissions
+are refused instead of piling up.
+"""
+
+import asyncio
+import itertools
+import json
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+# Lower runs first
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class Job:
+    def __init__(self, job_id: str, priority: str, payload):
+        self.id = job_id
+        self.priority = priority
+        self.payload = payload
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._changed = asyncio.Condition()
+        self._version = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    async def _set(self, **fields):
+        async with self._changed:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self._version += 1
+            self._changed.notify_all()
+
+    async def wait(self):
+        """Wait until the job has finished, successfully or not."""
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.finished)
+
+    async def updates(self):
+        """Yield the job state now and after every change until it finishes."""
+        seen = -1
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self._version != seen)
+                seen = self._version
+                state = self.to_dict()
+            yield state
+            if state["status"] in ("done", "failed"):
+                return
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "priority": self.priority,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """
+    :param handler: blocking function `handler(job_id, payload) -> dict` run
+        for every job on the thread pool. Exceptions mark the job as failed;
+        an `HTTPException`'s detail is kept as the job's error.
+    """
+
+    def __init__(
+        self,
+        handler,
+        concurrency: int = 2,
+        max_pending: int = 32,
+        keep_finished: int = 256,
+    ):
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.max_pending = max_pending
+        self.keep_finished = keep_finished
+        self._jobs = OrderedDict()
+        self._sequence = itertools.count()
+        self._queue = None
+        self._executor = None
+        self._workers = []
+
+    async def start(self):
+        self._queue = asyncio.PriorityQueue(maxsize=self.max_pending)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="job"
+        )
+        self._workers = [
+            asyncio.create_task(self._work()) for _ in range(self.concurrency)
+        ]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def submit(self, payload, priority: str = "normal", job_id: str = None) -> Job:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}")
+
+        job = Job(job_id or str(uuid.uuid4()), priority, payload)
+        try:
+            self._queue.put_nowait((PRIORITIES[priority], next(self._sequence), job))
+        except asyncio.QueueFull:
+            raise QueueFullError(f"{self.max_pending} jobs already waiting")
+
+        self._jobs[job.id] = job
+        self._forget_finished()
+        return job
+
+    def get(self, job_id: str):
+        return self._jobs.get(job_id)
+
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[: max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    async def _work(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                await job._set(status="running", started_at=time.time())
+                try:
+                    result = await loop.run_in_executor(
+                        self._executor, self.handler, job.id, job.payload
+                    )
+                except HTTPException as e:
+                    await job._set(
+                        status="failed", error=e.detail, finished_at=time.time()
+                    )
+                except Exception as e:
+                    await job._set(
+                        status="failed", error=str(e), finished_at=time.time()
+                    )
+                else:
+                    await job._set(
+                        status="done", result=result, finished_at=time.time()
+                    )
+                # The payload is not needed once the job has run
+                job.payload = None
+            finally:
+                self._queue.task_done()
+
+
+def jobs_router(job_queue: JobQueue) -> APIRouter:
+    """Routes to inspect jobs of `job_queue`: status and a progress stream."""
+    router = APIRouter()
+
+    def _get_job(job_id: str) -> Job:
+        job = job_queue.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Unknown job")
+        return job
+
+    @router.get("/jobs/{job_id}")
+    def job_status(job_id: str):
+        return _get_job(job_id).to_dict()
+
+    @router.get("/jobs/{job_id}/events")
+    async def job_events(job_id: str):
+        job = _get_job(job_id)
+
+        async def stream():
+            async for state in job.updates():
+                yield f"data: {json.dumps(state)}\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return router
@@ -0,0 +1,373 @@
+"""
+Streaming ingest of JSON problem uploads.
+
+Large problems used to be parsed into one big Python object graph, validated
+by Pydantic and serialised again before Blender ever saw them. Here the raw
+request body is streamed straight to disk and then checked with a small pull
+parser that walks the "objects" array one object, and inside each object one
+vertex or face, at a time. Only the scalar problem fields are kept in memory;
+the cache key is hashed along the way (see conversion_cache.ObjectsHasher).
+
+`load_problem_file` walks the file the same way but keeps the meshes, packed
+into the NumPy arrays `mesh_format.decode` returns, so a loaded problem
+never becomes a list of lists either.
+"""
+
+import json
+import os
+import re
+import uuid
+from array import array
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+
+from conversion_cache import ObjectsHasher, faces_bytes, value_bytes
+
+_CHUNK_SIZE = 1 << 16
+# Coordinates hashed per batch while walking the vertices
+_HASH_BATCH = 1 << 14
+
+# Longest single value (a vertex, a face, a scalar field) we will buffer
+_MAX_VALUE_CHARS = 1 << 20
+
+_decoder = json.JSONDecoder()
+_NOT_WHITESPACE = re.compile(r"[^ \t\n\r]")
+# What may follow a decoded number if the number itself isn't finished yet
+# ("1." | "5", "1.5e" | "+10")
+_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*\Z")
+
+
+class IngestError(ValueError):
+    """The upload is not valid JSON or not a valid problem."""
+
+
+class UploadedProblem:
+    """A validated problem upload that lives on disk."""
+
+    def __init__(self, path: str, fields: dict, objects_hash: str, vertex_count: int):
+        self.path = path
+        # Problem fields other than "objects"
+        self.fields = fields
+        self.objects_hash = objects_hash
+        self.vertex_count = vertex_count
+
+
+class _JsonReader:
+    """Pull parser over a text file that never holds more than one value."""
+
+    def __init__(self, f):
+        self._f = f
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self._fills = 0
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._f.read(_CHUNK_SIZE)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos :] + chunk
+        self._pos = 0
+        self._fills += 1
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            match = _NOT_WHITESPACE.search(self._buf, self._pos)
+            if match:
+                self._pos = match.start()
+                return self._buf[self._pos]
+            self._pos = len(self._buf)
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise IngestError(f"Expected {char!r} but found {found or 'end of input'!r}")
+        self._pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError as e:
+                if len(self._buf) - self._pos < _MAX_VALUE_CHARS and self._fill():
+                    continue
+                raise IngestError(f"Invalid JSON: {e}")
+            # A number running into the end of the buffer may continue in the
+            # next chunk, also when the chunk ends just after its "." or "e"
+            if (
+                isinstance(value, (int, float))
+                and not isinstance(value, bool)
+                and _NUMBER_TAIL.match(self._buf, end)
+                and self._fill()
+            ):
+                continue
+            self._pos = end
+            return value
+
+    def array_items(self):
+        """Consume a JSON array, yielding once per item for the caller to read."""
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield
+            if self.peek() == ",":
+                self._pos += 1
+            else:
+                self.expect("]")
+                return
+
+    def array_batches(self):
+        """
+        Consume a JSON array whose items are arrays (vertices, faces),
+        yielding lists of items. All complete items in the buffer are decoded
+        with a single `raw_decode` call; items that straddle a chunk boundary
+        or do not decode that way are read one at a time.
+        """
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+
+        no_batch_until = -1
+        while True:
+            if self._fills > no_batch_until:
+                # Every item but the last is followed by "],"
+                cut = self._buf.rfind("],", self._pos)
+                if cut != -1:
+                    text = "[" + self._buf[self._pos : cut + 1] + "]"
+                    try:
+                        items, end = _decoder.raw_decode(text)
+                    except json.JSONDecodeError:
+                        end = -1
+                    if end == len(text):
+                        self._pos = cut + 2
+                        yield items
+                        continue
+                # The cut ran past the end of this array (or the input is
+                # invalid), go item by item until the next chunk is read
+                no_batch_until = self._fills
+
+            yield [self.value()]
+            if self.peek() == ",":
+                self._pos += 1
+            else:
+                self.expect("]")
+                return
+
+    def object_keys(self):
+        """Consume a JSON object, yielding each key for the caller to read its value."""
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise IngestError("Object keys must be strings")
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self._pos += 1
+            else:
+                self.expect("}")
+                return
+
+    def end(self):
+        if self.peek():
+            raise IngestError("Unexpected data after the problem")
+
+
+def _read_vertices(reader: _JsonReader, hasher: ObjectsHasher, out: array = None) -> int:
+    """
+    :param out: if given, every coordinate is appended to it
+    """
+    count = 0
+    batch = array("d")
+    for vertices in reader.array_batches():
+        for vertex in vertices:
+            if type(vertex) is not list or len(vertex) != 3:
+                raise IngestError(f"Vertex {count} must be a list of 3 numbers")
+            try:
+                batch.extend(vertex)
+            except TypeError:
+                raise IngestError(f"Vertex {count} must be a list of 3 numbers")
+            count += 1
+        if len(batch) >= _HASH_BATCH:
+            hasher.update_field("vertices", batch.tobytes())
+            if out is not None:
+                out.extend(batch)
+            del batch[:]
+    hasher.update_field("vertices", batch.tobytes())
+    if out is not None:
+        out.extend(batch)
+    return count
+
+
+def _read_faces(
+    reader: _JsonReader,
+    hasher: ObjectsHasher,
+    offsets: array = None,
+    indices: array = None,
+) -> int:
+    """
+    Return the largest vertex index used, or -1 without faces.
+
+    :param offsets: if given, the end offset of every face is appended to it
+    :param indices: if given (with `offsets`), every face's vertex indices
+    """
+    max_index = -1
+    face_number = 0
+    hasher.update_field("faces", b"")
+    for faces in reader.array_batches():
+        for face in faces:
+            try:
+                if type(face) is not list or not face or min(face) < 0:
+                    raise TypeError
+                max_index = max(max_index, max(face))
+                if indices is not None:
+                    indices.extend(face)
+                    offsets.append(len(indices))
+            except (TypeError, OverflowError):
+                raise IngestError(f"Face {face_number} must be a list of vertex indices")
+            face_number += 1
+        try:
+            hasher.update_field("faces", faces_bytes(faces))
+        except TypeError:
+            raise IngestError("Face vertex indices must be integers")
+    return max_index
+
+
+def _read_objects(reader: _JsonReader, hasher: ObjectsHasher, objects: list = None) -> int:
+    """
+    :param objects: if given, each object's name and mesh arrays are
+        appended to it as a dict shaped like `mesh_format.decode`'s objects
+    """
+    total_vertices = 0
+    for object_number, _ in enumerate(reader.array_items()):
+        hasher.begin_object()
+        seen = set()
+        vertex_count = 0
+        max_index = -1
+        name = None
+        coordinates = offsets = indices = None
+        if objects is not None:
+            coordinates = array("d")
+            offsets = array("q", [0])
+            indices = array("q")
+        for key in reader.object_keys():
+            seen.add(key)
+            if key == "vertices":
+                vertex_count = _read_vertices(reader, hasher, coordinates)
+            elif key == "faces":
+                max_index = _read_faces(reader, hasher, offsets, indices)
+            else:
+                value = reader.value()
+                if key == "name":
+                    if not isinstance(value, str):
+                        raise IngestError(f"Object {object_number} name must be a string")
+                    name = value
+                hasher.update_field(key, value_bytes(value))
+        hasher.end_object()
+
+        missing = {"name", "vertices", "faces"} - seen
+        if missing:
+            raise IngestError(
+                f"Object {object_number} is missing {', '.join(sorted(missing))}"
+            )
+        if max_index >= vertex_count:
+            raise IngestError(
+                f"Object {object_number} has a face using vertex {max_index} "
+                f"but only {vertex_count} vertices"
+            )
+        total_vertices += vertex_count
+        if objects is not None:
+            objects.append(
+                {
+                    "name": name,
+                    "vertices": np.frombuffer(coordinates, dtype=np.float64)
+                    .astype(np.float32)
+                    .reshape(-1, 3),
+                    "face_offsets": np.frombuffer(offsets, dtype=np.int64).astype(np.uint32),
+                    "face_indices": np.frombuffer(indices, dtype=np.int64).astype(np.uint32),
+                }
+            )
+    return total_vertices
+
+
+def _read_problem(path: str, objects: list = None):
+    hasher = ObjectsHasher()
+    fields = {}
+    vertex_count = None
+    with open(path, "r", encoding="utf-8") as f:
+        reader = _JsonReader(f)
+        for key in reader.object_keys():
+            if key == "objects":
+                vertex_count = _read_objects(reader, hasher, objects)
+            else:
+                fields[key] = reader.value()
+        reader.end()
+
+    if vertex_count is None:
+        raise IngestError("Problem is missing 'objects'")
+    return fields, hasher.hexdigest(), vertex_count
+
+
+def validate_problem_file(path: str):
+    """
+    Check that `path` holds a problem JSON document.
+
+    :return: (fields, objects_hash, vertex_count) where `fields` are the
+        top-level values other than "objects"
+    :raises IngestError: on malformed JSON or an invalid problem
+    """
+    return _read_problem(path)
+
+
+def load_problem_file(path: str) -> dict:
+    """
+    Read and validate a problem JSON document into the same dict
+    `mesh_format.decode` returns: the problem fields plus "objects", each
+    with "name", (N, 3) float32 "vertices" and uint32
+    "face_offsets"/"face_indices".
+
+    :raises IngestError: on malformed JSON or an invalid problem
+    """
+    objects = []
+    fields, _, _ = _read_problem(path, objects)
+    return {**fields, "objects": objects}
+
+
+async def ingest_request(request, directory: str) -> UploadedProblem:
+    """
+    Stream the body of `request` into a new file in `directory`, then
+    validate it without loading it whole. The file is removed if it is not a
+    valid problem.
+    """
+    path = os.path.join(directory, f"upload-{uuid.uuid4()}.json")
+    try:
+        with open(path, "wb") as f:
+            async for chunk in request.stream():
+                f.write(chunk)
+        fields, objects_hash, vertex_count = await run_in_threadpool(
+            validate_problem_file, path
+        )
+    except UnicodeDecodeError as e:
+        os.remove(path)
+        raise IngestError(f"Upload is not UTF-8: {e}")
+    except BaseException:
+        os.remove(path)
+        raise
+
+    return UploadedProblem(path, fields, objects_hash, vertex_count)
@@ -0,0 +1,251 @@
+"""
+Long-lived client for the local Ollama server.
+
+Building a new ChatOllama and chain for every hint means a new HTTP client,
+and a cold connection, on every request. Instead one LLMClient per model is
+created up front and shared: its HTTP connections are kept alive between
+calls, at most `max_concurrent` requests are in flight at once, and
+`warm_up` asks Ollama to load the model before the first real request.
+
+Everything talks to `base_url`, so the client can be pointed at a stub
+server that mimics the Ollama API. OpenAICompatibleClient offers the same
+interface for local servers speaking the OpenAI chat completions API.
+"""
+
+import json
+import os
+import threading
+
+import httpx
+import requests
+from langchain_core.messages import convert_to_openai_messages
+from langchain_core.output_parsers import StrOutputParser
+from langchain_ollama import ChatOllama
+
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_HOST", "http://127.0.0.1:11434")
+# How long Ollama keeps the model loaded after the last request
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+LLM_MAX_CONCURRENT = int(os.environ.get("LLM_MAX_CONCURRENT", "2"))
+# Loading a model from disk can take a while the first time
+WARM_UP_TIMEOUT = 300
+# Longest a single request to an OpenAI-compatible server may take
+REQUEST_TIMEOUT = 300
+
+
+def _normalise_url(url: str) -> str:
+    # OLLAMA_HOST is often given as just host:port
+    if "://" not in url:
+        url = "http://" + url
+    return url.rstrip("/")
+
+
+class LLMClient:
+    """
+    :param model: Ollama model name, e.g. "llava"
+    :param max_concurrent: requests allowed in flight at once; callers past
+        that wait for a free slot
+    """
+
+    def __init__(
+        self,
+        model: str,
+        temperature: float = 0,
+        base_url: str = OLLAMA_BASE_URL,
+        keep_alive: str = OLLAMA_KEEP_ALIVE,
+        max_concurrent: int = LLM_MAX_CONCURRENT,
+    ):
+        self.model = model
+        self.name = f"ollama:{model}"
+        self.temperature = temperature
+        self.base_url = _normalise_url(base_url)
+        self.keep_alive = keep_alive
+        self.max_concurrent = max(1, max_concurrent)
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+        self._chat = None
+        self._chain = None
+
+    @property
+    def chat(self) -> ChatOllama:
+        """The shared chat model, created on first use."""
+        with self._lock:
+            if self._chat is None:
+                limits = httpx.Limits(
+                    max_connections=self.max_concurrent,
+                    max_keepalive_connections=self.max_concurrent,
+                )
+                self._chat = ChatOllama(
+                    model=self.model,
+                    temperature=self.temperature,
+                    base_url=self.base_url,
+                    keep_alive=self.keep_alive,
+                    client_kwargs={"limits": limits},
+                )
+                self._chain = self._chat | StrOutputParser()
+            return self._chat
+
+    @property
+    def chain(self):
+        """`chat | StrOutputParser()`, built once alongside the chat model."""
+        self.chat
+        return self._chain
+
+    def invoke(self, messages) -> str:
+        """Send `messages` and return the whole answer as text."""
+        with self._slots:
+            return self.chain.invoke(messages)
+
+    def stream(self, messages):
+        """Send `messages` and yield the answer text piece by piece."""
+        with self._slots:
+            for chunk in self.chain.stream(messages):
+                if chunk:
+                    yield chunk
+
+    async def ainvoke(self, messages) -> str:
+        """
+        Async `invoke`. Not limited by `max_concurrent`: async callers bound
+        their own concurrency (see server.py) so they can refuse work instead
+        of blocking.
+        """
+        return await self.chain.ainvoke(messages)
+
+    async def astream(self, messages):
+        """Async `stream`, with the same caveat as `ainvoke`."""
+        async for chunk in self.chain.astream(messages):
+            if chunk:
+                yield chunk
+
+    def warm_up(self, background: bool = True):
+        """
+        Ask Ollama to load the model now, so the first real request does not
+        pay for it. A request without a prompt only loads the model.
+
+        :param background: run in a daemon thread and return immediately
+        """
+        if background:
+            threading.Thread(target=self.warm_up, args=(False,), daemon=True).start()
+            return
+
+        try:
+            response = requests.post(
+                f"{self.base_url}/api/generate",
+                json={"model": self.model, "keep_alive": self.keep_alive},
+                timeout=WARM_UP_TIMEOUT,
+            )
+            response.raise_for_status()
+            print(f"LLM model {self.model} is loaded")
+        except Exception as e:
+            print(f"LLM warm-up for {self.model} failed:", e)
+
+
+class OpenAICompatibleClient:
+    """
+    Same interface as LLMClient for local servers that speak the OpenAI chat
+    completions API (llama.cpp server, vLLM, LM Studio, ...).
+
+    :param base_url: API root including the version, e.g.
+        "http://127.0.0.1:8080/v1"
+    """
+
+    def __init__(
+        self,
+        model: str,
+        base_url: str,
+        temperature: float = 0,
+        api_key: str = None,
+        max_concurrent: int = LLM_MAX_CONCURRENT,
+        timeout: float = REQUEST_TIMEOUT,
+    ):
+        self.model = model
+        self.name = f"openai:{model}"
+        self.temperature = temperature
+        self.base_url = _normalise_url(base_url)
+        self.max_concurrent = max(1, max_concurrent)
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._client_options = {
+            "base_url": self.base_url,
+            "headers": {"Authorization": f"Bearer {api_key}"} if api_key else {},
+            "limits": httpx.Limits(
+                max_connections=self.max_concurrent,
+                max_keepalive_connections=self.max_concurrent,
+            ),
+            "timeout": timeout,
+        }
+        self._client = httpx.Client(**self._client_options)
+        self._async_client = None
+
+    def _body(self, messages, stream: bool) -> dict:
+        return {
+            "model": self.model,
+            "messages": convert_to_openai_messages(messages),
+            "temperature": self.temperature,
+            "stream": stream,
+        }
+
+    def _aclient(self) -> httpx.AsyncClient:
+        # Created on first use, inside the event loop that will use it
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(**self._client_options)
+        return self._async_client
+
+    @staticmethod
+    def _answer(response: httpx.Response) -> str:
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"].get("content") or ""
+
+    @staticmethod
+    def _stream_chunk(line: str) -> str:
+        """Text of one server-sent event line of a streamed completion."""
+        if not line.startswith("data:"):
+            return ""
+        data = line[len("data:") :].strip()
+        if not data or data == "[DONE]":
+            return ""
+        choices = json.loads(data).get("choices") or [{}]
+        return choices[0].get("delta", {}).get("content") or ""
+
+    def invoke(self, messages) -> str:
+        with self._slots:
+            return self._answer(
+                self._client.post("/chat/completions", json=self._body(messages, False))
+            )
+
+    def stream(self, messages):
+        with self._slots:
+            with self._client.stream(
+                "POST", "/chat/completions", json=self._body(messages, True)
+            ) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    chunk = self._stream_chunk(line)
+                    if chunk:
+                        yield chunk
+
+    async def ainvoke(self, messages) -> str:
+        response = await self._aclient().post(
+            "/chat/completions", json=self._body(messages, False)
+        )
+        return self._answer(response)
+
+    async def astream(self, messages):
+        async with self._aclient().stream(
+            "POST", "/chat/completions", json=self._body(messages, True)
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                chunk = self._stream_chunk(line)
+                if chunk:
+                    yield chunk
+
+    def warm_up(self, background: bool = True):
+        """Open a connection ahead of the first request; these servers load their model at startup."""
+        if background:
+            threading.Thread(target=self.warm_up, args=(False,), daemon=True).start()
+            return
+
+        try:
+            self._client.get("/models").raise_for_status()
+            print(f"LLM backend {self.name} at {self.base_url} is reachable")
+        except Exception as e:
+            print(f"LLM warm-up for {self.name} failed:", e)
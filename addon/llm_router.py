@@ -0,0 +1,300 @@
+"""
+Routing of LLM requests across several configured backends.
+
+A router holds any number of backends (Ollama models of different sizes,
+OpenAI-compatible local servers) behind the LLMClient interface. It keeps a
+moving average of each backend's latency and error rate and sends every
+request to the fastest healthy one. A request that runs past the latency
+budget is hedged: the next backend is started as well and whichever answers
+first wins. A failing backend is failed over to the next one, and a backend
+that keeps failing is left out for a cooldown period.
+
+Backends are configured with a comma-separated spec, e.g.
+
+    ollama:llava,ollama:llava:7b@http://gpu-box:11434,openai:qwen2-vl@http://127.0.0.1:8080/v1
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from llm_client import OLLAMA_BASE_URL, LLMClient, OpenAICompatibleClient
+
+# Seconds a request may run before the next backend is started alongside it
+LLM_LATENCY_BUDGET = float(os.environ.get("LLM_LATENCY_BUDGET", "15"))
+# Weight of the newest sample in the moving averages
+STATS_SMOOTHING = 0.2
+# A backend whose moving error rate goes above this is rested for a while
+MAX_ERROR_RATE = 0.5
+BACKEND_COOLDOWN = 30.0
+
+
+class AllBackendsFailed(Exception):
+    """Every backend failed the request; `errors` maps backend name to error."""
+
+    def __init__(self, errors: dict):
+        super().__init__(
+            "; ".join(f"{name}: {error}" for name, error in errors.items())
+            or "No LLM backends configured"
+        )
+        self.errors = errors
+
+
+class BackendStats:
+    def __init__(self):
+        # Moving average of successful request time, None until measured
+        self.latency = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.down_until = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "latency": self.latency,
+            "error_rate": self.error_rate,
+            "requests": self.requests,
+            "failures": self.failures,
+            "healthy": self.down_until <= time.time(),
+        }
+
+
+class LLMRouter:
+    """
+    Same interface as LLMClient (`invoke`, `stream`, `ainvoke`, `astream`,
+    `warm_up`, `max_concurrent`), spread over `backends`.
+    """
+
+    def __init__(self, backends, latency_budget: float = LLM_LATENCY_BUDGET):
+        self.backends = list(backends)
+        self.latency_budget = latency_budget
+        self.max_concurrent = sum(backend.max_concurrent for backend in self.backends)
+        self._stats = {backend.name: BackendStats() for backend in self.backends}
+        self._lock = threading.Lock()
+        # Hedged requests run side by side on these threads
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, self.max_concurrent), thread_name_prefix="llm"
+        )
+
+    def ranked(self) -> list:
+        """
+        Backends in the order to try them: healthy ones by moving latency,
+        then healthy ones never measured (they get measured when a hedge or
+        failover reaches them), then resting ones as a last resort.
+        """
+        now = time.time()
+        with self._lock:
+
+            def order(backend):
+                stats = self._stats[backend.name]
+                resting = stats.down_until > now
+                return (resting, stats.latency is None, stats.latency or 0.0)
+
+            return sorted(self.backends, key=order)
+
+    def _record(self, backend, seconds: float = None, failed: bool = False):
+        with self._lock:
+            stats = self._stats[backend.name]
+            stats.requests += 1
+            stats.error_rate += STATS_SMOOTHING * (float(failed) - stats.error_rate)
+            if failed:
+                stats.failures += 1
+                if stats.error_rate > MAX_ERROR_RATE:
+                    stats.down_until = time.time() + BACKEND_COOLDOWN
+                    print(f"LLM backend {backend.name} is failing, resting it")
+            elif stats.latency is None:
+                stats.latency = seconds
+            else:
+                stats.latency += STATS_SMOOTHING * (seconds - stats.latency)
+
+    def _record_at_least(self, backend, seconds: float):
+        """
+        A request that was cut off after `seconds` took at least that long.
+        Raise the moving latency to it if it is lower, without counting a
+        request either way.
+        """
+        with self._lock:
+            stats = self._stats[backend.name]
+            if stats.latency is None or stats.latency < seconds:
+                stats.latency = seconds
+
+    def _timed_invoke(self, backend, messages) -> str:
+        started = time.perf_counter()
+        try:
+            answer = backend.invoke(messages)
+        except Exception:
+            self._record(backend, failed=True)
+            raise
+        self._record(backend, time.perf_counter() - started)
+        return answer
+
+    async def _timed_ainvoke(self, backend, messages) -> str:
+        started = time.perf_counter()
+        try:
+            answer = await backend.ainvoke(messages)
+        except asyncio.CancelledError:
+            # Lost a hedge race: not an error, and not a latency sample
+            # either, but it would have taken at least this long
+            self._record_at_least(backend, time.perf_counter() - started)
+            raise
+        except Exception:
+            self._record(backend, failed=True)
+            raise
+        self._record(backend, time.perf_counter() - started)
+        return answer
+
+    def invoke(self, messages) -> str:
+        candidates = self.ranked()
+        running = {}
+        errors = {}
+
+        def start_next():
+            backend = candidates.pop(0)
+            running[self._executor.submit(self._timed_invoke, backend, messages)] = backend
+
+        start_next()
+        while running:
+            done, _ = wait(
+                running,
+                timeout=self.latency_budget if candidates else None,
+                return_when=FIRST_COMPLETED,
+            )
+            if not done:
+                # Over budget: hedge with the next backend, keep waiting on both
+                start_next()
+                continue
+            for future in done:
+                backend = running.pop(future)
+                if future.exception() is None:
+                    # Any slower hedge finishes in the background and only
+                    # updates the stats
+                    return future.result()
+                errors[backend.name] = future.exception()
+            if not running and candidates:
+                start_next()
+        raise AllBackendsFailed(errors)
+
+    async def ainvoke(self, messages) -> str:
+        candidates = self.ranked()
+        running = {}
+        errors = {}
+
+        def start_next():
+            backend = candidates.pop(0)
+            running[asyncio.ensure_future(self._timed_ainvoke(backend, messages))] = backend
+
+        start_next()
+        try:
+            while running:
+                done, _ = await asyncio.wait(
+                    running,
+                    timeout=self.latency_budget if candidates else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    start_next()
+                    continue
+                for task in done:
+                    backend = running.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    errors[backend.name] = task.exception()
+                if not running and candidates:
+                    start_next()
+        finally:
+            for task in running:
+                task.cancel()
+        raise AllBackendsFailed(errors)
+
+    def stream(self, messages):
+        """
+        Stream from the best backend. Streams are not hedged; a backend that
+        fails before its first chunk is failed over to the next one.
+        """
+        errors = {}
+        for backend in self.ranked():
+            started = time.perf_counter()
+            produced = False
+            try:
+                for chunk in backend.stream(messages):
+                    produced = True
+                    yield chunk
+            except Exception as e:
+                self._record(backend, failed=True)
+                if produced:
+                    raise
+                errors[backend.name] = e
+                continue
+            self._record(backend, time.perf_counter() - started)
+            return
+        raise AllBackendsFailed(errors)
+
+    async def astream(self, messages):
+        """Async `stream`, with the same failover rules."""
+        errors = {}
+        for backend in self.ranked():
+            started = time.perf_counter()
+            produced = False
+            try:
+                async for chunk in backend.astream(messages):
+                    produced = True
+                    yield chunk
+            except Exception as e:
+                self._record(backend, failed=True)
+                if produced:
+                    raise
+                errors[backend.name] = e
+                continue
+            self._record(backend, time.perf_counter() - started)
+            return
+        raise AllBackendsFailed(errors)
+
+    def warm_up(self, background: bool = True):
+        for backend in self.backends:
+            backend.warm_up(background)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {name: stats.to_dict() for name, stats in self._stats.items()}
+
+
+def parse_backends(spec: str, temperature: float = 0) -> list:
+    """
+    Build backends from a comma-separated spec of `kind:model[@base_url]`,
+    where kind is "ollama" or "openai" (any OpenAI-compatible server).
+    """
+    backends = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        kind, _, rest = entry.partition(":")
+        model, _, base_url = rest.partition("@")
+        if not model:
+            raise ValueError(f"LLM backend {entry!r} has no model")
+        if kind == "ollama":
+            backend = LLMClient(
+                model, temperature=temperature, base_url=base_url or OLLAMA_BASE_URL
+            )
+        elif kind == "openai":
+            if not base_url:
+                raise ValueError(f"LLM backend {entry!r} needs @base_url")
+            backend = OpenAICompatibleClient(
+                model,
+                base_url,
+                temperature=temperature,
+                api_key=os.environ.get("OPENAI_API_KEY"),
+            )
+        else:
+            raise ValueError(f"Unknown LLM backend kind {kind!r} in {entry!r}")
+        # Tell apart the same model on different servers
+        if base_url:
+            backend.name += f"@{base_url}"
+        backends.append(backend)
+    return backends
+
+
+def create_router(spec: str, temperature: float = 0) -> LLMRouter:
+    return LLMRouter(parse_backends(spec, temperature))
@@ -0,0 +1,394 @@
+"""
+Vertex matching between the TARGET mesh and the user's meshes.
+
+Points are bucketed into a uniform grid whose cells are as wide as the match
+tolerance, so any point within the tolerance of a query lives in one of the 27
+cells around the query's own cell. Lookups are done for all queries at once
+with NumPy instead of comparing every target vertex against every user vertex.
+
+The grid only answers "is there a point within one cell width". For exact
+nearest distances at any range (the Hausdorff and Chamfer metrics),
+`point_tree` builds an index over the points: Blender's compiled
+`mathutils.kdtree` inside Blender, or PointTree, a NumPy k-d tree walked
+level by level for a block of queries at a time, where `mathutils` isn't
+available (tests, tools run with plain Python).
+"""
+
+import numpy as np
+
+try:
+    from mathutils import kdtree as _kdtree
+except ImportError:
+    _kdtree = None
+
+# Bits used per axis when packing a cell coordinate into a single int64 key.
+# Cells that wrap around share a key, which only adds candidates that the
+# exact distance check then rejects.
+_AXIS_BITS = 21
+_AXIS_MASK = (1 << _AXIS_BITS) - 1
+
+# The 27 cells around (and including) a cell, closest first so that hits are
+# usually found before the corner cells are visited.
+_NEIGHBOUR_OFFSETS = np.array(
+    sorted(
+        [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)],
+        key=lambda offset: sum(map(abs, offset)),
+    ),
+    dtype=np.int64,
+)
+
+
+def as_points(points) -> np.ndarray:
+    """Return `points` as a contiguous (N, 3) float64 array."""
+    return np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 3)
+
+
+def _cell_keys(cells: np.ndarray) -> np.ndarray:
+    return (
+        ((cells[:, 0] & _AXIS_MASK) << (2 * _AXIS_BITS))
+        | ((cells[:, 1] & _AXIS_MASK) << _AXIS_BITS)
+        | (cells[:, 2] & _AXIS_MASK)
+    )
+
+
+class VertexGrid:
+    """Uniform grid over a fixed set of points, used for radius queries."""
+
+    def __init__(self, points, cell_size: float):
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+
+        points = as_points(points)
+        self.cell_size = float(cell_size)
+
+        keys = _cell_keys(self._cells(points))
+        order = np.argsort(keys, kind="stable")
+        self._order = order
+        self._points = points[order]
+        # One entry per occupied cell: its key, first point and point count
+        self._cell_keys, self._cell_starts, self._cell_counts = np.unique(
+            keys[order], return_index=True, return_counts=True
+        )
+
+    def __len__(self):
+        return len(self._points)
+
+    def to_arrays(self) -> dict:
+        """The grid's arrays, for saving and rebuilding with `from_arrays`."""
+        return {
+            "cell_size": np.float64(self.cell_size),
+            "order": self._order,
+            "points": self._points,
+            "cell_keys": self._cell_keys,
+            "cell_starts": self._cell_starts,
+            "cell_counts": self._cell_counts,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: dict) -> "VertexGrid":
+        """Rebuild a grid from `to_arrays` output without sorting again."""
+        grid = cls.__new__(cls)
+        grid.cell_size = float(arrays["cell_size"])
+        grid._order = np.asarray(arrays["order"], dtype=np.int64)
+        grid._points = as_points(arrays["points"])
+        grid._cell_keys = np.asarray(arrays["cell_keys"], dtype=np.int64)
+        grid._cell_starts = np.asarray(arrays["cell_starts"], dtype=np.int64)
+        grid._cell_counts = np.asarray(arrays["cell_counts"], dtype=np.int64)
+        return grid
+
+    def _cells(self, points: np.ndarray) -> np.ndarray:
+        return np.floor(points / self.cell_size).astype(np.int64)
+
+    def nearest_within_cell(self, queries):
+        """
+        For each query, find the closest grid point that is at most one cell
+        width away.
+
+        :return: (distances, indices). Queries with no point in range get a
+            distance of inf and an index of -1. Indices refer to the points
+            the grid was built from.
+        """
+        return self._search(queries, first_hit_only=False)
+
+    def any_within_cell(self, queries) -> np.ndarray:
+        """
+        Return a boolean array telling whether each query has at least one
+        grid point within one cell width. Stops looking at a query as soon as
+        it has a hit, so it is much cheaper than a nearest search on dense
+        meshes.
+        """
+        _, indices = self._search(queries, first_hit_only=True)
+        return indices >= 0
+
+    def _search(self, queries, first_hit_only: bool):
+        queries = as_points(queries)
+        radius_sq = self.cell_size * self.cell_size
+        best_d2 = np.full(len(queries), np.inf)
+        best_idx = np.full(len(queries), -1, dtype=np.int64)
+
+        if len(queries) == 0 or len(self._points) == 0:
+            return np.sqrt(best_d2), best_idx
+
+        # Visiting queries in cell order keeps the binary searches below
+        # walking the sorted keys in step, which is far kinder to the cache.
+        query_cells = self._cells(queries)
+        query_order = np.argsort(_cell_keys(query_cells), kind="stable")
+        query_cells = query_cells[query_order]
+        queries = queries[query_order]
+
+        for offset in _NEIGHBOUR_OFFSETS:
+            if first_hit_only:
+                active = np.nonzero(best_d2 > radius_sq)[0]
+            else:
+                active = np.arange(len(queries))
+
+            neighbour_keys = _cell_keys(query_cells[active] + offset)
+            cell = np.searchsorted(self._cell_keys, neighbour_keys)
+            np.minimum(cell, len(self._cell_keys) - 1, out=cell)
+            occupied = self._cell_keys[cell] == neighbour_keys
+            active = active[occupied]
+            lo = self._cell_starts[cell[occupied]]
+            counts = self._cell_counts[cell[occupied]]
+
+            # Walk the k-th point of every neighbouring cell in lockstep,
+            # dropping queries once their cell is exhausted (or, when only a
+            # hit is needed, once they have one).
+            k = 0
+            while len(active):
+                candidates = lo + k
+                diff = self._points[candidates] - queries[active]
+                d2 = np.einsum("ij,ij->i", diff, diff)
+
+                closer = d2 < best_d2[active]
+                best_d2[active[closer]] = d2[closer]
+                best_idx[active[closer]] = candidates[closer]
+
+                k += 1
+                keep = counts > k
+                if first_hit_only:
+                    keep &= d2 > radius_sq
+                active, lo, counts = active[keep], lo[keep], counts[keep]
+
+        found = best_idx >= 0
+        best_idx[found] = self._order[best_idx[found]]
+        # Anything in a neighbouring cell but further than one cell width is
+        # not guaranteed to be the true nearest point, so drop it.
+        out_of_range = best_d2 > radius_sq
+        best_d2[out_of_range] = np.inf
+        best_idx[out_of_range] = -1
+
+        distances = np.empty_like(best_d2)
+        indices = np.empty_like(best_idx)
+        distances[query_order] = np.sqrt(best_d2)
+        indices[query_order] = best_idx
+        return distances, indices
+
+
+# Most points held by one leaf of a PointTree
+LEAF_SIZE = 16
+# Queries walked down a PointTree together; bounds the size of the
+# (query, node) pair arrays
+QUERY_BLOCK = 4096
+
+
+def _box_distance_sq(queries: np.ndarray, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+    gap = np.maximum(np.maximum(low - queries, queries - high), 0.0)
+    return np.einsum("ij,ij->i", gap, gap)
+
+
+class PointTree:
+    """
+    Balanced k-d tree over a fixed set of points, for exact nearest
+    distance queries.
+
+    Level l has 2**l nodes over equal slices of the sorted points, so a node
+    is just its index and the tree is a list of per-level bounding boxes.
+    Each level splits every node at the median of its widest axis with one
+    argsort over all points.
+    """
+
+    def __init__(self, points, leaf_size: int = LEAF_SIZE):
+        if leaf_size < 1:
+            raise ValueError("leaf_size must be at least 1")
+
+        points = as_points(points)
+        count = len(points)
+        self.depth = 0
+        while count > leaf_size << self.depth:
+            self.depth += 1
+
+        # (low, high) corners of every node's box, one pair of arrays per level
+        self._boxes = []
+        if count == 0:
+            self._leaves = np.empty((0, 1, 3))
+            return
+
+        for level in range(self.depth + 1):
+            nodes = 1 << level
+            starts = np.arange(nodes) * count // nodes
+            sizes = np.diff(np.append(starts, count))
+            low = np.minimum.reduceat(points, starts)
+            high = np.maximum.reduceat(points, starts)
+            self._boxes.append((low, high))
+            node_of = np.repeat(np.arange(nodes), sizes)
+            if level == self.depth:
+                break
+
+            # Sort by node, then by the coordinate along the node's widest
+            # axis scaled into [0, 1), so every node's slice splits in half
+            # at its median
+            extent = high - low
+            axis = np.argmax(extent, axis=1)
+            span = extent[np.arange(nodes), axis]
+            span[span <= 0] = 1.0
+            point_axis = axis[node_of]
+            coordinate = points[np.arange(count), point_axis] - low[node_of, point_axis]
+            key = node_of + np.minimum(coordinate / span[node_of], 0.999)
+            points = points[np.argsort(key, kind="stable")]
+
+        # Leaves padded to the same size with inf, so all distances to a
+        # leaf come out of one einsum
+        leaves = np.full((len(sizes), sizes.max(), 3), np.inf)
+        leaves[node_of, np.arange(count) - np.repeat(starts, sizes)] = points
+        self._leaves = leaves
+
+    def __len__(self):
+        return int(np.isfinite(self._leaves[:, :, 0]).sum())
+
+    def _leaf_distance_sq(self, queries: np.ndarray, leaves: np.ndarray) -> np.ndarray:
+        diff = self._leaves[leaves] - queries[:, None, :]
+        return np.einsum("ijk,ijk->ij", diff, diff).min(axis=1)
+
+    def nearest_distances(self, queries) -> np.ndarray:
+        """
+        Exact distance from each query to its nearest tree point, inf for
+        all queries if the tree is empty.
+        """
+        queries = as_points(queries)
+        distances = np.full(len(queries), np.inf)
+        if not len(self._boxes):
+            return distances
+
+        for start in range(0, len(queries), QUERY_BLOCK):
+            block = queries[start : start + QUERY_BLOCK]
+            distances[start : start + QUERY_BLOCK] = np.sqrt(self._nearest_sq(block))
+        return distances
+
+    def _nearest_sq(self, queries: np.ndarray) -> np.ndarray:
+        # Upper bound first: descend to the child whose box centre is closer
+        # and take the distance to that leaf's points
+        node = np.zeros(len(queries), dtype=np.int64)
+        for level in range(1, self.depth + 1):
+            low, high = self._boxes[level]
+            left = 2 * node
+            to_left = 2 * queries - (low[left] + high[left])
+            to_right = 2 * queries - (low[left + 1] + high[left + 1])
+            node = left + (
+                np.einsum("ij,ij->i", to_left, to_left)
+                > np.einsum("ij,ij->i", to_right, to_right)
+            )
+        best = self._leaf_distance_sq(queries, node)
+
+        # Then walk all (query, node) pairs whose box could still hold a
+        # closer point down to the leaves
+        pair_query = np.arange(len(queries))
+        pair_node = np.zeros(len(queries), dtype=np.int64)
+        for level in range(self.depth + 1):
+            low, high = self._boxes[level]
+            keep = (
+                _box_distance_sq(queries[pair_query], low[pair_node], high[pair_node])
+                <= best[pair_query]
+            )
+            pair_query, pair_node = pair_query[keep], pair_node[keep]
+            if level < self.depth:
+                pair_query = np.repeat(pair_query, 2)
+                pair_node = (2 * pair_node[:, None] + np.array([0, 1])).ravel()
+
+        if len(pair_query):
+            # Pairs stay grouped by query, so each query's minimum is one
+            # segment of a reduceat
+            distance_sq = self._leaf_distance_sq(queries[pair_query], pair_node)
+            starts = np.flatnonzero(np.r_[True, pair_query[1:] != pair_query[:-1]])
+            owners = pair_query[starts]
+            best[owners] = np.minimum(best[owners], np.minimum.reduceat(distance_sq, starts))
+        return best
+
+
+class BlenderPointTree:
+    """PointTree's interface over Blender's `mathutils.kdtree.KDTree`."""
+
+    def __init__(self, points):
+        points = as_points(points)
+        self._count = len(points)
+        self._tree = _kdtree.KDTree(self._count)
+        insert = self._tree.insert
+        for index, co in enumerate(points.tolist()):
+            insert(co, index)
+        self._tree.balance()
+
+    def __len__(self):
+        return self._count
+
+    def nearest_distances(self, queries) -> np.ndarray:
+        """Distance from each query to its nearest point, inf for all if there are none."""
+        queries = as_points(queries)
+        if not self._count:
+            return np.full(len(queries), np.inf)
+        find = self._tree.find
+        return np.fromiter(
+            (find(co)[2] for co in queries.tolist()), dtype=np.float64, count=len(queries)
+        )
+
+
+def point_tree(points):
+    """
+    Index over `points` for exact nearest distances: a BlenderPointTree
+    inside Blender, a PointTree elsewhere.
+    """
+    if _kdtree is not None:
+        return BlenderPointTree(points)
+    return PointTree(points)
+
+
+def match_vertices(target_verts, user_verts, tolerance: float) -> np.ndarray:
+    """
+    Mark each target vertex as matched if any user vertex is within
+    `tolerance` of it.
+
+    :return: boolean array with one entry per target vertex
+    """
+    target_verts = as_points(target_verts)
+    user_verts = as_points(user_verts)
+
+    if len(user_verts) == 0:
+        return np.zeros(len(target_verts), dtype=bool)
+
+    return VertexGrid(user_verts, tolerance).any_within_cell(target_verts)
+
+
+def face_match_scores(matched, face_offsets, face_indices):
+    """
+    Score every face from a per-vertex match array: a face passes when all
+    of its vertices are matched.
+
+    :param face_offsets: F + 1 loop offsets, as from `mesh_data.face_arrays`
+    :param face_indices: the vertex index of every loop
+    :return: (passed, ratios) with one entry per face: a boolean array and
+        the fraction of the face's vertices that are matched
+    """
+    matched = np.asarray(matched, dtype=bool)
+    face_offsets = np.asarray(face_offsets, dtype=np.int64)
+    loop_matched = matched[np.asarray(face_indices, dtype=np.int64)]
+    sizes = np.diff(face_offsets)
+    face_count = len(sizes)
+
+    # reduceat can't express empty segments, so faces without loops are
+    # left out; each remaining segment then runs up to the next face's start
+    filled = sizes > 0
+    starts = face_offsets[:-1][filled]
+    passed = np.ones(face_count, dtype=bool)
+    ratios = np.ones(face_count)
+    if len(starts):
+        passed[filled] = np.logical_and.reduceat(loop_matched, starts)
+        ratios[filled] = np.add.reduceat(loop_matched.astype(np.int64), starts) / sizes[filled]
+    return passed, ratios
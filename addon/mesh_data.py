@@ -0,0 +1,151 @@
+"""
+Bulk access to Blender mesh data as flat NumPy arrays.
+
+Everything here reads through `foreach_get` and writes through `foreach_set`,
+which copy a whole attribute in one C call instead of touching each
+vertex/polygon from Python. Nothing
+imports `bpy`, so the helpers work both in the addon and in the converter
+scripts run with `blender -b -P`.
+"""
+
+import numpy as np
+
+
+def vertex_coordinates(mesh, matrix=None) -> np.ndarray:
+    """
+    Return the vertex positions of `mesh` as an (N, 3) float32 array.
+
+    :param matrix: optional 4x4 matrix (e.g. `obj.matrix_world`) applied to
+        every vertex in a single batched multiply
+    """
+    coordinates = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", coordinates)
+    coordinates = coordinates.reshape(-1, 3)
+
+    if matrix is not None:
+        coordinates = transform_points(coordinates, matrix)
+    return coordinates
+
+
+def transform_points(points, matrix) -> np.ndarray:
+    """Apply a 4x4 affine matrix to an (N, 3) array of points."""
+    matrix = np.asarray(matrix, dtype=np.float64).reshape(4, 4)
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    transformed = points @ matrix[:3, :3].T + matrix[:3, 3]
+    # Blender stores coordinates as float32, keep the same precision
+    return transformed.astype(np.float32)
+
+
+def polygon_loops(mesh):
+    """
+    Return `(loop_starts, loop_totals)` for the polygons of `mesh`, both as
+    int32 arrays with one entry per polygon.
+    """
+    count = len(mesh.polygons)
+    loop_starts = np.empty(count, dtype=np.int32)
+    loop_totals = np.empty(count, dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", loop_starts)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    return loop_starts, loop_totals
+
+
+def loop_vertex_indices(mesh) -> np.ndarray:
+    """Return the vertex index of every loop of `mesh` as an int32 array."""
+    vertex_indices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", vertex_indices)
+    return vertex_indices
+
+
+def polygon_vertex_lists(mesh) -> list:
+    """Return the faces of `mesh` as a list of vertex index lists."""
+    loop_starts, loop_totals = polygon_loops(mesh)
+    vertex_indices = loop_vertex_indices(mesh).tolist()
+    return [
+        vertex_indices[start : start + total]
+        for start, total in zip(loop_starts.tolist(), loop_totals.tolist())
+    ]
+
+
+def polygon_face_arrays(mesh):
+    """
+    Return the faces of `mesh` as `(face_offsets, face_indices)`, the same
+    layout as `face_arrays`.
+    """
+    _, loop_totals = polygon_loops(mesh)
+    face_offsets = np.zeros(len(loop_totals) + 1, dtype=np.int32)
+    np.cumsum(loop_totals, out=face_offsets[1:])
+    return face_offsets, loop_vertex_indices(mesh)
+
+
+def face_arrays(faces):
+    """
+    Flatten a list of faces (vertex index lists) into `(face_offsets,
+    face_indices)`: face i uses face_indices[face_offsets[i]:face_offsets[i + 1]].
+    """
+    face_offsets = np.zeros(len(faces) + 1, dtype=np.int32)
+    face_offsets[1:] = np.cumsum([len(face) for face in faces])
+    face_indices = np.fromiter(
+        (index for face in faces for index in face),
+        dtype=np.int32,
+        count=int(face_offsets[-1]),
+    )
+    return face_offsets, face_indices
+
+
+def problem_mesh_arrays(obj_data: dict):
+    """
+    Return `(vertices, face_offsets, face_indices)` for one object of a
+    problem, whether it holds JSON lists ("vertices"/"faces") or decoded
+    .bmesh arrays ("vertices"/"face_offsets"/"face_indices").
+    """
+    vertices = obj_data["vertices"]
+    if "face_offsets" in obj_data:
+        return vertices, obj_data["face_offsets"], obj_data["face_indices"]
+    return vertices, *face_arrays(obj_data["faces"])
+
+
+def fill_mesh(mesh, vertices, face_offsets, face_indices):
+    """
+    Fill an empty mesh from flat arrays with one `foreach_set` per
+    attribute, then build its edges and validate it once.
+
+    :param vertices: (N, 3) vertex positions
+    :param face_offsets: F + 1 loop offsets, as from `face_arrays`
+    :param face_indices: the vertex index of every loop
+    """
+    vertices = np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1, 3)
+    face_offsets = np.ascontiguousarray(face_offsets, dtype=np.int32)
+    face_indices = np.ascontiguousarray(face_indices, dtype=np.int32)
+    face_count = len(face_offsets) - 1
+
+    mesh.vertices.add(len(vertices))
+    mesh.loops.add(len(face_indices))
+    mesh.polygons.add(face_count)
+
+    mesh.vertices.foreach_set("co", vertices.ravel())
+    mesh.loops.foreach_set("vertex_index", face_indices)
+    mesh.polygons.foreach_set("loop_start", face_offsets[:-1])
+    try:
+        mesh.polygons.foreach_set("loop_total", np.diff(face_offsets))
+    except (AttributeError, TypeError):
+        # Newer Blender derives loop_total from loop_start and makes it
+        # read-only
+        pass
+
+    mesh.update(calc_edges=True)
+    mesh.validate(clean_customdata=False)
+    return mesh
+
+
+def edge_vertex_pairs(mesh) -> np.ndarray:
+    """Return the two vertex indices of every edge of `mesh` as an (E, 2) int32 array."""
+    pairs = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get("vertices", pairs)
+    return pairs.reshape(-1, 2)
+
+
+def set_polygon_materials(mesh, material_indices):
+    """Assign every polygon of `mesh` its material slot in one `foreach_set`."""
+    material_indices = np.ascontiguousarray(material_indices, dtype=np.int32)
+    mesh.polygons.foreach_set("material_index", material_indices)
+    mesh.update()
@@ -0,0 +1,226 @@
+"""
+Compact binary interchange format for problem meshes (.bmesh).
+
+Pretty-printed JSON spends most of its bytes on whitespace and is slow to
+parse. A .bmesh file holds the same problem as packed little-endian arrays
+that `numpy.frombuffer` can view without copying:
+
+    header    magic b"BLTM", version, meta_len, object_count   (4 x u32)
+    meta      UTF-8 JSON with the problem fields other than "objects",
+              padded to 4 bytes
+    table     per object: name_len, vertex_count, face_count, index_count
+              (4 x u32)
+    names     UTF-8 object names back to back, padded to 4 bytes
+    data      per object: float32 vertices[vertex_count * 3],
+              u32 face_offsets[face_count + 1], u32 face_indices[index_count]
+
+Face i of an object uses face_indices[face_offsets[i]:face_offsets[i + 1]].
+Everything from the table onwards only depends on the meshes, so it doubles
+as the cache key input for conversions.
+"""
+
+import json
+import mmap
+import struct
+
+import numpy as np
+
+MAGIC = b"BLTM"
+VERSION = 1
+MEDIA_TYPE = "application/vnd.bleet.mesh"
+EXTENSION = ".bmesh"
+
+_HEADER = struct.Struct("<4sIII")
+_OBJECT_ENTRY = struct.Struct("<IIII")
+
+
+class MeshFormatError(ValueError):
+    """The buffer is not a valid .bmesh file."""
+
+
+def _padding(length: int) -> bytes:
+    return b"\0" * (-length % 4)
+
+
+def encode(problem: dict) -> bytes:
+    """
+    Encode a problem dict (as stored in the JSON files) into .bmesh bytes.
+    Vertices and faces may be nested lists or arrays.
+    """
+    meta = {key: value for key, value in problem.items() if key != "objects"}
+    meta_bytes = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+    objects = problem.get("objects", [])
+
+    table = []
+    names = []
+    data = []
+    for obj in objects:
+        name = str(obj.get("name", "")).encode("utf-8")
+        vertices = np.asarray(obj.get("vertices", []), dtype="<f4").reshape(-1, 3)
+        faces = obj.get("faces", [])
+        face_offsets = np.zeros(len(faces) + 1, dtype="<u4")
+        face_offsets[1:] = np.cumsum([len(face) for face in faces])
+        face_indices = np.fromiter(
+            (index for face in faces for index in face),
+            dtype="<u4",
+            count=int(face_offsets[-1]),
+        )
+
+        table.append(
+            _OBJECT_ENTRY.pack(
+                len(name), len(vertices), len(faces), len(face_indices)
+            )
+        )
+        names.append(name)
+        data.extend([vertices.tobytes(), face_offsets.tobytes(), face_indices.tobytes()])
+
+    names_bytes = b"".join(names)
+    return b"".join(
+        [
+            _HEADER.pack(MAGIC, VERSION, len(meta_bytes), len(objects)),
+            meta_bytes,
+            _padding(len(meta_bytes)),
+            *table,
+            names_bytes,
+            _padding(len(names_bytes)),
+            *data,
+        ]
+    )
+
+
+def _read_header(buffer):
+    if len(buffer) < _HEADER.size:
+        raise MeshFormatError("Buffer too short for a .bmesh header")
+    magic, version, meta_len, object_count = _HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise MeshFormatError("Not a .bmesh buffer")
+    if version != VERSION:
+        raise MeshFormatError(f"Unsupported .bmesh version {version}")
+    return meta_len, object_count
+
+
+def read_meta(buffer) -> dict:
+    """Return the problem fields (everything but the meshes)."""
+    meta_len, _ = _read_header(buffer)
+    end = _HEADER.size + meta_len
+    if len(buffer) < end:
+        raise MeshFormatError("Truncated .bmesh metadata")
+    try:
+        meta = json.loads(bytes(buffer[_HEADER.size : end]).decode("utf-8"))
+    except ValueError as e:
+        raise MeshFormatError(f"Invalid .bmesh metadata: {e}")
+    if not isinstance(meta, dict):
+        raise MeshFormatError("Invalid .bmesh metadata: not an object")
+    return meta
+
+
+def objects_section(buffer) -> memoryview:
+    """Return the part of the buffer that describes the meshes only."""
+    meta_len, _ = _read_header(buffer)
+    start = _HEADER.size + meta_len + len(_padding(meta_len))
+    return memoryview(buffer)[start:]
+
+
+def decode(buffer) -> dict:
+    """
+    Decode .bmesh bytes (or any buffer, e.g. an mmap) into a problem dict.
+
+    Each object has "name", "vertices" as an (N, 3) float32 array and
+    "face_offsets"/"face_indices" as uint32 arrays. The arrays are read-only
+    views into `buffer`, so nothing is copied.
+    """
+    meta = read_meta(buffer)
+    meta_len, object_count = _read_header(buffer)
+    offset = _HEADER.size + meta_len + len(_padding(meta_len))
+
+    try:
+        entries = [
+            _OBJECT_ENTRY.unpack_from(buffer, offset + i * _OBJECT_ENTRY.size)
+            for i in range(object_count)
+        ]
+    except struct.error:
+        raise MeshFormatError("Truncated .bmesh object table")
+    offset += object_count * _OBJECT_ENTRY.size
+
+    names_len = sum(entry[0] for entry in entries)
+    names = bytes(buffer[offset : offset + names_len])
+    offset += names_len + len(_padding(names_len))
+
+    objects = []
+    name_start = 0
+    for name_len, vertex_count, face_count, index_count in entries:
+        try:
+            name = names[name_start : name_start + name_len].decode("utf-8")
+        except UnicodeDecodeError as e:
+            raise MeshFormatError(f"Invalid .bmesh object name: {e}")
+        name_start += name_len
+
+        arrays = []
+        for dtype, count in (
+            ("<f4", vertex_count * 3),
+            ("<u4", face_count + 1),
+            ("<u4", index_count),
+        ):
+            try:
+                arrays.append(
+                    np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+                )
+            except ValueError:
+                raise MeshFormatError(f"Truncated .bmesh data for object {name!r}")
+            offset += count * 4
+
+        vertices, face_offsets, face_indices = arrays
+        # Offsets must start at 0, never decrease and end at the index count
+        if (
+            int(face_offsets[0]) != 0
+            or int(face_offsets[-1]) != index_count
+            or not np.all(np.diff(face_offsets.astype(np.int64)) >= 0)
+            or (index_count and int(face_indices.max()) >= vertex_count)
+        ):
+            raise MeshFormatError(f"Inconsistent faces for object {name!r}")
+        objects.append(
+            {
+                "name": name,
+                "vertices": vertices.reshape(-1, 3),
+                "face_offsets": face_offsets,
+                "face_indices": face_indices,
+            }
+        )
+
+    return {**meta, "objects": objects}
+
+
+def faces_as_lists(obj: dict) -> list:
+    """Return the faces of a decoded object as a list of vertex index lists."""
+    offsets = obj["face_offsets"].tolist()
+    indices = obj["face_indices"].tolist()
+    return [indices[start:end] for start, end in zip(offsets, offsets[1:])]
+
+
+def to_json_problem(problem: dict) -> dict:
+    """Turn a decoded problem back into the plain lists used by the JSON files."""
+    objects = [
+        {
+            "name": obj["name"],
+            "vertices": obj["vertices"].tolist(),
+            "faces": faces_as_lists(obj),
+        }
+        for obj in problem["objects"]
+    ]
+    return {**problem, "objects": objects}
+
+
+def read(path: str) -> dict:
+    """Memory-map a .bmesh file and decode it without reading it into memory."""
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return decode(mapped)
+
+
+def write(path: str, problem: dict):
+    with open(path, "wb") as f:
+        f.write(encode(problem))
+
+
+def is_mesh_file(path: str) -> bool:
+    return path.lower().endswith(EXTENSION)
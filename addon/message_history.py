@@ -0,0 +1,156 @@
+"""
+Bounded conversation history for the hint/feedback LLM.
+
+Every Hint and Submit sends a screenshot along with its prompt, and the whole
+conversation is re-sent each time. Kept as a plain list, the request grows
+by a full base64 image per turn for the rest of the session. MessageHistory
+keeps the system prompt and the last `max_turns` turns, replaces the images
+of all but the newest `keep_images` turns with a short placeholder, and can
+fold the turns it drops into a text summary so earlier hints are not lost.
+"""
+
+import json
+import os
+import threading
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+HISTORY_MAX_TURNS = int(os.environ.get("LLM_HISTORY_MAX_TURNS", "6"))
+HISTORY_KEEP_IMAGES = int(os.environ.get("LLM_HISTORY_KEEP_IMAGES", "1"))
+# Longest summary of dropped turns kept in the prompt
+SUMMARY_MAX_CHARS = 2000
+
+IMAGE_PLACEHOLDER = "[earlier screenshot omitted]"
+
+# Rough size of a token for the request logs
+_CHARS_PER_TOKEN = 4
+
+
+def _is_image_part(part) -> bool:
+    return isinstance(part, dict) and part.get("type") == "image_url"
+
+
+def strip_images(message: HumanMessage) -> HumanMessage:
+    """Return `message` with every image part replaced by a text placeholder."""
+    if isinstance(message.content, str) or not any(
+        _is_image_part(part) for part in message.content
+    ):
+        return message
+    content = [
+        {"type": "text", "text": IMAGE_PLACEHOLDER} if _is_image_part(part) else part
+        for part in message.content
+    ]
+    return HumanMessage(content=content)
+
+
+def summarize_turns(turns, previous_summary: str = "") -> str:
+    """
+    Default summary of dropped turns: the answers already given, which is
+    what the model needs to avoid repeating itself. Prompts are left out,
+    they are regenerated from the scene on every request anyway.
+    """
+    lines = [previous_summary] if previous_summary else []
+    for _, answer in turns:
+        text = " ".join(str(answer.content).split())
+        if text:
+            lines.append(f"- {text}")
+    summary = "\n".join(lines)
+    # Keep the most recent part if it gets too long
+    return summary[-SUMMARY_MAX_CHARS:]
+
+
+def request_stats(messages) -> dict:
+    """Size of a request: total bytes, image bytes and estimated text tokens."""
+    total_bytes = 0
+    image_bytes = 0
+    text_chars = 0
+    for message in messages:
+        parts = (
+            [{"type": "text", "text": message.content}]
+            if isinstance(message.content, str)
+            else message.content
+        )
+        for part in parts:
+            size = len(json.dumps(part).encode("utf-8"))
+            total_bytes += size
+            if _is_image_part(part):
+                image_bytes += size
+            elif isinstance(part, dict):
+                text_chars += len(part.get("text", ""))
+            else:
+                text_chars += len(str(part))
+    return {
+        "messages": len(messages),
+        "bytes": total_bytes,
+        "image_bytes": image_bytes,
+        "text_tokens": text_chars // _CHARS_PER_TOKEN,
+    }
+
+
+class MessageHistory:
+    """
+    :param system_prompt: sent first on every request
+    :param max_turns: user/assistant turns kept verbatim
+    :param keep_images: newest turns that keep their screenshot; the current
+        request's own image is always sent
+    :param summarize: what to do with turns past `max_turns`. False drops
+        them, True uses `summarize_turns`, or pass a callable with the same
+        signature (e.g. one that asks the LLM).
+    """
+
+    def __init__(
+        self,
+        system_prompt: str,
+        max_turns: int = HISTORY_MAX_TURNS,
+        keep_images: int = HISTORY_KEEP_IMAGES,
+        summarize=True,
+    ):
+        self.system_prompt = system_prompt
+        self.max_turns = max(0, max_turns)
+        self.keep_images = max(0, keep_images)
+        self.summarize = summarize_turns if summarize is True else summarize
+        self.summary = ""
+        # (HumanMessage, AIMessage) pairs, oldest first
+        self._turns = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def messages(self, new_message: HumanMessage = None) -> list:
+        """
+        Build the message list to send: system prompt, summary of older
+        turns, the kept turns and `new_message` last.
+        """
+        with self._lock:
+            system = self.system_prompt
+            if self.summary:
+                system += f"\n\nEarlier in this session you already said:\n{self.summary}"
+            messages = [SystemMessage(system)]
+
+            image_from = len(self._turns) - self.keep_images
+            for i, (question, answer) in enumerate(self._turns):
+                messages.append(question if i >= image_from else strip_images(question))
+                messages.append(answer)
+
+        if new_message is not None:
+            messages.append(new_message)
+        return messages
+
+    def add_turn(self, question: HumanMessage, answer: str):
+        """Record a finished turn and trim the history to its bounds."""
+        with self._lock:
+            self._turns.append((question, AIMessage(content=answer)))
+            dropped = self._turns[: max(0, len(self._turns) - self.max_turns)]
+            if not dropped:
+                return
+            del self._turns[: len(dropped)]
+        if self.summarize:
+            summary = self.summarize(dropped, self.summary)
+            with self._lock:
+                self.summary = summary
+
+    def clear(self):
+        with self._lock:
+            self._turns = []
+            self.summary = ""
@@ -0,0 +1,121 @@
+"""
+Viewport screenshots for the vision model, captured and encoded in memory.
+
+`capture_viewport_image` draws the 3D view into an offscreen framebuffer
+already scaled down to SCREENSHOT_MAX_EDGE and `convert_to_base64` encodes
+it once as JPEG. `get_screenshot_base64` falls back to
+`bpy.ops.screen.screenshot_area` into a temporary file where offscreen
+drawing is not available. Nothing here runs at import, so benchmarks can
+use it without loading the addon.
+"""
+
+import base64
+import os
+import tempfile
+from io import BytesIO
+
+import bpy
+import gpu
+import numpy as np
+from PIL import Image
+
+# Longest edge of the screenshots sent to the vision model; llava works on
+# small tiles, so full-resolution captures only cost time and bytes
+SCREENSHOT_MAX_EDGE = int(os.environ.get("BLEET_SCREENSHOT_MAX_EDGE", "768"))
+SCREENSHOT_JPEG_QUALITY = 85
+
+
+def convert_to_base64(pil_image, max_edge: int = SCREENSHOT_MAX_EDGE):
+    """
+    Convert PIL images to Base64 encoded JPEG strings
+
+    :param pil_image: PIL image
+    :param max_edge: images larger than this are scaled down first
+    :return: Re-sized Base64 string
+    """
+
+    if max(pil_image.size) > max_edge:
+        pil_image = pil_image.copy()
+        pil_image.thumbnail((max_edge, max_edge), Image.BILINEAR)
+    # JPEG has no alpha channel
+    if pil_image.mode != "RGB":
+        pil_image = pil_image.convert("RGB")
+
+    buffered = BytesIO()
+    pil_image.save(buffered, format="JPEG", quality=SCREENSHOT_JPEG_QUALITY)
+    img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
+    return img_str
+
+
+def capture_viewport_image(area, region, max_edge: int = SCREENSHOT_MAX_EDGE):
+    """
+    Draw the 3D view of `area` into an offscreen framebuffer, already scaled
+    so its longest edge is at most `max_edge`, and return it as a PIL image.
+    Nothing touches the disk.
+    """
+    scale = min(1.0, max_edge / max(region.width, region.height))
+    width = max(1, round(region.width * scale))
+    height = max(1, round(region.height * scale))
+
+    space = area.spaces.active
+    offscreen = gpu.types.GPUOffScreen(width, height)
+    try:
+        offscreen.draw_view3d(
+            bpy.context.scene,
+            bpy.context.view_layer,
+            space,
+            region,
+            space.region_3d.view_matrix,
+            space.region_3d.window_matrix,
+            do_color_management=True,
+        )
+        with offscreen.bind():
+            framebuffer = gpu.state.active_framebuffer_get()
+            buffer = framebuffer.read_color(0, 0, width, height, 4, 0, "UBYTE")
+    finally:
+        offscreen.free()
+
+    buffer.dimensions = width * height * 4
+    pixels = np.asarray(buffer, dtype=np.uint8).reshape(height, width, 4)
+    # Framebuffer rows start at the bottom
+    return Image.fromarray(np.ascontiguousarray(pixels[::-1, :, :3]))
+
+
+def get_screenshot_base64():
+    area = None
+    for current_area in bpy.context.window.screen.areas:
+        if current_area.type == "VIEW_3D":
+            area = current_area
+            break
+
+    if area == None:
+        print("No area??")
+        return ""
+
+    region = None
+    for current_region in area.regions:
+        if current_region.type == "WINDOW":
+            region = current_region
+            break
+
+    if region == None:
+        print("No region??")
+        return ""
+
+    try:
+        return convert_to_base64(capture_viewport_image(area, region))
+    except Exception as e:
+        print("Offscreen viewport capture failed, taking a screenshot instead:", e)
+
+    with bpy.context.temp_override(
+        window=bpy.context.window,
+        screen=bpy.context.window.screen,
+        area=area,
+        region=region,
+        space=area.spaces[0],
+    ):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            out_path = os.path.join(tmp_dir, "viewport.png")
+            bpy.ops.screen.screenshot_area(filepath=out_path)
+            with Image.open(out_path) as image:
+                return convert_to_base64(image)
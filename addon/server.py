@@ -1,85 +1,196 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-import subprocess
-import uuid
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+import asyncio
 import json
 import os
-import threading
+from contextlib import asynccontextmanager
 from typing import Dict, List, Optional
 
-from langchain_ollama import ChatOllama
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, BaseMessage
 
+from worker_pool import BlenderWorkerPool, WorkerError
+from conversion_cache import ConversionCache, binary_cache_key
+import mesh_format
+from mesh_format import MeshFormatError
+from jobs import JobQueue, QueueFullError, jobs_router
+from json_ingest import IngestError, UploadedProblem, ingest_request
+from llm_router import create_router
+from session_store import create_session_store
+
 app = FastAPI()
 
 # Paths (relative to addon/)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 JSON_INPUT_DIR = os.path.join(BASE_DIR, "json_inputs_test")
 FBX_OUTPUT_DIR = os.path.join(BASE_DIR, "json_output_test")
-CONVERTER_SCRIPT = os.path.join(BASE_DIR, "converters", "json_to_fbx.py")
 
 os.makedirs(JSON_INPUT_DIR, exist_ok=True)
 os.makedirs(FBX_OUTPUT_DIR, exist_ok=True)
 
+# Warm headless Blender processes that do the JSON -> FBX conversions
+conversion_pool = BlenderWorkerPool()
+# Converted FBX files, keyed by a hash of the mesh payload
+conversion_cache = ConversionCache(os.path.join(FBX_OUTPUT_DIR, "cache"))
+
 
+# Schema of a problem upload. `objects` is checked separately by json_ingest
+# while the upload streams in.
 class ConvertRequest(BaseModel):
     objects: list
 
 
-@app.post("/convert")
-def convert_json_to_fbx(payload: ConvertRequest):
-    job_id = str(uuid.uuid4())
-
-    json_path = os.path.join(JSON_INPUT_DIR, f"{job_id}.json")
+def run_conversion(job_id: str, payload) -> dict:
+    """Convert an uploaded JSON problem, or raw .bmesh bytes, to FBX."""
     fbx_path = os.path.join(FBX_OUTPUT_DIR, f"{job_id}.fbx")
 
-    # Save JSON
-    with open(json_path, "w") as f:
-        json.dump(payload.dict(), f, indent=2)
-    print(payload.dict())
-    # Call Blender
-    cmd = [
-        "blender",
-        "-b",
-        "-P",
-        CONVERTER_SCRIPT,
-        "--",
-        json_path,
-        fbx_path,
-    ]
-
-    result = subprocess.run(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-    )
+    if isinstance(payload, bytes):
+        json_path = os.path.join(JSON_INPUT_DIR, f"{job_id}{mesh_format.EXTENSION}")
+        with open(json_path, "wb") as f:
+            f.write(payload)
+        objects_hash = binary_cache_key(mesh_format.objects_section(payload))
+    else:
+        json_path = os.path.join(JSON_INPUT_DIR, f"{job_id}.json")
+        os.replace(payload.path, json_path)
+        objects_hash = payload.objects_hash
 
-    if result.returncode != 0:
-        raise HTTPException(
-            status_code=500,
-            detail={
-                "error": "Blender conversion failed",
-                "stdout": result.stdout,
-                "stderr": result.stderr,
-            },
-        )
+    # Reuse an earlier conversion of the same mesh if there is one,
+    # otherwise convert on one of the warm Blender workers
+    cached_fbx_path = conversion_cache.get(objects_hash)
+    if cached_fbx_path is not None:
+        fbx_path = cached_fbx_path
+    else:
+        try:
+            conversion_pool.convert(json_path, fbx_path)
+        except WorkerError as e:
+            raise HTTPException(
+                status_code=500,
+                detail={
+                    "error": "Blender conversion failed",
+                    "reason": str(e),
+                    "output": e.output,
+                },
+            )
+        fbx_path = conversion_cache.put(objects_hash, fbx_path)
 
     return {
         "status": "success",
         "job_id": job_id,
         "json_path": json_path,
         "fbx_path": fbx_path,
+        "cached": cached_fbx_path is not None,
     }
 
 
-# Create ONE shared LLM instance
-llm = ChatOllama(model="llama3.1", temperature=0)
+# Conversions run as queued jobs so no request handler blocks on Blender
+conversion_jobs = JobQueue(run_conversion, concurrency=conversion_pool.size)
+app.include_router(jobs_router(conversion_jobs))
+
+
+@app.on_event("startup")
+async def start_conversions():
+    # Warm the workers up front, but a missing Blender must not take down
+    # the routes that don't need it; convert() retries the launch per job
+    try:
+        conversion_pool.start()
+    except WorkerError as e:
+        print("Blender workers not started, conversions will fail until they can be:", e)
+    await conversion_jobs.start()
+
+
+@app.on_event("shutdown")
+async def stop_conversions():
+    await conversion_jobs.stop()
+    conversion_pool.close()
+
+
+def _submit_conversion(payload, priority: str):
+    try:
+        return conversion_jobs.submit(payload, priority)
+    except (ValueError, QueueFullError) as e:
+        # The job will never run, so its upload is not needed
+        if isinstance(payload, UploadedProblem):
+            os.remove(payload.path)
+        if isinstance(e, QueueFullError):
+            raise HTTPException(status_code=429, detail=f"Conversion queue is full: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _read_convert_payload(request: Request):
+    """
+    Read a /convert body. Clients may send the problem as JSON, returned as
+    an UploadedProblem on disk, or with the .bmesh media type as a packed
+    binary buffer that is passed on as bytes.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type == mesh_format.MEDIA_TYPE:
+        body = await request.body()
+        try:
+            mesh_format.decode(body)
+            meta = mesh_format.read_meta(body)
+        except MeshFormatError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid mesh: {e}")
+        # The problem fields need the same checks as a JSON upload's
+        try:
+            ConvertRequest.parse_obj({**meta, "objects": []})
+        except ValidationError as e:
+            raise RequestValidationError(e.errors())
+        return body
+
+    # JSON goes straight to disk and is validated as it is read back, so a
+    # large mesh never becomes a Python object graph
+    try:
+        upload = await ingest_request(request, JSON_INPUT_DIR)
+    except IngestError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid problem: {e}")
+    try:
+        ConvertRequest.parse_obj({**upload.fields, "objects": []})
+    except ValidationError as e:
+        os.remove(upload.path)
+        raise RequestValidationError(e.errors())
+    return upload
+
+
+@app.post("/convert")
+async def convert_json_to_fbx(request: Request):
+    payload = await _read_convert_payload(request)
+    # Interactive callers wait for the result, so jump ahead of batch jobs
+    job = _submit_conversion(payload, "high")
+    await job.wait()
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    return job.result
+
+
+@app.post("/jobs", status_code=202)
+async def create_conversion_job(request: Request, priority: str = "normal"):
+    payload = await _read_convert_payload(request)
+    job = _submit_conversion(payload, priority)
+    return {"job_id": job.id, "status": job.status}
 
-# In-memory session store: session_id -> message history
-# NOTE: it resets when server restarts.
-_sessions: Dict[str, List[BaseMessage]] = {}
-_sessions_lock = threading.Lock()
+
+@app.get("/convert/cache/stats")
+def conversion_cache_stats():
+    return conversion_cache.stats()
+
+
+# Create ONE shared LLM router; LLM_BACKENDS may list several backends
+llm = create_router(os.environ.get("LLM_BACKENDS", "ollama:llama3.1"))
+
+
+@app.on_event("startup")
+def warm_up_llm():
+    llm.warm_up()
+
+
+# Session store: session_id -> message history. "memory" resets when the
+# server restarts, "sqlite" keeps histories in LLM_SESSION_DB.
+_sessions = create_session_store(
+    os.environ.get("LLM_SESSION_STORE", "memory"),
+    os.environ.get("LLM_SESSION_DB", os.path.join(BASE_DIR, "llm_sessions.sqlite3")),
+)
 
 SYSTEM_HINT_PROMPT = (
     "You are a helpful 3D modeling tutor inside Blender.\n"
@@ -103,18 +214,19 @@ class HintResponse(BaseModel):
     hint: str
     turns_in_history: int
 
-@app.post("/llm/hint", response_model=HintResponse)
-def llm_hint(req: HintRequest):
+def _check_hint_request(req: HintRequest):
     if not req.session_id:
         raise HTTPException(status_code=400, detail="session_id is required")
     if not req.prompt.strip():
         raise HTTPException(status_code=400, detail="prompt is required")
 
-    with _sessions_lock:
-        if req.reset or req.session_id not in _sessions:
-            _sessions[req.session_id] = [SystemMessage(content=SYSTEM_HINT_PROMPT)]
 
-        history = _sessions[req.session_id]
+def _start_turn(req: HintRequest) -> List[BaseMessage]:
+    """Add the request's prompt to the session history and return the history."""
+    with _sessions.locked(req.session_id):
+        history = None if req.reset else _sessions.get(req.session_id)
+        if history is None:
+            history = [SystemMessage(content=SYSTEM_HINT_PROMPT)]
 
         # Add the new user prompt
         history.append(HumanMessage(content=req.prompt))
@@ -126,15 +238,163 @@ def llm_hint(req: HintRequest):
         if len(history) > keep:
             history[:] = [history[0]] + history[-(keep - 1):]
 
-    # Call model OUTSIDE lock (avoid blocking other requests)
+        _sessions.put(req.session_id, history)
+        return list(history)
+
+
+def _finish_turn(session_id: str, history: List[BaseMessage], hint: str) -> int:
+    """Save the assistant response and return the number of turns kept."""
+    with _sessions.locked(session_id):
+        # Fall back to the history sent to the LLM if the session expired
+        # in the meantime
+        current = _sessions.get(session_id) or list(history)
+        current.append(AIMessage(content=hint))
+        _sessions.put(session_id, current)
+        return (len(current) - 1) // 2  # rough count of human/ai turns
+
+
+# Hint requests waiting on a slot, per session: [asyncio.Lock, users]
+_session_queues: Dict[str, list] = {}
+# (session_id, prompt) -> answer of the identical request already running
+_inflight_hints: Dict[tuple, asyncio.Future] = {}
+# Requests past llm.max_concurrent wait at most this long before a 429
+LLM_QUEUE_TIMEOUT = float(os.environ.get("LLM_QUEUE_TIMEOUT", "0"))
+_llm_slots = asyncio.Semaphore(llm.max_concurrent)
+
+
+@asynccontextmanager
+async def _session_turn(session_id: str):
+    """Let one request per session talk to the LLM at a time."""
+    entry = _session_queues.setdefault(session_id, [asyncio.Lock(), 0])
+    entry[1] += 1
     try:
-        ai_msg = llm.invoke(history)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"LLM call failed: {e}")
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _session_queues[session_id]
+
+
+def _llm_busy() -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="The LLM is busy with other hints, try again shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def _acquire_llm_slot():
+    """Take one of the LLM's slots, or fail fast with a 429 when it is busy."""
+    if not _llm_slots.locked():
+        await _llm_slots.acquire()
+        return
+    if LLM_QUEUE_TIMEOUT > 0:
+        try:
+            await asyncio.wait_for(_llm_slots.acquire(), LLM_QUEUE_TIMEOUT)
+            return
+        except asyncio.TimeoutError:
+            pass
+    raise _llm_busy()
+
+
+async def _run_hint(req: HintRequest) -> HintResponse:
+    async with _session_turn(req.session_id):
+        await _acquire_llm_slot()
+        try:
+            history = await run_in_threadpool(_start_turn, req)
+            try:
+                hint = await llm.ainvoke(history)
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"LLM call failed: {e}")
+        finally:
+            _llm_slots.release()
+
+        turns = await run_in_threadpool(_finish_turn, req.session_id, history, hint)
+    return HintResponse(session_id=req.session_id, hint=hint, turns_in_history=turns)
+
+
+@app.post("/llm/hint", response_model=HintResponse)
+async def llm_hint(req: HintRequest):
+    _check_hint_request(req)
+
+    # A repeated click while the same prompt is still being answered gets
+    # that answer instead of a second, overlapping LLM call
+    key = (req.session_id, req.prompt)
+    running = _inflight_hints.get(key)
+    if running is not None and not req.reset:
+        try:
+            return await asyncio.shield(running)
+        except asyncio.CancelledError:
+            if not running.cancelled():
+                raise
+        # The request being answered was cancelled (its client went away),
+        # so answer this one ourselves
+
+    answer = asyncio.get_running_loop().create_future()
+    _inflight_hints[key] = answer
+    try:
+        response = await _run_hint(req)
+        answer.set_result(response)
+        return response
+    except asyncio.CancelledError:
+        # Only this request was cancelled; waiters retry on their own
+        answer.cancel()
+        raise
+    except BaseException as e:
+        answer.set_exception(e)
+        # Nobody else may be waiting; don't warn about an unretrieved error
+        answer.exception()
+        raise
+    finally:
+        if _inflight_hints.get(key) is answer:
+            del _inflight_hints[key]
+
+
+@app.post("/llm/hint/stream")
+async def llm_hint_stream(req: HintRequest):
+    """
+    Same as /llm/hint, but streams the hint as server-sent events while it is
+    generated: `{"token": ...}` for every chunk, then one final event with the
+    HintResponse fields and `"done": true`, or `{"error": ...}` on failure.
+    """
+    _check_hint_request(req)
+
+    # A busy LLM still gets a plain 429 unless the request may queue for a
+    # slot. The session turn and the slot themselves are taken inside the
+    # generator, which releases them: if the client goes away before the
+    # first chunk, the generator never starts and holds nothing.
+    if _llm_slots.locked() and LLM_QUEUE_TIMEOUT <= 0:
+        raise _llm_busy()
+
+    async def events():
+        async with _session_turn(req.session_id):
+            try:
+                await _acquire_llm_slot()
+            except HTTPException as e:
+                yield f"data: {json.dumps({'error': e.detail})}\n\n"
+                return
+
+            try:
+                history = await run_in_threadpool(_start_turn, req)
+                chunks = []
+                async for chunk in llm.astream(history):
+                    chunks.append(chunk)
+                    yield f"data: {json.dumps({'token': chunk})}\n\n"
+            except Exception as e:
+                yield f"data: {json.dumps({'error': f'LLM call failed: {e}'})}\n\n"
+                return
+            finally:
+                _llm_slots.release()
+
+            hint = "".join(chunks)
+            turns = await run_in_threadpool(_finish_turn, req.session_id, history, hint)
+            final = HintResponse(session_id=req.session_id, hint=hint, turns_in_history=turns)
+            yield f"data: {json.dumps({**final.dict(), 'done': True})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
 
-    # Save assistant response
-    with _sessions_lock:
-        _sessions[req.session_id].append(AIMessage(content=ai_msg.content))
-        turns = (len(_sessions[req.session_id]) - 1) // 2  # rough count of human/ai turns
 
-    return HintResponse(session_id=req.session_id, hint=ai_msg.content, turns_in_history=turns)
+@app.get("/llm/backends")
+def llm_backend_stats():
+    return llm.stats()
@@ -0,0 +1,215 @@
+"""
+Storage for /llm/hint conversation histories.
+
+Sessions used to live in one dict behind one global lock, never expired and
+were lost on restart. A SessionStore bounds the number of sessions, drops
+ones that have been idle longer than a TTL (least recently used first when
+full), and hands out a lock per session, so requests for unrelated sessions
+never wait on each other. MemorySessionStore keeps everything in process;
+SqliteSessionStore keeps the histories in a local SQLite file so they
+survive a restart.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from langchain_core.messages import messages_from_dict, messages_to_dict
+
+SESSION_MAX_COUNT = int(os.environ.get("LLM_SESSION_MAX_COUNT", "10000"))
+SESSION_TTL = float(os.environ.get("LLM_SESSION_TTL", str(24 * 3600)))
+# SqliteSessionStore removes expired and excess sessions once per this many writes
+PRUNE_EVERY = 100
+
+
+class SessionStore(ABC):
+    """
+    Base class: subclasses implement `get`, `put`, `delete` and `__len__`.
+    Callers that read, change and write back a session hold `locked(id)`
+    around it.
+    """
+
+    def __init__(self, max_sessions: int = SESSION_MAX_COUNT, ttl: float = SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        # session_id -> [lock, number of users]; dropped once nobody uses it
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    @contextmanager
+    def locked(self, session_id: str):
+        with self._locks_guard:
+            entry = self._locks.get(session_id)
+            if entry is None:
+                entry = self._locks[session_id] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._locks_guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[session_id]
+
+    @abstractmethod
+    def get(self, session_id: str):
+        """Return the session's messages, or None if it is unknown or expired."""
+        ...
+
+    @abstractmethod
+    def put(self, session_id: str, messages: list):
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+
+class MemorySessionStore(SessionStore):
+    def __init__(self, max_sessions: int = SESSION_MAX_COUNT, ttl: float = SESSION_TTL):
+        super().__init__(max_sessions, ttl)
+        # session_id -> (last used, messages), least recently used first
+        self._sessions = OrderedDict()
+        # Deliberately one lock for the whole store: it only covers a few
+        # dict operations (never the LLM call, which runs under the
+        # session's own `locked()`), and the shared LRU order needs it
+        self._guard = threading.Lock()
+
+    def _expire(self, now: float):
+        while self._sessions:
+            session_id, (last_used, _) = next(iter(self._sessions.items()))
+            if now - last_used <= self.ttl and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[session_id]
+
+    def get(self, session_id: str):
+        now = time.time()
+        with self._guard:
+            self._expire(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            self._sessions[session_id] = (now, entry[1])
+            self._sessions.move_to_end(session_id)
+            return list(entry[1])
+
+    def put(self, session_id: str, messages: list):
+        now = time.time()
+        with self._guard:
+            self._sessions[session_id] = (now, list(messages))
+            self._sessions.move_to_end(session_id)
+            self._expire(now)
+
+    def delete(self, session_id: str):
+        with self._guard:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        with self._guard:
+            return len(self._sessions)
+
+
+class SqliteSessionStore(SessionStore):
+    def __init__(
+        self,
+        path: str,
+        max_sessions: int = SESSION_MAX_COUNT,
+        ttl: float = SESSION_TTL,
+    ):
+        super().__init__(max_sessions, ttl)
+        self.path = path
+        # Deliberately one lock for the whole store: the connection is
+        # shared, SQLite takes one writer at a time anyway and every get
+        # writes last_used. JSON encoding and decoding happen outside it.
+        self._guard = threading.Lock()
+        self._puts_since_prune = 0
+        # Request handlers run on a thread pool
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            # Losing the last few turns on a power cut is fine for chat history
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id TEXT PRIMARY KEY,
+                    messages TEXT NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions (last_used)"
+            )
+
+    def get(self, session_id: str):
+        now = time.time()
+        with self._guard, self._db:
+            row = self._db.execute(
+                "SELECT messages, last_used FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                return None
+            self._db.execute(
+                "UPDATE sessions SET last_used = ? WHERE id = ?", (now, session_id)
+            )
+        return messages_from_dict(json.loads(row[0]))
+
+    def put(self, session_id: str, messages: list):
+        now = time.time()
+        data = json.dumps(messages_to_dict(messages))
+        with self._guard, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)",
+                (session_id, data, now),
+            )
+            # Pruning scans the table, so only do it every so often; the
+            # store may briefly hold a few sessions more than max_sessions
+            self._puts_since_prune += 1
+            if self._puts_since_prune < PRUNE_EVERY:
+                return
+            self._puts_since_prune = 0
+            self._db.execute(
+                "DELETE FROM sessions WHERE last_used < ?", (now - self.ttl,)
+            )
+            self._db.execute(
+                """
+                DELETE FROM sessions WHERE id IN (
+                    SELECT id FROM sessions ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_sessions,),
+            )
+
+    def delete(self, session_id: str):
+        with self._guard, self._db:
+            self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def __len__(self) -> int:
+        with self._guard:
+            return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def create_session_store(kind: str, path: str) -> SessionStore:
+    """
+    :param kind: "memory" or "sqlite"
+    :param path: SQLite file used by the "sqlite" store
+    """
+    if kind == "memory":
+        return MemorySessionStore()
+    if kind == "sqlite":
+        return SqliteSessionStore(path)
+    raise ValueError(f"Unknown session store {kind!r}, expected 'memory' or 'sqlite'")
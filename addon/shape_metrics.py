@@ -0,0 +1,113 @@
+"""
+How closely the user's mesh follows the TARGET's shape.
+
+Submit's vertex check only asks whether each target vertex has a user vertex
+within the tolerance. It never looks the other way, so stray user geometry
+goes unnoticed, and it can't say how far off a near miss is. `compare_shapes`
+finds the exact nearest-vertex distance in both directions with two
+`matching.point_tree` indexes (Blender's compiled k-d tree inside Blender)
+and reduces them to:
+
+- the Hausdorff distance: the worst distance in either direction
+- the Chamfer distance: the mean distance target -> user plus user -> target
+- per direction, the mean/max distance, the share within tolerance and a
+  histogram of distances in multiples of the tolerance
+
+`shape_accuracy` turns that into a 0..1 factor for the score, and
+`format_shape_metrics` into lines for the hint prompt.
+"""
+
+import numpy as np
+
+from matching import as_points, point_tree
+
+# Histogram bin edges, in multiples of the tolerance
+ERROR_BINS = (0.0, 0.25, 0.5, 1.0, 2.0, 4.0, np.inf)
+# Mean error per direction, in tolerances, at which shape_accuracy hits 0
+ZERO_ACCURACY_ERROR = 4.0
+
+
+def _direction_stats(distances: np.ndarray, tolerance: float) -> dict:
+    if not len(distances):
+        return {
+            "mean": 0.0,
+            "max": 0.0,
+            "within_tolerance": 1.0,
+            "histogram": [0] * (len(ERROR_BINS) - 1),
+        }
+    histogram, _ = np.histogram(distances / tolerance, bins=ERROR_BINS)
+    return {
+        "mean": float(distances.mean()),
+        "max": float(distances.max()),
+        "within_tolerance": float(np.mean(distances <= tolerance)),
+        "histogram": histogram.tolist(),
+    }
+
+
+def compare_shapes(target_verts, user_verts, tolerance: float, target_tree=None) -> dict:
+    """
+    Compare two vertex sets in both directions.
+
+    :param target_tree: a `point_tree` over `target_verts`, if one is already built
+    :return: dict with "hausdorff", "chamfer", "tolerance" and per-direction
+        stats under "target_to_user" and "user_to_target". Distances are inf
+        when one side has no vertices and the other does.
+    """
+    if tolerance <= 0:
+        raise ValueError("tolerance must be positive")
+
+    target_verts = as_points(target_verts)
+    user_verts = as_points(user_verts)
+    if target_tree is None:
+        target_tree = point_tree(target_verts)
+
+    # How far each target vertex is from the user's mesh, and the other way
+    target_to_user = point_tree(user_verts).nearest_distances(target_verts)
+    user_to_target = target_tree.nearest_distances(user_verts)
+
+    forward = _direction_stats(target_to_user, tolerance)
+    backward = _direction_stats(user_to_target, tolerance)
+    return {
+        "tolerance": float(tolerance),
+        "hausdorff": max(forward["max"], backward["max"]),
+        "chamfer": forward["mean"] + backward["mean"],
+        "target_to_user": forward,
+        "user_to_target": backward,
+    }
+
+
+def shape_accuracy(metrics: dict) -> float:
+    """
+    1.0 for identical shapes, falling linearly with the Chamfer distance to
+    0.0 once vertices are on average ZERO_ACCURACY_ERROR tolerances away in
+    both directions.
+    """
+    chamfer = metrics["chamfer"]
+    if not np.isfinite(chamfer):
+        return 0.0
+    return max(0.0, 1.0 - chamfer / (2 * ZERO_ACCURACY_ERROR * metrics["tolerance"]))
+
+
+def _histogram_line(stats: dict) -> str:
+    labels = []
+    for low, high in zip(ERROR_BINS[:-1], ERROR_BINS[1:]):
+        labels.append(f">{low:g}x" if high == np.inf else f"{low:g}-{high:g}x")
+    return ", ".join(f"{label}: {count}" for label, count in zip(labels, stats["histogram"]))
+
+
+def format_shape_metrics(metrics: dict) -> str:
+    """Render `compare_shapes` output as a few prompt lines."""
+    forward = metrics["target_to_user"]
+    backward = metrics["user_to_target"]
+    return "\n".join(
+        [
+            f"Shape distance: Hausdorff {metrics['hausdorff']:.3g}, "
+            f"Chamfer {metrics['chamfer']:.3g} (tolerance {metrics['tolerance']:g})",
+            f"Target vertices near Current: {forward['within_tolerance']:.0%} "
+            f"(mean distance {forward['mean']:.3g}, worst {forward['max']:.3g})",
+            f"Current vertices near Target: {backward['within_tolerance']:.0%} "
+            f"(mean distance {backward['mean']:.3g}, worst {backward['max']:.3g})",
+            f"Target vertex errors in tolerances: {_histogram_line(forward)}",
+            f"Current vertex errors in tolerances: {_histogram_line(backward)}",
+        ]
+    )
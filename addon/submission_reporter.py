@@ -0,0 +1,245 @@
+"""
+Background delivery of submission results to the progress API.
+
+Submit used to `requests.post` straight from Blender's main thread with no
+timeout, so a slow or stopped web app froze the whole UI. A
+SubmissionReporter instead writes each submission to a spool directory and
+hands it to a worker thread. The worker posts it over one pooled
+`requests.Session` with a timeout, retries with exponential backoff, and
+deletes the spool file once the API has taken it. Anything that could not
+be delivered stays in the spool and is sent again later, including after
+Blender restarts. Every attempt carries the spool file's name as an
+`Idempotency-Key` header, so the API can drop repeats of a submission it
+already stored.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+
+SUBMIT_URL = os.environ.get("BLEET_SUBMIT_URL", "http://localhost:3000/api/submit")
+# (connect, read) seconds for a single attempt
+SUBMIT_TIMEOUT = (2.0, 5.0)
+SUBMIT_RETRIES = 3
+# Seconds before the first retry, doubled for each one after it
+SUBMIT_BACKOFF = 0.5
+# How often the worker looks for spooled submissions to send again
+REPLAY_INTERVAL = 30.0
+# Submissions waiting in memory; past this they only wait in the spool
+SUBMIT_QUEUE_SIZE = 100
+
+SPOOL_SUFFIX = ".json"
+
+
+class SubmissionReporter:
+    """
+    :param url: endpoint each submission is POSTed to as JSON
+    :param spool_dir: directory holding submissions until they are delivered
+    """
+
+    def __init__(
+        self,
+        url: str,
+        spool_dir: str,
+        timeout=SUBMIT_TIMEOUT,
+        retries: int = SUBMIT_RETRIES,
+        backoff: float = SUBMIT_BACKOFF,
+        replay_interval: float = REPLAY_INTERVAL,
+        max_queue: int = SUBMIT_QUEUE_SIZE,
+    ):
+        self.url = url
+        self.spool_dir = spool_dir
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.replay_interval = replay_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        # Spool files currently in the queue or being sent
+        self._queued = set()
+        self._queued_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.sent = 0
+        self.failed_attempts = 0
+        self.dropped = 0
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        os.makedirs(spool_dir, exist_ok=True)
+
+    def start(self):
+        """Start the worker; it first sends whatever an earlier run left in the spool."""
+        if self._thread is not None and self._thread.is_alive() and not self._stop.is_set():
+            return
+        # A worker told to stop may still be finishing a post. It keeps its
+        # own stop event, and the new worker waits for it to exit before
+        # touching the shared session.
+        previous = self._thread
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(self._stop, previous),
+            name="submission-reporter",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        """Stop the worker. Undelivered submissions stay in the spool."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            # Keep a worker that is still busy, so start() can wait for it
+            if not self._thread.is_alive():
+                self._thread = None
+
+    def submit(self, submission: dict):
+        """
+        Spool `submission` and queue it for sending. Never blocks on the
+        network, so it is safe to call from Blender's main thread.
+        """
+        name = f"{time.time_ns():020d}-{uuid.uuid4().hex}{SPOOL_SUFFIX}"
+        path = os.path.join(self.spool_dir, name)
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "w") as f:
+            json.dump(submission, f)
+        os.replace(temporary_path, path)
+        self._enqueue(path)
+
+    def _enqueue(self, path: str):
+        with self._queued_lock:
+            if path in self._queued:
+                return
+            try:
+                self._queue.put_nowait(path)
+            except queue.Full:
+                # Still in the spool; the next replay picks it up
+                return
+            self._queued.add(path)
+
+    def spooled(self) -> list:
+        """Spool files waiting to be delivered, oldest first."""
+        try:
+            names = os.listdir(self.spool_dir)
+        except OSError:
+            return []
+        return [
+            os.path.join(self.spool_dir, name)
+            for name in sorted(names)
+            if name.endswith(SPOOL_SUFFIX)
+        ]
+
+    def _replay(self):
+        for path in self.spooled():
+            self._enqueue(path)
+
+    def _run(self, stop: threading.Event, previous: threading.Thread = None):
+        if previous is not None:
+            previous.join()
+            if stop.is_set():
+                return
+        self._replay()
+        last_replay = time.monotonic()
+        while not stop.is_set():
+            if time.monotonic() - last_replay >= self.replay_interval:
+                self._replay()
+                last_replay = time.monotonic()
+            try:
+                path = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            try:
+                delivered = self._deliver(path, stop)
+            finally:
+                with self._queued_lock:
+                    self._queued.discard(path)
+
+            if not delivered:
+                # The API is unreachable: leave everything spooled and try
+                # again on the next replay instead of spinning through the queue
+                self._drain_queue()
+                stop.wait(self.replay_interval)
+                last_replay = 0.0
+
+    def _drain_queue(self):
+        with self._queued_lock:
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._queued.clear()
+
+    def _deliver(self, path: str, stop: threading.Event) -> bool:
+        """
+        Send one spooled submission. Returns False if it should be tried
+        again later, True once it is delivered or given up on.
+        """
+        try:
+            with open(path, "r") as f:
+                submission = json.load(f)
+        except FileNotFoundError:
+            return True
+        except (OSError, ValueError) as e:
+            print("Dropping unreadable spooled submission", path, "-", e)
+            self._remove(path)
+            self.dropped += 1
+            return True
+
+        # The same key on every attempt and replay: a post that timed out
+        # may still have been stored
+        headers = {"Idempotency-Key": os.path.basename(path)[: -len(SPOOL_SUFFIX)]}
+        for attempt in range(self.retries + 1):
+            if attempt:
+                if stop.wait(self.backoff * 2 ** (attempt - 1)):
+                    return False
+            try:
+                response = self._session.post(
+                    self.url, json=submission, headers=headers, timeout=self.timeout
+                )
+            except requests.RequestException as e:
+                self.failed_attempts += 1
+                print(f"Submission report failed (attempt {attempt + 1}):", e)
+                continue
+
+            if response.status_code < 400:
+                self._remove(path)
+                self.sent += 1
+                return True
+            if response.status_code != 429 and response.status_code < 500:
+                # The API rejected it; sending it again won't help
+                print(
+                    f"Submission rejected by {self.url} ({response.status_code}):",
+                    response.text[:200],
+                )
+                self._remove(path)
+                self.dropped += 1
+                return True
+            self.failed_attempts += 1
+            print(f"Submission report failed (attempt {attempt + 1}): HTTP {response.status_code}")
+        return False
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "failed_attempts": self.failed_attempts,
+            "dropped": self.dropped,
+            "spooled": len(self.spooled()),
+        }
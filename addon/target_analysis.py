@@ -0,0 +1,294 @@
+"""
+Facts about a problem's TARGET mesh, computed once per problem.
+
+Every Submit and Hint used to copy the target's vertices out of Blender,
+rebuild a matching grid over them, work out its edges and bounding box and
+format the same prompt line again, although the target never changes for a
+given problem. The conversion pipeline now writes all of that next to the
+mesh as a sidecar file (`<mesh>.analysis.npz`): vertices, face -> vertex
+arrays, edges with their lengths, midpoints and normals, the bounding box, a
+VertexGrid over the vertices and the target's prompt summary. The addon
+loads it once per problem and reuses it for every interaction.
+
+The sidecar is a plain NumPy .npz file, so nothing here needs `bpy`.
+"""
+
+import os
+import zipfile
+
+import numpy as np
+
+from geometry_diff import bounding_box, describe_mesh
+from matching import VertexGrid
+from mesh_data import problem_mesh_arrays
+
+# Bump when the saved arrays change, so old sidecars get recomputed
+ANALYSIS_VERSION = 2
+SIDECAR_SUFFIX = ".analysis.npz"
+# Cell size of the saved grid; matches TOLERANCE in addon.py
+MATCH_TOLERANCE = 0.1
+
+_GRID_PREFIX = "grid_"
+# Arrays every sidecar of the current version has
+_SIDECAR_KEYS = (
+    "version",
+    "tolerance",
+    "vertices",
+    "face_offsets",
+    "face_indices",
+    "edges",
+    "edge_lengths",
+    "edge_midpoints",
+    "edge_normals",
+    "box_min",
+    "box_max",
+    "summary",
+) + tuple(
+    _GRID_PREFIX + key
+    for key in ("cell_size", "order", "points", "cell_keys", "cell_starts", "cell_counts")
+)
+
+
+def sidecar_path(mesh_path: str) -> str:
+    """Path of the analysis file that goes with a .json/.bmesh/.fbx mesh."""
+    return os.path.splitext(mesh_path)[0] + SIDECAR_SUFFIX
+
+
+def _next_loops(face_offsets: np.ndarray, loop_count: int) -> np.ndarray:
+    # Each loop connects to the next loop of its face, the last one wraps
+    # around to the face's first loop
+    following = np.arange(1, loop_count + 1)
+    sizes = np.diff(face_offsets)
+    ends = face_offsets[1:][sizes > 0] - 1
+    following[ends] = face_offsets[:-1][sizes > 0]
+    return following
+
+
+def _loop_edges(face_offsets, face_indices) -> np.ndarray:
+    """(L, 2) sorted vertex pair of the edge leaving every loop."""
+    face_offsets = np.asarray(face_offsets, dtype=np.int64)
+    face_indices = np.asarray(face_indices, dtype=np.int64)
+    following = _next_loops(face_offsets, len(face_indices))
+    pairs = np.stack([face_indices, face_indices[following]], axis=1)
+    pairs.sort(axis=1)
+    return pairs
+
+
+def face_edges(face_offsets, face_indices) -> np.ndarray:
+    """Unique (E, 2) vertex pairs of the edges around every face."""
+    if not len(face_indices):
+        return np.empty((0, 2), dtype=np.int32)
+    return np.unique(_loop_edges(face_offsets, face_indices), axis=0).astype(np.int32)
+
+
+def face_normals(vertices, face_offsets, face_indices) -> np.ndarray:
+    """Unit normal of every face (Newell's method, so n-gons work too)."""
+    face_offsets = np.asarray(face_offsets, dtype=np.int64)
+    face_indices = np.asarray(face_indices, dtype=np.int64)
+    normals = np.zeros((len(face_offsets) - 1, 3))
+    if not len(face_indices):
+        return normals
+
+    points = np.asarray(vertices, dtype=np.float64)[face_indices]
+    crosses = np.cross(points, points[_next_loops(face_offsets, len(face_indices))])
+    filled = np.diff(face_offsets) > 0
+    normals[filled] = np.add.reduceat(crosses, face_offsets[:-1][filled], axis=0)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+
+def edge_normals(vertices, face_offsets, face_indices, edges) -> np.ndarray:
+    """
+    Average normal of the faces around each edge, used to tell which edges
+    face away from the viewer. Edges without faces get a zero normal.
+    """
+    edges = np.sort(np.asarray(edges, dtype=np.int64).reshape(-1, 2), axis=1)
+    normals = np.zeros((len(edges), 3))
+    if not len(edges) or not len(face_indices):
+        return normals
+
+    # Find the edge of every loop through packed (low, high) vertex keys
+    vertex_count = max(len(vertices), 1)
+    edge_keys = edges[:, 0] * vertex_count + edges[:, 1]
+    order = np.argsort(edge_keys)
+    loop_edges = _loop_edges(face_offsets, face_indices)
+    loop_keys = loop_edges[:, 0] * vertex_count + loop_edges[:, 1]
+    position = np.minimum(np.searchsorted(edge_keys[order], loop_keys), len(edges) - 1)
+    found = edge_keys[order][position] == loop_keys
+
+    loop_faces = np.repeat(
+        np.arange(len(face_offsets) - 1), np.diff(np.asarray(face_offsets, dtype=np.int64))
+    )
+    np.add.at(
+        normals,
+        order[position[found]],
+        face_normals(vertices, face_offsets, face_indices)[loop_faces[found]],
+    )
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+
+def analyse_mesh(
+    vertices,
+    face_offsets,
+    face_indices,
+    edges=None,
+    tolerance: float = MATCH_TOLERANCE,
+) -> dict:
+    """
+    :param edges: (E, 2) vertex pairs; derived from the faces if not given
+    :return: analysis dict, see `save_analysis` for what it holds
+    """
+    vertices = np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1, 3)
+    face_offsets = np.ascontiguousarray(face_offsets, dtype=np.int32)
+    face_indices = np.ascontiguousarray(face_indices, dtype=np.int32)
+    if edges is None:
+        edges = face_edges(face_offsets, face_indices)
+    edges = np.ascontiguousarray(edges, dtype=np.int32).reshape(-1, 2)
+
+    points = vertices.astype(np.float64)
+    ends = points[edges]
+    box = bounding_box(points)
+    analysis = {
+        "version": ANALYSIS_VERSION,
+        "tolerance": float(tolerance),
+        "vertices": vertices,
+        "face_offsets": face_offsets,
+        "face_indices": face_indices,
+        "edges": edges,
+        "edge_lengths": np.linalg.norm(ends[:, 1] - ends[:, 0], axis=1).astype(np.float32),
+        "edge_midpoints": ends.mean(axis=1).astype(np.float32),
+        "edge_normals": edge_normals(
+            points, face_offsets, face_indices, edges
+        ).astype(np.float32),
+        "box": box,
+        "grid": VertexGrid(points, tolerance),
+    }
+    analysis["summary"] = describe_mesh(
+        "Target",
+        {"vertices": len(vertices), "faces": len(face_offsets) - 1, "box": box},
+    )
+    return analysis
+
+
+def analyse_problem(problem: dict, tolerance: float = MATCH_TOLERANCE) -> dict:
+    """
+    Analyse all objects of a problem (JSON lists or decoded .bmesh) as one
+    mesh, with vertex and face order kept as in the file.
+    """
+    vertices = []
+    offsets = [np.zeros(1, dtype=np.int64)]
+    indices = []
+    vertex_count = 0
+    loop_count = 0
+    for obj_data in problem["objects"]:
+        obj_vertices, obj_offsets, obj_indices = problem_mesh_arrays(obj_data)
+        obj_vertices = np.asarray(obj_vertices, dtype=np.float32).reshape(-1, 3)
+        obj_offsets = np.asarray(obj_offsets, dtype=np.int64)
+        vertices.append(obj_vertices)
+        offsets.append(obj_offsets[1:] + loop_count)
+        indices.append(np.asarray(obj_indices, dtype=np.int64) + vertex_count)
+        vertex_count += len(obj_vertices)
+        loop_count += int(obj_offsets[-1])
+
+    return analyse_mesh(
+        np.concatenate([np.empty((0, 3), dtype=np.float32)] + vertices),
+        np.concatenate(offsets),
+        np.concatenate([np.empty(0, dtype=np.int64)] + indices),
+        tolerance=tolerance,
+    )
+
+
+def save_analysis(path: str, analysis: dict):
+    """
+    Write an analysis to `path` (normally `sidecar_path(mesh_path)`). The
+    box and grid are stored as their arrays and the summary as a string, so
+    loading never needs pickle.
+    """
+    arrays = {
+        key: value
+        for key, value in analysis.items()
+        if key not in ("box", "grid", "summary")
+    }
+    arrays["box_min"] = analysis["box"]["min"] if analysis["box"] is not None else np.empty(0)
+    arrays["box_max"] = analysis["box"]["max"] if analysis["box"] is not None else np.empty(0)
+    arrays["summary"] = np.array(analysis["summary"])
+    for key, value in analysis["grid"].to_arrays().items():
+        arrays[_GRID_PREFIX + key] = value
+
+    # Write to a temporary file first so readers never see half a sidecar
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(temporary_path, path)
+
+
+def load_analysis(path: str):
+    """Read a sidecar, or return None if it is missing, unreadable or outdated."""
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files}
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+        # A sidecar cut short while it was written is not a valid zip
+        if os.path.exists(path):
+            print("Could not read target analysis", path, "-", e)
+        return None
+    if int(arrays.get("version", -1)) != ANALYSIS_VERSION:
+        return None
+    missing = [key for key in _SIDECAR_KEYS if key not in arrays]
+    if missing:
+        print("Incomplete target analysis", path, "- missing", ", ".join(missing))
+        return None
+
+    box_min = arrays.pop("box_min")
+    box_max = arrays.pop("box_max")
+    analysis = {
+        key: value
+        for key, value in arrays.items()
+        if not key.startswith(_GRID_PREFIX)
+    }
+    analysis["version"] = int(analysis["version"])
+    analysis["tolerance"] = float(analysis["tolerance"])
+    analysis["summary"] = str(analysis["summary"])
+    analysis["box"] = bounding_box(np.stack([box_min, box_max])) if len(box_min) else None
+    analysis["grid"] = VertexGrid.from_arrays(
+        {
+            key[len(_GRID_PREFIX) :]: value
+            for key, value in arrays.items()
+            if key.startswith(_GRID_PREFIX)
+        }
+    )
+    return analysis
+
+
+def write_sidecar(mesh_path: str, problem: dict) -> dict:
+    """Analyse `problem` and save it next to `mesh_path`."""
+    analysis = analyse_problem(problem)
+    save_analysis(sidecar_path(mesh_path), analysis)
+    return analysis
+
+
+def matches_mesh(
+    analysis: dict, vertices, face_offsets=None, face_indices=None, atol: float = 1e-5
+) -> bool:
+    """
+    Whether `analysis` describes a mesh with these vertex positions, in this
+    order, and (if given) these faces.
+    """
+    vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+    if analysis["vertices"].shape != vertices.shape or not np.allclose(
+        analysis["vertices"], vertices, atol=atol
+    ):
+        return False
+    if face_offsets is None:
+        return True
+    return np.array_equal(analysis["face_offsets"], face_offsets) and np.array_equal(
+        analysis["face_indices"], face_indices
+    )
+
+
+def grid_for(analysis: dict, tolerance: float) -> VertexGrid:
+    """The saved grid if it was built for `tolerance`, otherwise a new one."""
+    if analysis["tolerance"] == tolerance:
+        return analysis["grid"]
+    return VertexGrid(analysis["vertices"], tolerance)
@@ -0,0 +1,198 @@
+"""
+Pool of long-lived headless Blender processes used for JSON -> FBX conversion.
+
+Launching `blender -b` for every /convert request pays Blender's whole startup
+cost each time. Instead, a few workers (converters/blender_worker.py) are
+started once and kept warm; each one takes jobs over its stdin and answers on
+its stdout. A worker that crashes or runs past the job timeout is killed and
+replaced, so the pool stays at its configured size; if the replacement
+cannot be launched, the next job tries again.
+"""
+
+import json
+import os
+import queue
+import subprocess
+import threading
+import uuid
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKER_SCRIPT = os.path.join(BASE_DIR, "converters", "blender_worker.py")
+
+# Must match RESULT_PREFIX in converters/blender_worker.py
+RESULT_PREFIX = "@@bleet-worker "
+
+BLENDER_WORKER_COUNT = int(os.environ.get("BLENDER_WORKERS", "2"))
+JOB_TIMEOUT = float(os.environ.get("BLENDER_JOB_TIMEOUT", "60"))
+STARTUP_TIMEOUT = 120.0
+
+# Lines of Blender output kept per worker for error reports
+_MAX_LOG_LINES = 200
+
+
+class WorkerError(Exception):
+    """A conversion failed, timed out, or the worker running it died."""
+
+    def __init__(self, message: str, output: str = "", worker_lost: bool = False):
+        super().__init__(message)
+        self.output = output
+        # True when the worker itself is gone or stuck and must be replaced
+        self.worker_lost = worker_lost
+
+
+class _Worker:
+    def __init__(self, blender: str):
+        self.process = subprocess.Popen(
+            [blender, "-b", "-P", WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+        )
+        self.ready = False
+        self._messages = queue.Queue()
+        self._log = []
+        self._log_lock = threading.Lock()
+        threading.Thread(target=self._read_output, daemon=True).start()
+
+    def _read_output(self):
+        for line in self.process.stdout:
+            if line.startswith(RESULT_PREFIX):
+                self._messages.put(json.loads(line[len(RESULT_PREFIX) :]))
+                continue
+            with self._log_lock:
+                self._log.append(line)
+                del self._log[:-_MAX_LOG_LINES]
+        # stdout closed: the process exited
+        self._messages.put(None)
+
+    def _take_log(self) -> str:
+        with self._log_lock:
+            log = "".join(self._log)
+            self._log.clear()
+        return log
+
+    def _wait_for_message(self, timeout: float) -> dict:
+        try:
+            message = self._messages.get(timeout=timeout)
+        except queue.Empty:
+            raise WorkerError(
+                f"Blender worker did not answer within {timeout}s",
+                self._take_log(),
+                worker_lost=True,
+            )
+        if message is None:
+            raise WorkerError(
+                "Blender worker exited unexpectedly", self._take_log(), worker_lost=True
+            )
+        return message
+
+    def run(self, json_path: str, fbx_path: str, timeout: float) -> str:
+        if not self.ready:
+            self._wait_for_message(STARTUP_TIMEOUT)
+            self.ready = True
+            self._take_log()
+
+        job_id = str(uuid.uuid4())
+        job = {"id": job_id, "json_path": json_path, "fbx_path": fbx_path}
+        try:
+            self.process.stdin.write(json.dumps(job) + "\n")
+            self.process.stdin.flush()
+        except OSError as e:
+            raise WorkerError(
+                f"Could not send job to Blender worker: {e}",
+                self._take_log(),
+                worker_lost=True,
+            )
+
+        result = self._wait_for_message(timeout)
+        log = self._take_log()
+        if not result.get("ok"):
+            raise WorkerError(result.get("error") or "Blender conversion failed", log)
+        return log
+
+    def stop(self):
+        try:
+            self.process.kill()
+            self.process.wait(timeout=5)
+        except Exception:
+            pass
+
+
+class BlenderWorkerPool:
+    def __init__(
+        self,
+        size: int = BLENDER_WORKER_COUNT,
+        job_timeout: float = JOB_TIMEOUT,
+        blender: str = "blender",
+    ):
+        self.size = max(1, size)
+        self.job_timeout = job_timeout
+        self.blender = blender
+        self._idle = queue.Queue()
+        self._started = False
+        # Lost workers whose replacement could not be launched yet
+        self._missing = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Launch the workers, or relaunch ones that could not be replaced."""
+        with self._lock:
+            if not self._started:
+                self._missing = self.size
+                self._started = True
+            while self._missing:
+                try:
+                    worker = _Worker(self.blender)
+                except OSError as e:
+                    raise WorkerError(f"Could not start Blender worker: {e}")
+                self._missing -= 1
+                self._idle.put(worker)
+
+    def _replace(self, worker: "_Worker") -> "_Worker":
+        """Stop a lost worker and launch its replacement, or None if that fails."""
+        worker.stop()
+        try:
+            return _Worker(self.blender)
+        except OSError as e:
+            print("Could not replace Blender worker, will retry:", e)
+            with self._lock:
+                self._missing += 1
+            return None
+
+    def convert(self, json_path: str, fbx_path: str, timeout: float = None) -> str:
+        """
+        Convert `json_path` to `fbx_path` on the next free worker, waiting for
+        one if all are busy.
+
+        :return: Blender's output for the job
+        :raises WorkerError: if the conversion fails or times out
+        """
+        while True:
+            # Relaunches workers an earlier job failed to replace, so the
+            # wait below can't outlast every worker being gone
+            self.start()
+            try:
+                worker = self._idle.get(timeout=1.0)
+                break
+            except queue.Empty:
+                continue
+
+        try:
+            return worker.run(json_path, fbx_path, timeout or self.job_timeout)
+        except WorkerError as e:
+            # A hung or crashed worker cannot take more jobs, replace it
+            if e.worker_lost:
+                worker = self._replace(worker)
+            raise
+        finally:
+            if worker is not None:
+                self._idle.put(worker)
+
+    def close(self):
+        with self._lock:
+            while not self._idle.empty():
+                self._idle.get_nowait().stop()
+            self._started = False
+            self._missing = 0
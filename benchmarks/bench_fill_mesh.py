@@ -0,0 +1,62 @@
+"""
+Time of building a mesh with `mesh_data.fill_mesh` against
+`mesh.from_pydata`, on quad grids of 10k to 1M vertices.
+
+    blender -b -P benchmarks/bench_fill_mesh.py -- [grid_side ...]
+
+"fill_mesh" starts from flat arrays, as a .bmesh problem or the streaming
+JSON loader hands them over; "face_arrays + fill_mesh" starts from the
+nested lists of a plain JSON file, as json_to_fbx.py does for those.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "addon"))
+
+import bpy
+import numpy as np
+
+from mesh_data import face_arrays, fill_mesh
+
+
+def grid(side: int):
+    """Vertices and quad faces of a side x side grid, as flat arrays."""
+    xs, ys = np.meshgrid(np.arange(side, dtype=np.float32), np.arange(side, dtype=np.float32))
+    vertices = np.stack([xs.ravel(), ys.ravel(), np.zeros(side * side, np.float32)], axis=1)
+    corner = (np.arange(side - 1)[None, :] + side * np.arange(side - 1)[:, None]).ravel()
+    quads = np.stack([corner, corner + 1, corner + side + 1, corner + side], axis=1)
+    face_offsets = np.arange(0, 4 * len(quads) + 1, 4, dtype=np.int32)
+    return vertices, quads, face_offsets, quads.ravel().astype(np.int32)
+
+
+def timed(build) -> float:
+    mesh = bpy.data.meshes.new("bench")
+    started = time.perf_counter()
+    build(mesh)
+    seconds = time.perf_counter() - started
+    bpy.data.meshes.remove(mesh)
+    return seconds
+
+
+def main():
+    args = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else []
+    sides = [int(arg) for arg in args] or [100, 300, 700, 1000]
+    print(f"{'vertices':>10} {'faces':>10} {'from_pydata s':>14} {'face_arrays + fill_mesh s':>26} {'fill_mesh s':>12}")
+    for side in sides:
+        vertices, quads, face_offsets, face_indices = grid(side)
+        vertex_list = vertices.tolist()
+        face_list = quads.tolist()
+
+        pydata = timed(lambda mesh: (mesh.from_pydata(vertex_list, [], face_list), mesh.update()))
+        from_lists = timed(lambda mesh: fill_mesh(mesh, vertex_list, *face_arrays(face_list)))
+        from_arrays = timed(lambda mesh: fill_mesh(mesh, vertices, face_offsets, face_indices))
+        print(
+            f"{len(vertices):>10,} {len(quads):>10,} {pydata:>14.3f} "
+            f"{from_lists:>26.3f} {from_arrays:>12.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
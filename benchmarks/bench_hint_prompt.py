@@ -0,0 +1,130 @@
+"""
+Size of the geometry part of the hint prompt: the geometry_diff summary
+against the old dump of every vertex of both objects.
+
+    python benchmarks/bench_hint_prompt.py [--ollama] [grid_side ...]
+
+Runs on the shipped problems and on subdivided grids of `grid_side` squared
+vertices, each against a half-finished attempt (part of the mesh pulled out
+of place and the whole thing a little off). Token counts are estimated at
+four characters per token. With --ollama, both prompts also go to llava on
+OLLAMA_HOST, and the prompt tokens it reports and the end-to-end latency
+are printed as well.
+"""
+
+import json
+import os
+import sys
+import time
+
+ADDON_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "addon")
+sys.path.insert(0, ADDON_DIR)
+
+import numpy as np
+import requests
+
+from geometry_diff import format_geometry_diff, geometry_diff
+from llm_client import OLLAMA_BASE_URL
+from mesh_data import face_arrays
+from shape_metrics import compare_shapes, format_shape_metrics
+from target_analysis import face_edges
+
+TOLERANCE = 0.1
+LLM_MODEL = "llava"
+PREAMBLE = (
+    "The user is stuck on creating a 3D model. Here is how the object they have "
+    "modeled so far compares to the object they are trying to model:\n\n"
+)
+
+
+def problems():
+    for name in ("easy", "medium", "hard"):
+        with open(os.path.join(ADDON_DIR, "jsons", f"{name}.json")) as f:
+            obj = json.load(f)["objects"][0]
+        yield name, np.asarray(obj["vertices"], dtype=np.float32), face_arrays(obj["faces"])
+
+
+def grid(side: int):
+    xs, ys = np.meshgrid(np.linspace(-1, 1, side), np.linspace(-1, 1, side))
+    heights = 0.3 * np.sin(3 * xs) * np.cos(3 * ys)
+    vertices = np.stack([xs.ravel(), ys.ravel(), heights.ravel()], axis=1)
+    corner = (np.arange(side - 1)[None, :] + side * np.arange(side - 1)[:, None]).ravel()
+    faces = np.stack([corner, corner + 1, corner + side + 1, corner + side], axis=1)
+    offsets = np.arange(0, faces.size + 1, 4)
+    return f"grid {side}x{side}", vertices.astype(np.float32), (offsets, faces.ravel())
+
+
+def attempt(target: np.ndarray) -> np.ndarray:
+    """The target with its upper half pulled 0.5 up and everything 0.05 off."""
+    user = target + 0.05
+    upper = target[:, 2] > np.median(target[:, 2])
+    user[upper, 2] += 0.5
+    return user
+
+
+def old_geometry(target, user) -> str:
+    """The vertex dump the hint prompt used to embed."""
+
+    def describe(points):
+        return json.dumps(
+            {
+                "vertex_count": len(points),
+                "vertex_coordinates": [f"({x}, {y}, {z})," for x, y, z in points.tolist()],
+                "location": "(0.0, 0.0, 0.0)",
+            }
+        )
+
+    return describe(target) + "\n\n" + describe(user)
+
+
+def new_geometry(target, user, edges, face_count) -> str:
+    diff = geometry_diff(target, user, edges, edges, TOLERANCE)
+    diff["target"]["faces"] = diff["user"]["faces"] = face_count
+    metrics = compare_shapes(target, user, TOLERANCE)
+    return format_geometry_diff(diff) + "\n" + format_shape_metrics(metrics)
+
+
+def ask_llava(geometry: str):
+    """Return (prompt tokens, seconds) for one non-streamed answer."""
+    started = time.perf_counter()
+    response = requests.post(
+        f"{OLLAMA_BASE_URL}/api/chat",
+        json={
+            "model": LLM_MODEL,
+            "messages": [{"role": "user", "content": PREAMBLE + geometry}],
+            "stream": False,
+            "options": {"temperature": 0, "num_predict": 96},
+        },
+        timeout=600,
+    )
+    response.raise_for_status()
+    return response.json().get("prompt_eval_count"), time.perf_counter() - started
+
+
+def main():
+    args = sys.argv[1:]
+    use_ollama = "--ollama" in args
+    sides = [int(arg) for arg in args if arg != "--ollama"] or [10, 30, 70]
+
+    columns = f"{'mesh':>14} {'vertices':>9} {'old ~tokens':>12} {'new ~tokens':>12}"
+    if use_ollama:
+        columns += f" {'old tokens':>11} {'new tokens':>11} {'old s':>7} {'new s':>7}"
+    print(columns)
+
+    cases = list(problems()) + [grid(side) for side in sides]
+    for name, target, (face_offsets, face_indices) in cases:
+        user = attempt(target)
+        edges = face_edges(face_offsets, face_indices)
+        old = old_geometry(target, user)
+        new = new_geometry(target, user, edges, len(face_offsets) - 1)
+
+        row = f"{name:>14} {len(target):>9,} {len(old) // 4:>12,} {len(new) // 4:>12,}"
+        if use_ollama:
+            old_tokens, old_seconds = ask_llava(old)
+            new_tokens, new_seconds = ask_llava(new)
+            row += f" {old_tokens:>11} {new_tokens:>11} {old_seconds:>7.1f} {new_seconds:>7.1f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Memory and time of validating a problem upload: streaming ingest
+(json_ingest.validate_problem_file) against loading the whole document with
+`json.load` and writing it back out, as /convert used to.
+
+    python benchmarks/bench_json_ingest.py [vertex_count]
+
+Defaults to a 1M-vertex payload (about 60 MB of JSON).
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "addon"))
+
+import numpy as np
+
+from json_ingest import validate_problem_file
+
+
+def write_payload(path: str, vertex_count: int):
+    """A grid of `vertex_count` vertices with one quad per grid cell, written in pieces."""
+    side = int(np.sqrt(vertex_count))
+    rng = np.random.default_rng(0)
+    vertices = rng.uniform(-10, 10, size=(side * side, 3)).round(6)
+    with open(path, "w") as f:
+        f.write('{"questionName": "bench", "expectedCompletionTime": 600, ')
+        f.write('"expectedNumOfActions": 40, "objects": [{"name": "Grid", "vertices": [')
+        for start in range(0, len(vertices), 100_000):
+            rows = vertices[start : start + 100_000].tolist()
+            f.write(("," if start else "") + ",".join(json.dumps(row) for row in rows))
+        f.write('], "faces": [')
+        cells = np.arange(side * (side - 1)).reshape(side - 1, side)[:, :-1].ravel()
+        quads = np.stack([cells, cells + 1, cells + side + 1, cells + side], axis=1)
+        for start in range(0, len(quads), 100_000):
+            rows = quads[start : start + 100_000].tolist()
+            f.write(("," if start else "") + ",".join(json.dumps(row) for row in rows))
+        f.write("]}]}")
+    return side * side
+
+
+def old_path(path: str):
+    with open(path) as f:
+        problem = json.load(f)
+    with open(path + ".copy", "w") as f:
+        json.dump(problem, f)
+    os.remove(path + ".copy")
+
+
+def measure(label: str, func, *args):
+    # Timed and traced in separate runs: tracemalloc slows allocation a lot
+    started = time.perf_counter()
+    func(*args)
+    seconds = time.perf_counter() - started
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {seconds:8.2f} s   peak {peak / 2**20:9.1f} MiB")
+
+
+def main():
+    vertex_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "payload.json")
+        vertex_count = write_payload(path, vertex_count)
+        print(f"{vertex_count} vertices, {os.path.getsize(path) / 2**20:.1f} MiB of JSON")
+        measure("streaming ingest", validate_problem_file, path)
+        measure("json.load + json.dump", old_path, path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Time of Submit's vertex matching (match_vertices) on meshes of 1k to 200k
+vertices, against the all-pairs loop it replaced.
+
+    python benchmarks/bench_matching.py [vertex_count ...]
+
+The all-pairs loop is only timed up to PAIRWISE_LIMIT vertices; past that
+it takes minutes.
+"""
+
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "addon"))
+
+import numpy as np
+
+from matching import match_vertices
+
+TOLERANCE = 0.1
+PAIRWISE_LIMIT = 2_000
+
+
+def pairwise(target, user, tolerance):
+    """The original check: every target vertex against every user vertex."""
+    return [any(math.dist(u, t) <= tolerance for u in user) for t in target]
+
+
+def grid_mesh(count: int, seed: int, jitter: float) -> np.ndarray:
+    """Vertices of a wavy surface spaced like a real mesh, jittered a little."""
+    side = int(math.sqrt(count))
+    xs, ys = np.meshgrid(np.linspace(-5, 5, side), np.linspace(-5, 5, side))
+    points = np.stack([xs.ravel(), ys.ravel(), np.sin(xs.ravel()) * np.cos(ys.ravel())], axis=1)
+    return points + np.random.default_rng(seed).normal(scale=jitter, size=points.shape)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 50_000, 200_000]
+    print(f"{'vertices':>10} {'match_vertices ms':>18} {'all pairs ms':>14} {'matched':>8}")
+    for count in sizes:
+        target = grid_mesh(count, 0, 0.0)
+        user = grid_mesh(count, 1, TOLERANCE / 3)
+
+        started = time.perf_counter()
+        matched = match_vertices(target, user, TOLERANCE)
+        fast = time.perf_counter() - started
+
+        slow = "-"
+        if len(target) <= PAIRWISE_LIMIT:
+            started = time.perf_counter()
+            expected = pairwise(target.tolist(), user.tolist(), TOLERANCE)
+            slow = f"{(time.perf_counter() - started) * 1e3:.0f}"
+            assert expected == matched.tolist()
+        print(f"{len(target):>10,} {fast * 1e3:>18.1f} {slow:>14} {matched.mean():>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
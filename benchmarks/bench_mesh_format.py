@@ -0,0 +1,88 @@
+"""
+File size and parse time of .bmesh against the JSON problems.
+
+    python benchmarks/bench_mesh_format.py [grid_vertices ...]
+
+Runs on the three bundled problems, then on synthetic grids of the given
+vertex counts (default 10k, 100k and 1M), since the bundled meshes are tiny.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, "addon"))
+
+import numpy as np
+
+import mesh_format
+from json_ingest import load_problem_file
+
+JSON_DIR = os.path.join(BASE_DIR, "addon", "jsons")
+
+
+def best_of(func, *args, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def json_load(path: str):
+    with open(path) as f:
+        return json.load(f)
+
+
+def grid_problem(vertex_count: int) -> dict:
+    side = int(np.sqrt(vertex_count))
+    xs, ys = np.meshgrid(np.arange(side, dtype=np.float32), np.arange(side, dtype=np.float32))
+    vertices = np.stack([xs.ravel(), ys.ravel(), np.sin(xs.ravel() * 0.1)], axis=1).round(4)
+    cells = np.arange(side * (side - 1)).reshape(side - 1, side)[:, :-1].ravel()
+    faces = np.stack([cells, cells + 1, cells + side + 1, cells + side], axis=1)
+    return {
+        "questionName": f"grid-{side * side}",
+        "expectedCompletionTime": 600,
+        "expectedNumOfActions": 40,
+        "objects": [{"name": "Grid", "vertices": vertices.tolist(), "faces": faces.tolist()}],
+    }
+
+
+def compare(label: str, json_path: str, directory: str):
+    bmesh_path = os.path.join(directory, os.path.basename(json_path) + mesh_format.EXTENSION)
+    mesh_format.write(bmesh_path, json_load(json_path))
+    repeat = 5 if os.path.getsize(json_path) < 10 * 2**20 else 1
+
+    json_size = os.path.getsize(json_path)
+    bmesh_size = os.path.getsize(bmesh_path)
+    load = best_of(json_load, json_path, repeat=repeat)
+    stream = best_of(load_problem_file, json_path, repeat=repeat)
+    decode = best_of(mesh_format.read, bmesh_path, repeat=repeat)
+    print(
+        f"{label:<14} {json_size:>12,} {bmesh_size:>12,} {json_size / bmesh_size:6.1f}x"
+        f" {load * 1e3:11.2f} {stream * 1e3:11.2f} {decode * 1e3:11.3f}"
+    )
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    print(
+        f"{'problem':<14} {'JSON bytes':>12} {'.bmesh bytes':>12} {'ratio':>7}"
+        f" {'json.load ms':>11} {'stream ms':>11} {'decode ms':>11}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ("easy", "medium", "hard"):
+            compare(name, os.path.join(JSON_DIR, f"{name}.json"), directory)
+        for vertex_count in sizes:
+            path = os.path.join(directory, f"grid-{vertex_count}.json")
+            with open(path, "w") as f:
+                json.dump(grid_problem(vertex_count), f)
+            compare(f"grid {vertex_count:,}", path, directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Latency and payload size of the hint screenshot: offscreen capture scaled to
+several maximum edges and encoded once, against the old screenshot_area PNG
+re-opened and re-encoded as a full-resolution JPEG.
+
+    blender -P benchmarks/bench_screenshot.py -- [max_edge ...]
+
+Drawing the viewport needs a window, so run Blender with its UI (not -b);
+it quits once the table is printed.
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "addon"))
+
+import bpy
+from PIL import Image
+
+from screenshot import capture_viewport_image, convert_to_base64
+
+REPEATS = 10
+
+
+def view3d():
+    for area in bpy.context.window.screen.areas:
+        if area.type == "VIEW_3D":
+            for region in area.regions:
+                if region.type == "WINDOW":
+                    return area, region
+    raise RuntimeError("No 3D viewport in the current screen")
+
+
+def old_screenshot(area, region) -> str:
+    """What get_screenshot_base64 did before: PNG on disk, then JPEG at full size."""
+    with bpy.context.temp_override(
+        window=bpy.context.window,
+        screen=bpy.context.window.screen,
+        area=area,
+        region=region,
+        space=area.spaces[0],
+    ):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            out_path = os.path.join(tmp_dir, "viewport.png")
+            bpy.ops.screen.screenshot_area(filepath=out_path)
+            with Image.open(out_path) as image:
+                return convert_to_base64(image, max_edge=max(image.size))
+
+
+def measure(capture):
+    times = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        payload = capture()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), len(payload)
+
+
+def main():
+    args = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else []
+    max_edges = [int(arg) for arg in args] or [1920, 1280, 768, 512, 384]
+    area, region = view3d()
+
+    print(f"viewport {region.width}x{region.height}, median of {REPEATS}")
+    print(f"{'path':>28} {'ms':>8} {'base64 bytes':>13}")
+    seconds, size = measure(lambda: old_screenshot(area, region))
+    print(f"{'screenshot_area, full size':>28} {seconds * 1e3:>8.1f} {size:>13,}")
+    for max_edge in max_edges:
+        seconds, size = measure(
+            lambda: convert_to_base64(
+                capture_viewport_image(area, region, max_edge), max_edge
+            )
+        )
+        print(f"{f'offscreen, max edge {max_edge}':>28} {seconds * 1e3:>8.1f} {size:>13,}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        bpy.ops.wm.quit_blender()
@@ -0,0 +1,56 @@
+"""
+Time of compare_shapes (both nearest-vertex directions) for meshes of 1k to
+200k vertices.
+
+    python benchmarks/bench_shape_metrics.py [vertex_count ...]
+    blender -b -P benchmarks/bench_shape_metrics.py -- [vertex_count ...]
+
+Under plain Python this measures the NumPy PointTree; inside Blender,
+`matching.point_tree` uses the compiled mathutils.kdtree instead, which is
+what Submit and Hint run on.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "addon"))
+
+import numpy as np
+
+import matching
+from shape_metrics import compare_shapes
+
+
+def sphere(count: int, seed: int, radius: float = 1.0) -> np.ndarray:
+    points = np.random.default_rng(seed).normal(size=(count, 3))
+    return radius * points / np.linalg.norm(points, axis=1, keepdims=True)
+
+
+def main():
+    args = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else sys.argv[1:]
+    sizes = [int(arg) for arg in args] or [1_000, 10_000, 50_000, 200_000]
+    backend = "mathutils.kdtree" if matching._kdtree is not None else "NumPy PointTree"
+    print(f"backend: {backend}")
+    print(f"{'vertices':>10} {'target tree s':>14} {'compare s':>10} {'compare, tree built s':>22}")
+    for count in sizes:
+        target = sphere(count, 0)
+        # A close attempt: every vertex a little off the target surface
+        user = sphere(count, 1, radius=1.01)
+
+        started = time.perf_counter()
+        tree = matching.point_tree(target)
+        build = time.perf_counter() - started
+
+        started = time.perf_counter()
+        compare_shapes(target, user, 0.1)
+        cold = time.perf_counter() - started
+
+        started = time.perf_counter()
+        compare_shapes(target, user, 0.1, target_tree=tree)
+        warm = time.perf_counter() - started
+        print(f"{count:>10,} {build:>14.3f} {cold:>10.3f} {warm:>22.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Latency and throughput of JSON -> FBX conversion on the warm worker pool
+against launching `blender -b` for every request, as /convert used to.
+
+    python benchmarks/bench_worker_pool.py [requests] [concurrency]
+
+Needs `blender` on PATH (or BLENDER set to its path). Converts
+addon/jsons/medium.json `requests` times with `concurrency` requests in
+flight; the pool gets as many workers as there are requests in flight.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ADDON_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "addon")
+sys.path.insert(0, ADDON_DIR)
+
+from worker_pool import BlenderWorkerPool
+
+BLENDER = os.environ.get("BLENDER", "blender")
+CONVERTER_SCRIPT = os.path.join(ADDON_DIR, "converters", "json_to_fbx.py")
+PROBLEM = os.path.join(ADDON_DIR, "jsons", "medium.json")
+
+
+def spawn_convert(json_path: str, fbx_path: str):
+    """The old /convert path: a fresh Blender per request."""
+    result = subprocess.run(
+        [BLENDER, "-b", "-P", CONVERTER_SCRIPT, "--", json_path, fbx_path],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+
+
+def run(convert, requests: int, concurrency: int, out_dir: str):
+    def timed(i):
+        started = time.perf_counter()
+        convert(PROBLEM, os.path.join(out_dir, f"{i}.fbx"))
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        latencies = sorted(executor.map(timed, range(requests)))
+    wall = time.perf_counter() - started
+    p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+    return statistics.median(latencies), p95, requests / wall
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+
+    print(f"{requests} conversions of {os.path.basename(PROBLEM)}, {concurrency} in flight")
+    print(f"{'path':>16} {'median s':>9} {'p95 s':>7} {'req/s':>7}")
+    with tempfile.TemporaryDirectory() as out_dir:
+        median, p95, throughput = run(spawn_convert, requests, concurrency, out_dir)
+        print(f"{'spawn per req':>16} {median:>9.2f} {p95:>7.2f} {throughput:>7.2f}")
+
+        pool = BlenderWorkerPool(size=concurrency, blender=BLENDER)
+        try:
+            started = time.perf_counter()
+            pool.start()
+            # The first job on each worker also waits for it to finish starting
+            run(pool.convert, concurrency, concurrency, out_dir)
+            print(f"pool warm-up: {time.perf_counter() - started:.2f}s")
+
+            median, p95, throughput = run(pool.convert, requests, concurrency, out_dir)
+            print(f"{'worker pool':>16} {median:>9.2f} {p95:>7.2f} {throughput:>7.2f}")
+        finally:
+            pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+"""
+The addon's modules import each other as top-level modules (addon.py puts
+its own directory on sys.path inside Blender), so do the same here. Only
+modules that don't need `bpy` can be tested outside Blender.
+"""
+
+import os
+import sys
+
+ADDON_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "addon")
+if ADDON_DIR not in sys.path:
+    sys.path.insert(0, ADDON_DIR)
@@ -0,0 +1,63 @@
+import time
+
+import numpy as np
+
+from hint_cache import HintCache, geometry_signature, hint_key
+
+CUBE = np.array([[x, y, z] for x in (0, 1) for y in (0, 1) for z in (0, 1)], dtype=np.float64)
+
+
+def test_signature_ignores_order_and_tiny_moves():
+    signature = geometry_signature(CUBE, 0.1)
+    assert geometry_signature(CUBE[::-1], 0.1) == signature
+    assert geometry_signature(CUBE + 0.001, 0.1) == signature
+    assert geometry_signature(CUBE + [0.5, 0, 0], 0.1) != signature
+
+
+def test_key_collapses_repeated_actions():
+    signature = geometry_signature(CUBE, 0.1)
+    assert hint_key("q", signature, ["Move", "Move", " Move", "Extrude"]) == hint_key(
+        "q", signature, ["Move", "Extrude", ""]
+    )
+    assert hint_key("q", signature, ["Move"]) != hint_key("other", signature, ["Move"])
+
+
+def test_each_hint_number_gets_its_own_key():
+    signature = geometry_signature(CUBE, 0.1)
+    keys = {hint_key("q", signature, ["Move"], hint_number=number) for number in range(3)}
+    assert len(keys) == 3
+    assert hint_key("q", signature, ["Move"]) == hint_key("q", signature, ["Move"], hint_number=0)
+
+
+def test_cache_hits_misses_and_saved_time(tmp_path):
+    cache = HintCache(str(tmp_path / "hints.sqlite3"))
+    assert cache.get("a") is None
+    cache.put("a", "Try an inset", 2.5)
+    assert cache.get("a") == "Try an inset"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["llm_seconds_saved"] == 2.5
+    cache.close()
+
+
+def test_cache_survives_reopening(tmp_path):
+    path = str(tmp_path / "hints.sqlite3")
+    cache = HintCache(path)
+    cache.put("a", "hint", 1.0)
+    cache.close()
+    assert HintCache(path).get("a") == "hint"
+
+
+def test_cache_expires_and_evicts(tmp_path):
+    cache = HintCache(str(tmp_path / "hints.sqlite3"), max_entries=2, ttl=0.05)
+    cache.put("old", "hint", 1.0)
+    time.sleep(0.1)
+    assert cache.get("old") is None
+
+    cache.ttl = 3600
+    for key in ("a", "b", "c"):
+        cache.put(key, key, 1.0)
+        time.sleep(0.01)
+    assert cache.get("a") is None
+    assert cache.get("c") == "c"
+    assert cache.stats()["entries"] == 2
@@ -0,0 +1,98 @@
+import json
+import random
+
+import pytest
+
+import json_ingest
+from json_ingest import IngestError, validate_problem_file
+
+
+def _problem(rng: random.Random, vertex_count: int = 40) -> dict:
+    numbers = [0, -1, 7, 0.5, -2.25, 1e-3, 1.5e10, -3.75e-7, 123456.789]
+    vertices = [[rng.choice(numbers) for _ in range(3)] for _ in range(vertex_count)]
+    faces = [[i, (i + 1) % vertex_count, (i + 2) % vertex_count] for i in range(0, vertex_count, 3)]
+    return {
+        "questionName": "fuzz",
+        "expectedCompletionTime": 120,
+        "objects": [
+            {"name": "Cube", "vertices": vertices, "faces": faces},
+            {"name": "Plane", "vertices": vertices[:4], "faces": [[0, 1, 2, 3]], "extra": 1.25},
+        ],
+        "expectedNumOfActions": 12,
+        # Numbers last, so one of them ends the document
+        "trail": 1.5e10,
+    }
+
+
+def _write(tmp_path, text: str) -> str:
+    path = tmp_path / "problem.json"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("indent", [None, 1])
+def test_every_chunk_boundary_gives_the_same_result(tmp_path, monkeypatch, indent):
+    problem = _problem(random.Random(indent or 0))
+    text = json.dumps(problem, indent=indent)
+    path = _write(tmp_path, text)
+
+    expected = validate_problem_file(path)
+    assert expected[0]["trail"] == 1.5e10
+    assert expected[2] == 44
+
+    # Reading one chunk size after another puts a chunk boundary at every
+    # position of the document, including inside numbers ("1." | "5")
+    for chunk_size in range(1, min(len(text), 400) + 1):
+        monkeypatch.setattr(json_ingest, "_CHUNK_SIZE", chunk_size)
+        assert validate_problem_file(path) == expected, chunk_size
+
+
+def test_random_chunk_sizes_on_a_large_problem(tmp_path, monkeypatch):
+    rng = random.Random(1)
+    problem = _problem(rng, vertex_count=3000)
+    path = _write(tmp_path, json.dumps(problem))
+    expected = validate_problem_file(path)
+
+    for chunk_size in rng.sample(range(2, 5000), 40):
+        monkeypatch.setattr(json_ingest, "_CHUNK_SIZE", chunk_size)
+        assert validate_problem_file(path) == expected, chunk_size
+
+
+def test_fields_and_vertex_count(tmp_path):
+    fields, objects_hash, vertex_count = validate_problem_file(
+        _write(tmp_path, json.dumps(_problem(random.Random(2))))
+    )
+    assert fields == {
+        "questionName": "fuzz",
+        "expectedCompletionTime": 120,
+        "expectedNumOfActions": 12,
+        "trail": 1.5e10,
+    }
+    assert vertex_count == 44
+    assert len(objects_hash) == 64
+
+
+def test_same_objects_hash_regardless_of_formatting(tmp_path):
+    problem = _problem(random.Random(3))
+    compact = validate_problem_file(_write(tmp_path, json.dumps(problem)))
+    indented = validate_problem_file(_write(tmp_path, json.dumps(problem, indent=4)))
+    assert compact[1] == indented[1]
+
+
+@pytest.mark.parametrize(
+    "text, message",
+    [
+        ('{"objects": [', "Expected"),
+        ('{"questionName": "q"}', "missing 'objects'"),
+        ('{"objects": [{"name": "a", "vertices": []}]}', "missing faces"),
+        ('{"objects": [{"name": "a", "vertices": [[0, 0]], "faces": []}]}', "Vertex 0"),
+        ('{"objects": [{"name": "a", "vertices": [[0, 0, 0]], "faces": [[0, 1]]}]}', "vertex 1"),
+        ('{"objects": [{"name": "a", "vertices": [[0, 0, 0]], "faces": [[-1]]}]}', "Face 0"),
+        ('{"objects": [{"name": 3, "vertices": [], "faces": []}]}', "name must be a string"),
+        ('{"objects": []} []', "Unexpected data"),
+        ('{"objects": [], "x": 1.5.5}', "Expected"),
+    ],
+)
+def test_rejects_invalid_problems(tmp_path, text, message):
+    with pytest.raises(IngestError, match=message):
+        validate_problem_file(_write(tmp_path, text))
@@ -0,0 +1,214 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from llm_client import LLMClient, OpenAICompatibleClient
+
+
+class _OllamaAPI(BaseHTTPRequestHandler):
+    """
+    Just enough of the Ollama API: /api/chat (streamed or not) answers with
+    the last message reversed, /api/generate without a prompt loads a model.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, body))
+            server.peers.add(self.client_address)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(server.delay)
+            if self.path == "/api/generate":
+                self._send_json({"model": body["model"], "response": "", "done": True})
+            elif self.path == "/api/chat":
+                self._chat(body)
+            else:
+                self.send_error(404)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _chat(self, body):
+        answer = body["messages"][-1]["content"][::-1]
+
+        def line(content, done):
+            message = {"role": "assistant", "content": content}
+            return {"model": body["model"], "message": message, "done": done, "done_reason": "stop"}
+
+        if body.get("stream", True):
+            pieces = [answer[i : i + 3] for i in range(0, len(answer), 3)]
+            lines = [line(piece, False) for piece in pieces] + [line("", True)]
+        else:
+            lines = [line(answer, True)]
+        payload = b"".join(json.dumps(line).encode() + b"\n" for line in lines)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_json(self, data):
+        payload = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def ollama():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OllamaAPI)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = []
+    server.peers = set()
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.delay = 0.0
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_invoke_and_stream(ollama):
+    client = LLMClient("llava", base_url=ollama.url)
+    assert client.invoke([("human", "hello there")]) == "ereht olleh"
+    chunks = list(client.stream([("human", "hello there")]))
+    assert "".join(chunks) == "ereht olleh"
+    assert len(chunks) > 1
+    assert all(body["model"] == "llava" for _, body in ollama.requests)
+
+
+def test_async_invoke_and_stream(ollama):
+    client = LLMClient("llava", base_url=ollama.url)
+
+    async def run():
+        answer = await client.ainvoke([("human", "abc")])
+        chunks = [chunk async for chunk in client.astream([("human", "abcdef")])]
+        return answer, chunks
+
+    assert asyncio.run(run()) == ("cba", ["fed", "cba"])
+
+
+def test_chat_model_is_built_once(ollama):
+    client = LLMClient("llava", base_url=ollama.url)
+    chat = client.chat
+    for _ in range(3):
+        client.invoke([("human", "x")])
+    assert client.chat is chat
+
+
+def test_connections_are_kept_alive(ollama):
+    client = LLMClient("llava", base_url=ollama.url, max_concurrent=1)
+    for _ in range(5):
+        client.invoke([("human", "ping")])
+    assert len(ollama.requests) == 5
+    assert len(ollama.peers) == 1
+
+
+def test_max_concurrent_bounds_requests_in_flight(ollama):
+    ollama.delay = 0.05
+    client = LLMClient("llava", base_url=ollama.url, max_concurrent=2)
+    threads = [
+        threading.Thread(target=client.invoke, args=([("human", "x")],)) for _ in range(6)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(ollama.requests) == 6
+    assert ollama.max_in_flight == 2
+
+
+def test_warm_up_loads_the_model(ollama):
+    client = LLMClient("llava", base_url=ollama.url, keep_alive="10m")
+    client.warm_up(background=False)
+    assert ollama.requests == [
+        ("/api/generate", {"model": "llava", "keep_alive": "10m"})
+    ]
+
+
+def test_warm_up_failure_is_not_raised():
+    # Nothing listens on port 9 of localhost
+    LLMClient("llava", base_url="127.0.0.1:9").warm_up(background=False)
+
+
+def test_base_url_without_scheme():
+    assert LLMClient("llava", base_url="localhost:11434/").base_url == "http://localhost:11434"
+
+
+class _ChatCompletions(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._send(b'{"data": []}', "application/json")
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.bodies.append(body)
+        answer = body["messages"][-1]["content"].upper()
+        if body["stream"]:
+            events = [
+                {"choices": [{"delta": {"content": answer[:2]}}]},
+                {"choices": [{"delta": {"content": answer[2:]}}]},
+            ]
+            payload = b"".join(b"data: " + json.dumps(e).encode() + b"\n\n" for e in events)
+            self._send(payload + b"data: [DONE]\n\n", "text/event-stream")
+        else:
+            payload = {"choices": [{"message": {"role": "assistant", "content": answer}}]}
+            self._send(json.dumps(payload).encode(), "application/json")
+
+    def _send(self, payload, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def openai_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ChatCompletions)
+    server.daemon_threads = True
+    server.bodies = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/v1", server
+    server.shutdown()
+    server.server_close()
+
+
+def test_openai_compatible_client(openai_server):
+    url, server = openai_server
+    client = OpenAICompatibleClient("qwen", url, temperature=0.5)
+    messages = [("system", "be brief"), ("human", "hello")]
+    assert client.invoke(messages) == "HELLO"
+    assert list(client.stream(messages)) == ["HE", "LLO"]
+
+    async def run():
+        chunks = [chunk async for chunk in client.astream(messages)]
+        return await client.ainvoke(messages), chunks
+
+    assert asyncio.run(run()) == ("HELLO", ["HE", "LLO"])
+    assert server.bodies[0]["messages"] == [
+        {"role": "system", "content": "be brief"},
+        {"role": "user", "content": "hello"},
+    ]
+    assert server.bodies[0]["temperature"] == 0.5
@@ -0,0 +1,285 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import llm_router
+from llm_client import LLMClient, OpenAICompatibleClient
+from llm_router import AllBackendsFailed, LLMRouter, parse_backends
+
+
+class StubBackend:
+    """Answers `answer` after `delay` seconds, or raises `error`."""
+
+    def __init__(self, name, answer=None, delay=0.0, error=None, chunks=None):
+        self.name = name
+        self.answer = answer if answer is not None else f"from {name}"
+        self.delay = delay
+        self.error = error
+        self.chunks = chunks
+        self.max_concurrent = 2
+        self.calls = 0
+        self.cancelled = False
+
+    def invoke(self, messages):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.answer
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return self.answer
+
+    def stream(self, messages):
+        self.calls += 1
+        for chunk in self.chunks or []:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+    async def astream(self, messages):
+        for chunk in self.stream(messages):
+            yield chunk
+
+    def warm_up(self, background=True):
+        pass
+
+
+def _measure(router, backend, seconds):
+    router._record(backend, seconds)
+
+
+def test_picks_fastest_measured_backend():
+    slow = StubBackend("slow")
+    fast = StubBackend("fast")
+    router = LLMRouter([slow, fast], latency_budget=5)
+    _measure(router, slow, 2.0)
+    _measure(router, fast, 0.5)
+    assert router.invoke([]) == "from fast"
+    assert slow.calls == 0
+
+
+def test_unmeasured_backends_come_after_measured_ones():
+    new = StubBackend("new")
+    measured = StubBackend("measured")
+    router = LLMRouter([new, measured])
+    _measure(router, measured, 10.0)
+    assert [backend.name for backend in router.ranked()] == ["measured", "new"]
+
+
+def test_resting_backend_comes_last(monkeypatch):
+    monkeypatch.setattr(llm_router, "BACKEND_COOLDOWN", 60)
+    flaky = StubBackend("flaky")
+    other = StubBackend("other")
+    router = LLMRouter([flaky, other])
+    _measure(router, flaky, 0.1)
+    _measure(router, other, 5.0)
+    for _ in range(5):
+        router._record(flaky, failed=True)
+    assert router.stats()["flaky"]["healthy"] is False
+    assert [backend.name for backend in router.ranked()] == ["other", "flaky"]
+
+
+def test_fails_over_to_next_backend():
+    broken = StubBackend("broken", error=RuntimeError("boom"))
+    working = StubBackend("working")
+    router = LLMRouter([broken, working])
+    _measure(router, broken, 0.1)
+    _measure(router, working, 1.0)
+    assert router.invoke([]) == "from working"
+    stats = router.stats()
+    assert stats["broken"]["failures"] == 1
+    assert stats["working"]["failures"] == 0
+
+
+def test_all_backends_failed_lists_every_error():
+    router = LLMRouter(
+        [
+            StubBackend("a", error=RuntimeError("a down")),
+            StubBackend("b", error=ValueError("b down")),
+        ]
+    )
+    with pytest.raises(AllBackendsFailed) as info:
+        router.invoke([])
+    assert set(info.value.errors) == {"a", "b"}
+    assert "a down" in str(info.value) and "b down" in str(info.value)
+
+
+def test_hedges_a_slow_request():
+    slow = StubBackend("slow", delay=1.0)
+    fast = StubBackend("fast", delay=0.0)
+    router = LLMRouter([slow, fast], latency_budget=0.05)
+    _measure(router, slow, 0.01)
+    _measure(router, fast, 0.02)
+
+    started = time.perf_counter()
+    assert router.invoke([]) == "from fast"
+    assert time.perf_counter() - started < 0.5
+    assert slow.calls == fast.calls == 1
+
+
+def test_no_hedge_within_budget():
+    first = StubBackend("first", delay=0.05)
+    second = StubBackend("second")
+    router = LLMRouter([first, second], latency_budget=1.0)
+    _measure(router, first, 0.01)
+    _measure(router, second, 0.02)
+    assert router.invoke([]) == "from first"
+    assert second.calls == 0
+
+
+def test_async_hedge_cancels_loser_without_counting_it():
+    slow = StubBackend("slow", delay=1.0)
+    fast = StubBackend("fast")
+    router = LLMRouter([slow, fast], latency_budget=0.05)
+    _measure(router, slow, 0.01)
+    _measure(router, fast, 0.02)
+
+    assert asyncio.run(router.ainvoke([])) == "from fast"
+    assert slow.cancelled
+    stats = router.stats()
+    # Cancelled, so neither a request nor a failure, but known to be slow
+    assert stats["slow"]["requests"] == 1
+    assert stats["slow"]["failures"] == 0
+    assert stats["slow"]["latency"] >= 0.05
+    assert [backend.name for backend in router.ranked()] == ["fast", "slow"]
+
+
+def test_async_failover():
+    broken = StubBackend("broken", error=RuntimeError("boom"))
+    working = StubBackend("working")
+    router = LLMRouter([broken, working])
+    _measure(router, broken, 0.1)
+    _measure(router, working, 1.0)
+    assert asyncio.run(router.ainvoke([])) == "from working"
+    assert router.stats()["broken"]["failures"] == 1
+
+
+def test_stream_fails_over_before_first_chunk():
+    broken = StubBackend("broken", chunks=[RuntimeError("boom")])
+    working = StubBackend("working", chunks=["a", "b"])
+    router = LLMRouter([broken, working])
+    _measure(router, broken, 0.1)
+    _measure(router, working, 1.0)
+    assert list(router.stream([])) == ["a", "b"]
+
+
+def test_stream_does_not_fail_over_mid_answer():
+    broken = StubBackend("broken", chunks=["a", RuntimeError("boom")])
+    working = StubBackend("working", chunks=["x"])
+    router = LLMRouter([broken, working])
+    _measure(router, broken, 0.1)
+    _measure(router, working, 1.0)
+    with pytest.raises(RuntimeError):
+        list(router.stream([]))
+    assert working.calls == 0
+
+
+def test_astream_fails_over_before_first_chunk():
+    broken = StubBackend("broken", chunks=[RuntimeError("boom")])
+    working = StubBackend("working", chunks=["a", "b"])
+    router = LLMRouter([broken, working])
+    _measure(router, broken, 0.1)
+    _measure(router, working, 1.0)
+
+    async def collect():
+        return [chunk async for chunk in router.astream([])]
+
+    assert asyncio.run(collect()) == ["a", "b"]
+
+
+def test_parse_backends():
+    backends = parse_backends(
+        "ollama:llava, ollama:llava:7b@http://gpu:11434,openai:qwen@http://127.0.0.1:8080/v1"
+    )
+    assert [type(backend) for backend in backends] == [
+        LLMClient,
+        LLMClient,
+        OpenAICompatibleClient,
+    ]
+    assert [backend.name for backend in backends] == [
+        "ollama:llava",
+        "ollama:llava:7b@http://gpu:11434",
+        "openai:qwen@http://127.0.0.1:8080/v1",
+    ]
+    assert backends[1].model == "llava:7b"
+
+
+@pytest.mark.parametrize("spec", ["ollama:", "openai:qwen", "bard:x"])
+def test_parse_backends_rejects_bad_entries(spec):
+    with pytest.raises(ValueError):
+        parse_backends(spec)
+
+
+class _ChatCompletions(BaseHTTPRequestHandler):
+    """OpenAI-compatible /chat/completions that answers, fails or stalls."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        mode = self.server.mode
+        if mode == "fail":
+            self.send_error(503)
+            return
+        if mode == "slow":
+            time.sleep(1.0)
+        payload = json.dumps(
+            {"choices": [{"message": {"content": f"{self.server.name}:{body['model']}"}}]}
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    servers = []
+
+    def start(name, mode):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _ChatCompletions)
+        server.daemon_threads = True
+        server.name = name
+        server.mode = mode
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}/v1"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_failover_and_hedging_across_stub_servers(stub_server):
+    down = stub_server("down", "fail")
+    slow = stub_server("slow", "slow")
+    fast = stub_server("fast", "ok")
+    router = LLMRouter(
+        parse_backends(f"openai:m@{down},openai:m@{slow},openai:m@{fast}"),
+        latency_budget=0.1,
+    )
+    names = [backend.name for backend in router.backends]
+    router._record(router.backends[0], 0.01)
+    router._record(router.backends[1], 0.02)
+    router._record(router.backends[2], 0.03)
+
+    # "down" fails over to "slow", which is hedged by "fast" past the budget
+    assert router.invoke([("human", "hi")]) == "fast:m"
+    assert asyncio.run(router.ainvoke([("human", "hi")])) == "fast:m"
+    assert router.stats()[names[0]]["failures"] == 2
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from matching import VertexGrid, match_vertices
+
+
+def _brute_force_match(target, user, tolerance):
+    if not len(user):
+        return np.zeros(len(target), dtype=bool)
+    distances = np.sqrt(((target[:, None, :] - user[None, :, :]) ** 2).sum(axis=2))
+    return (distances <= tolerance).any(axis=1)
+
+
+def _brute_force_nearest(points, queries, radius):
+    distances = np.sqrt(((queries[:, None, :] - points[None, :, :]) ** 2).sum(axis=2))
+    nearest = distances.argmin(axis=1)
+    best = distances[np.arange(len(queries)), nearest]
+    in_range = best <= radius
+    return np.where(in_range, best, np.inf), np.where(in_range, nearest, -1)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("tolerance", [0.05, 0.1, 0.5])
+def test_match_vertices_matches_brute_force(seed, tolerance):
+    rng = np.random.default_rng(seed)
+    target = rng.uniform(-2, 2, size=(400, 3))
+    # Some user vertices right next to target vertices, the rest anywhere
+    near = target[rng.choice(len(target), 150)] + rng.normal(scale=tolerance, size=(150, 3))
+    user = np.vstack([near, rng.uniform(-2, 2, size=(100, 3))])
+    np.testing.assert_array_equal(
+        match_vertices(target, user, tolerance), _brute_force_match(target, user, tolerance)
+    )
+
+
+def test_match_vertices_at_exactly_the_tolerance():
+    target = np.zeros((1, 3))
+    assert match_vertices(target, [[0.1, 0.0, 0.0]], 0.1)[0]
+    assert not match_vertices(target, [[0.1001, 0.0, 0.0]], 0.1)[0]
+
+
+def test_match_vertices_across_cell_borders_and_negative_coordinates():
+    # Pairs that straddle cell boundaries in every axis and around the origin
+    target = np.array([[-0.01, -0.01, -0.01], [0.99, 1.99, -3.01], [-5.0, 5.0, 0.0]])
+    user = target + [0.02, 0.02, 0.02]
+    assert match_vertices(target, user, 0.1).all()
+
+
+def test_match_vertices_with_no_user_vertices():
+    assert not match_vertices(np.ones((3, 3)), np.empty((0, 3)), 0.1).any()
+    assert len(match_vertices(np.empty((0, 3)), np.ones((3, 3)), 0.1)) == 0
+
+
+def test_match_vertices_far_from_the_origin():
+    # Cell keys wrap around at large coordinates; that may only add candidates
+    target = np.array([[1e6, -1e6, 3e5]])
+    assert match_vertices(target, target + 0.05, 0.1)[0]
+    assert not match_vertices(target, target + 1.0, 0.1)[0]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_nearest_within_cell_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    points = rng.uniform(-1, 1, size=(300, 3))
+    queries = rng.uniform(-1.2, 1.2, size=(200, 3))
+    distances, indices = VertexGrid(points, 0.2).nearest_within_cell(queries)
+    expected_distances, expected_indices = _brute_force_nearest(points, queries, 0.2)
+    np.testing.assert_allclose(distances, expected_distances)
+    np.testing.assert_array_equal(indices, expected_indices)
+
+
+def test_grid_round_trips_through_arrays():
+    rng = np.random.default_rng(7)
+    points = rng.uniform(-1, 1, size=(100, 3))
+    queries = rng.uniform(-1, 1, size=(50, 3))
+    grid = VertexGrid(points, 0.3)
+    rebuilt = VertexGrid.from_arrays(grid.to_arrays())
+    for a, b in zip(grid.nearest_within_cell(queries), rebuilt.nearest_within_cell(queries)):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_grid_rejects_non_positive_cell_size():
+    with pytest.raises(ValueError):
+        VertexGrid(np.zeros((1, 3)), 0)
@@ -0,0 +1,132 @@
+import json
+import os
+import struct
+
+import numpy as np
+import pytest
+
+import mesh_format
+from json_ingest import load_problem_file
+from mesh_format import MeshFormatError
+
+JSON_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "addon", "jsons")
+PROBLEMS = ["easy", "medium", "hard"]
+
+
+def _load(name: str) -> dict:
+    with open(os.path.join(JSON_DIR, f"{name}.json")) as f:
+        return json.load(f)
+
+
+def _two_triangles() -> dict:
+    return {
+        "questionName": "q",
+        "expectedNumOfActions": 2,
+        "objects": [
+            {
+                "name": "Wedge",
+                "vertices": [[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0]],
+                "faces": [[0, 1, 2], [1, 3, 2]],
+            }
+        ],
+    }
+
+
+def _assert_same_problem(decoded: dict, problem: dict):
+    assert {k: v for k, v in decoded.items() if k != "objects"} == {
+        k: v for k, v in problem.items() if k != "objects"
+    }
+    assert len(decoded["objects"]) == len(problem["objects"])
+    for obj, expected in zip(decoded["objects"], problem["objects"]):
+        assert obj["name"] == expected["name"]
+        np.testing.assert_array_equal(
+            obj["vertices"], np.asarray(expected["vertices"], dtype=np.float32).reshape(-1, 3)
+        )
+        assert mesh_format.faces_as_lists(obj) == expected["faces"]
+
+
+@pytest.mark.parametrize("name", PROBLEMS)
+def test_round_trip_bundled_problems(name):
+    problem = _load(name)
+    _assert_same_problem(mesh_format.decode(mesh_format.encode(problem)), problem)
+
+
+@pytest.mark.parametrize("name", PROBLEMS)
+def test_write_and_memory_mapped_read(tmp_path, name):
+    problem = _load(name)
+    path = str(tmp_path / f"{name}{mesh_format.EXTENSION}")
+    mesh_format.write(path, problem)
+    assert mesh_format.is_mesh_file(path)
+    _assert_same_problem(mesh_format.read(path), problem)
+
+
+@pytest.mark.parametrize("name", PROBLEMS)
+def test_json_loader_matches_decode(name):
+    problem = _load(name)
+    from_json = load_problem_file(os.path.join(JSON_DIR, f"{name}.json"))
+    from_bmesh = mesh_format.decode(mesh_format.encode(problem))
+    for a, b in zip(from_json["objects"], from_bmesh["objects"]):
+        assert a["name"] == b["name"]
+        for key in ("vertices", "face_offsets", "face_indices"):
+            np.testing.assert_array_equal(a[key], b[key])
+            assert a[key].dtype == b[key].dtype
+
+
+def test_empty_and_unicode_objects():
+    problem = {
+        "objects": [
+            {"name": "Würfel", "vertices": [], "faces": []},
+            {"name": "", "vertices": [[1, 2, 3]], "faces": []},
+        ]
+    }
+    decoded = mesh_format.decode(mesh_format.encode(problem))
+    assert [obj["name"] for obj in decoded["objects"]] == ["Würfel", ""]
+    assert decoded["objects"][0]["vertices"].shape == (0, 3)
+    assert mesh_format.to_json_problem(decoded)["objects"][1]["vertices"] == [[1.0, 2.0, 3.0]]
+
+
+def test_every_truncation_is_rejected():
+    buffer = mesh_format.encode(_two_triangles())
+    for length in range(len(buffer)):
+        with pytest.raises(MeshFormatError):
+            mesh_format.decode(buffer[:length])
+
+
+def _patch_offsets(buffer: bytes, offsets) -> bytes:
+    original = struct.pack("<3I", 0, 3, 6)
+    start = buffer.index(original)
+    return buffer[:start] + struct.pack("<3I", *offsets) + buffer[start + len(original) :]
+
+
+@pytest.mark.parametrize("offsets", [(1, 3, 6), (0, 7, 6), (0, 3, 5)])
+def test_rejects_bad_face_offsets(offsets):
+    buffer = _patch_offsets(mesh_format.encode(_two_triangles()), offsets)
+    with pytest.raises(MeshFormatError, match="Inconsistent faces"):
+        mesh_format.decode(buffer)
+
+
+def test_rejects_face_index_out_of_range():
+    problem = _two_triangles()
+    problem["objects"][0]["faces"][1] = [1, 4, 2]
+    with pytest.raises(MeshFormatError, match="Inconsistent faces"):
+        mesh_format.decode(mesh_format.encode(problem))
+
+
+def test_rejects_bad_header_and_metadata():
+    buffer = mesh_format.encode(_two_triangles())
+    with pytest.raises(MeshFormatError, match="Not a .bmesh"):
+        mesh_format.decode(b"JSON" + buffer[4:])
+    with pytest.raises(MeshFormatError, match="version"):
+        mesh_format.decode(buffer[:4] + struct.pack("<I", 99) + buffer[8:])
+
+    meta_len = struct.unpack_from("<I", buffer, 8)[0]
+    for meta in (b"[" + b" " * (meta_len - 2) + b"]", b"{" * meta_len):
+        with pytest.raises(MeshFormatError, match="metadata"):
+            mesh_format.decode(buffer[:16] + meta + buffer[16 + meta_len :])
+
+
+def test_rejects_name_that_is_not_utf8():
+    buffer = bytearray(mesh_format.encode(_two_triangles()))
+    buffer[buffer.index(b"Wedge")] = 0xFF
+    with pytest.raises(MeshFormatError, match="object name"):
+        mesh_format.decode(bytes(buffer))
@@ -0,0 +1,157 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from session_store import MemorySessionStore, SessionStore, SqliteSessionStore, create_session_store
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(**kwargs):
+        if request.param == "memory":
+            return MemorySessionStore(**kwargs)
+        return SqliteSessionStore(str(tmp_path / "sessions.sqlite3"), **kwargs)
+
+    return make
+
+
+def _history(text: str) -> list:
+    return [SystemMessage(content="tutor"), HumanMessage(content=text), AIMessage(content="hint")]
+
+
+def test_put_get_delete(make_store):
+    store = make_store()
+    assert store.get("a") is None
+    store.put("a", _history("hello"))
+    messages = store.get("a")
+    assert [type(m) for m in messages] == [SystemMessage, HumanMessage, AIMessage]
+    assert messages[1].content == "hello"
+    assert len(store) == 1
+    store.delete("a")
+    assert store.get("a") is None
+    assert len(store) == 0
+
+
+def test_get_returns_a_copy(make_store):
+    store = make_store()
+    store.put("a", _history("x"))
+    store.get("a").append(HumanMessage(content="not saved"))
+    assert len(store.get("a")) == 3
+
+
+def test_sessions_expire_after_ttl(make_store):
+    store = make_store(ttl=0.05)
+    store.put("a", _history("x"))
+    time.sleep(0.1)
+    assert store.get("a") is None
+
+
+def test_least_recently_used_sessions_are_evicted(make_store, monkeypatch):
+    import session_store
+
+    # Prune the SQLite store on every write so the bound is exact
+    monkeypatch.setattr(session_store, "PRUNE_EVERY", 1)
+    store = make_store(max_sessions=3)
+    for session_id in ("a", "b", "c"):
+        store.put(session_id, _history(session_id))
+        time.sleep(0.01)
+    # Using "a" makes "b" the least recently used one
+    assert store.get("a") is not None
+    time.sleep(0.01)
+    store.put("d", _history("d"))
+
+    assert len(store) == 3
+    assert store.get("b") is None
+    assert all(store.get(session_id) is not None for session_id in ("a", "c", "d"))
+
+
+def test_a_held_session_does_not_block_other_sessions(make_store):
+    store = make_store()
+    holding = threading.Event()
+    release = threading.Event()
+
+    def hold_a():
+        with store.locked("a"):
+            holding.set()
+            # Stands in for a slow LLM call on session "a"
+            release.wait(5)
+
+    holder = threading.Thread(target=hold_a)
+    holder.start()
+    assert holding.wait(5)
+    try:
+        started = time.perf_counter()
+        with store.locked("b"):
+            store.put("b", _history("b"))
+            assert store.get("b") is not None
+        assert time.perf_counter() - started < 1.0
+    finally:
+        release.set()
+        holder.join()
+
+
+def test_the_same_session_is_serialised(make_store):
+    store = make_store()
+    store.put("shared", [])
+
+    def add_turn(i):
+        with store.locked("shared"):
+            history = store.get("shared")
+            history.append(HumanMessage(content=str(i)))
+            store.put("shared", history)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(add_turn, range(200)))
+    assert len(store.get("shared")) == 200
+
+
+def test_load_thousands_of_concurrent_sessions(make_store):
+    """Many threads run read-modify-write turns on thousands of sessions at once."""
+    store = make_store(max_sessions=10_000)
+    session_count = 3000
+    turns = 3
+
+    def conversation(i):
+        session_id = f"session-{i}"
+        for turn in range(turns):
+            with store.locked(session_id):
+                history = store.get(session_id) or [SystemMessage(content="tutor")]
+                history.append(HumanMessage(content=f"{i}:{turn}"))
+                store.put(session_id, history)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=64) as pool:
+        list(pool.map(conversation, range(session_count)))
+    seconds = time.perf_counter() - started
+
+    assert len(store) == session_count
+    for i in (0, 1234, session_count - 1):
+        history = store.get(f"session-{i}")
+        assert [m.content for m in history[1:]] == [f"{i}:{turn}" for turn in range(turns)]
+    # Per-session locks are dropped once nobody holds them
+    assert store._locks == {}
+    print(f"{type(store).__name__}: {session_count * turns / seconds:,.0f} turns/s")
+
+
+def test_store_interface_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+    class Incomplete(SessionStore):
+        def get(self, session_id):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_create_session_store(tmp_path):
+    assert isinstance(create_session_store("memory", ""), MemorySessionStore)
+    assert isinstance(
+        create_session_store("sqlite", str(tmp_path / "s.sqlite3")), SqliteSessionStore
+    )
+    with pytest.raises(ValueError):
+        create_session_store("redis", "")
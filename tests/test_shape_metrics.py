@@ -0,0 +1,156 @@
+import numpy as np
+import pytest
+
+import matching
+from matching import BlenderPointTree, PointTree
+from shape_metrics import ERROR_BINS, compare_shapes, format_shape_metrics, shape_accuracy
+
+
+def _brute_force(points, queries):
+    if not len(points):
+        return np.full(len(queries), np.inf)
+    diff = queries[:, None, :] - points[None, :, :]
+    return np.sqrt((diff**2).sum(axis=2)).min(axis=1)
+
+
+def _sphere(count, seed, radius=1.0):
+    points = np.random.default_rng(seed).normal(size=(count, 3))
+    return radius * points / np.linalg.norm(points, axis=1, keepdims=True)
+
+
+class _FakeKDTree:
+    """Stand-in for mathutils.kdtree.KDTree with the same calls, done by brute force."""
+
+    def __init__(self, size):
+        self.size = size
+        self.points = {}
+        self.balanced = False
+
+    def insert(self, co, index):
+        assert not self.balanced and len(co) == 3
+        self.points[index] = co
+
+    def balance(self):
+        assert len(self.points) == self.size
+        self.balanced = True
+
+    def find(self, co):
+        assert self.balanced
+        indices = list(self.points)
+        distances = _brute_force(np.array([self.points[i] for i in indices]), np.array([co]))
+        best = int(np.argmin(distances))
+        return self.points[indices[best]], indices[best], float(distances[best])
+
+
+class _FakeKDTreeModule:
+    KDTree = _FakeKDTree
+
+
+@pytest.mark.parametrize(
+    "point_count, query_count",
+    [(0, 5), (1, 7), (16, 3), (17, 40), (1000, 500), (3000, 2000)],
+)
+def test_point_tree_matches_brute_force(point_count, query_count):
+    rng = np.random.default_rng(point_count)
+    points = rng.normal(size=(point_count, 3))
+    queries = rng.normal(size=(query_count, 3)) * 2
+    tree = PointTree(points)
+    assert len(tree) == point_count
+    np.testing.assert_allclose(
+        tree.nearest_distances(queries), _brute_force(points, queries), rtol=0, atol=1e-12
+    )
+
+
+def test_point_tree_on_surfaces_and_duplicates():
+    points = np.vstack([_sphere(2000, 0), np.zeros((50, 3)), np.ones((50, 3))])
+    queries = np.vstack([_sphere(1500, 1, radius=1.05), _sphere(100, 2, radius=4.0) + [3, 0, 0]])
+    np.testing.assert_allclose(
+        PointTree(points, leaf_size=4).nearest_distances(queries),
+        _brute_force(points, queries),
+        rtol=0,
+        atol=1e-12,
+    )
+
+
+def test_point_tree_query_blocks(monkeypatch):
+    monkeypatch.setattr(matching, "QUERY_BLOCK", 7)
+    points = _sphere(500, 3)
+    queries = _sphere(100, 4, radius=1.2)
+    np.testing.assert_allclose(
+        PointTree(points).nearest_distances(queries), _brute_force(points, queries), atol=1e-12
+    )
+
+
+def test_blender_point_tree_wraps_kdtree(monkeypatch):
+    monkeypatch.setattr(matching, "_kdtree", _FakeKDTreeModule)
+    points = _sphere(200, 5)
+    queries = _sphere(50, 6, radius=1.3)
+    tree = matching.point_tree(points)
+    assert isinstance(tree, BlenderPointTree)
+    assert len(tree) == 200
+    np.testing.assert_allclose(tree.nearest_distances(queries), _brute_force(points, queries))
+    assert np.all(np.isinf(matching.point_tree(np.empty((0, 3))).nearest_distances(queries)))
+
+
+def test_point_tree_falls_back_without_mathutils(monkeypatch):
+    monkeypatch.setattr(matching, "_kdtree", None)
+    assert isinstance(matching.point_tree(_sphere(10, 7)), PointTree)
+
+
+def test_identical_shapes():
+    points = _sphere(300, 8)
+    metrics = compare_shapes(points, points[::-1], 0.1)
+    assert metrics["hausdorff"] == 0.0
+    assert metrics["chamfer"] == 0.0
+    assert shape_accuracy(metrics) == 1.0
+    assert metrics["target_to_user"]["histogram"][0] == 300
+
+
+def test_both_directions_are_measured():
+    target = _sphere(400, 9)
+    # Half the target is missing and there is stray geometry far away
+    user = np.vstack([target[target[:, 2] > 0], [[5.0, 0.0, 0.0]]])
+    metrics = compare_shapes(target, user, 0.1)
+
+    forward = _brute_force(user, target)
+    backward = _brute_force(target, user)
+    assert metrics["hausdorff"] == pytest.approx(max(forward.max(), backward.max()))
+    assert metrics["chamfer"] == pytest.approx(forward.mean() + backward.mean())
+    assert metrics["target_to_user"]["within_tolerance"] == pytest.approx(np.mean(forward <= 0.1))
+    assert metrics["user_to_target"]["max"] == pytest.approx(backward.max())
+    assert metrics["user_to_target"]["max"] > 3.9
+
+    histogram, _ = np.histogram(backward / 0.1, bins=ERROR_BINS)
+    assert metrics["user_to_target"]["histogram"] == histogram.tolist()
+    assert sum(metrics["target_to_user"]["histogram"]) == len(target)
+
+
+def test_prebuilt_target_tree_gives_the_same_metrics():
+    target = _sphere(500, 10)
+    user = _sphere(400, 11, radius=1.02)
+    assert compare_shapes(target, user, 0.1, target_tree=PointTree(target)) == compare_shapes(
+        target, user, 0.1
+    )
+
+
+def test_accuracy_falls_with_distance():
+    target = _sphere(200, 12)
+    accuracies = [
+        shape_accuracy(compare_shapes(target, target + [offset, 0, 0], 0.1))
+        for offset in (0.0, 0.05, 0.2, 3.0)
+    ]
+    assert accuracies[0] == 1.0
+    assert accuracies == sorted(accuracies, reverse=True)
+    assert accuracies[-1] == 0.0
+
+
+def test_empty_user_mesh():
+    metrics = compare_shapes(_sphere(20, 13), np.empty((0, 3)), 0.1)
+    assert metrics["hausdorff"] == np.inf
+    assert shape_accuracy(metrics) == 0.0
+    assert "Hausdorff inf" in format_shape_metrics(metrics)
+
+
+def test_rejects_non_positive_tolerance():
+    with pytest.raises(ValueError):
+        compare_shapes(np.zeros((1, 3)), np.zeros((1, 3)), 0)
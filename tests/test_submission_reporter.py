@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from submission_reporter import SubmissionReporter
+
+
+class _SubmitAPI(BaseHTTPRequestHandler):
+    """Answers each POST with the next status in `server.statuses` (then 200)."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        with server.lock:
+            status = server.statuses.pop(0) if server.statuses else 200
+            server.posts.append((self.headers.get("Idempotency-Key"), body, status))
+        payload = b"{}"
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SubmitAPI)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.statuses = []
+    server.posts = []
+    server.url = f"http://127.0.0.1:{server.server_port}/api/submit"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_reporter(tmp_path):
+    reporters = []
+
+    def make(url, **kwargs):
+        options = {"timeout": (0.5, 1.0), "backoff": 0.01, "replay_interval": 0.2, **kwargs}
+        reporter = SubmissionReporter(url, str(tmp_path / "spool"), **options)
+        reporters.append(reporter)
+        return reporter
+
+    yield make
+    for reporter in reporters:
+        reporter.stop(timeout=5)
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out waiting")
+        time.sleep(0.01)
+
+
+def test_delivers_and_empties_spool(api, make_reporter):
+    reporter = make_reporter(api.url)
+    reporter.start()
+    reporter.submit({"questionName": "cube", "score": 90})
+    _wait_for(lambda: reporter.sent == 1)
+    key, body, status = api.posts[0]
+    assert body == {"questionName": "cube", "score": 90}
+    assert key and status == 200
+    assert reporter.spooled() == []
+
+
+def test_submit_spools_without_a_worker(api, make_reporter):
+    reporter = make_reporter(api.url)
+    reporter.submit({"score": 1})
+    assert len(reporter.spooled()) == 1
+    assert api.posts == []
+
+
+def test_retries_server_errors_with_the_same_key(api, make_reporter):
+    api.statuses = [503, 500, 429]
+    reporter = make_reporter(api.url, retries=3)
+    reporter.start()
+    reporter.submit({"score": 5})
+    _wait_for(lambda: reporter.sent == 1)
+    assert [status for _, _, status in api.posts] == [503, 500, 429, 200]
+    assert len({key for key, _, _ in api.posts}) == 1
+    assert reporter.stats() == {"sent": 1, "failed_attempts": 3, "dropped": 0, "spooled": 0}
+
+
+def test_client_error_is_dropped_not_retried(api, make_reporter):
+    api.statuses = [400]
+    reporter = make_reporter(api.url)
+    reporter.start()
+    reporter.submit({"score": "bad"})
+    _wait_for(lambda: reporter.dropped == 1)
+    assert len(api.posts) == 1
+    assert reporter.spooled() == []
+
+
+def test_keeps_spool_while_api_is_down_and_replays(api, make_reporter):
+    api.statuses = [503] * 3
+    reporter = make_reporter(api.url, retries=2)
+    reporter.start()
+    reporter.submit({"score": 7})
+    _wait_for(lambda: len(api.posts) == 3)
+    assert len(reporter.spooled()) == 1
+
+    # Back up: the next replay delivers it with the key it had before
+    _wait_for(lambda: reporter.sent == 1)
+    assert [status for _, _, status in api.posts] == [503, 503, 503, 200]
+    assert len({key for key, _, _ in api.posts}) == 1
+    assert reporter.spooled() == []
+
+
+def test_replays_spool_left_by_an_earlier_run(api, make_reporter, tmp_path):
+    # Nothing listens on port 9 of localhost
+    offline = make_reporter("http://127.0.0.1:9/api/submit", retries=0)
+    offline.start()
+    for score in range(3):
+        offline.submit({"score": score})
+    _wait_for(lambda: offline.failed_attempts >= 1)
+    offline.stop(timeout=5)
+    assert len(offline.spooled()) == 3
+
+    reporter = make_reporter(api.url)
+    reporter.start()
+    _wait_for(lambda: reporter.sent == 3)
+    # Oldest first
+    assert [body["score"] for _, body, _ in api.posts] == [0, 1, 2]
+    assert not os.listdir(tmp_path / "spool")
+
+
+def test_unreadable_spool_file_is_dropped(api, make_reporter, tmp_path):
+    reporter = make_reporter(api.url)
+    (tmp_path / "spool" / "00000000000000000001-broken.json").write_text("{not json")
+    reporter.start()
+    _wait_for(lambda: reporter.dropped == 1)
+    assert api.posts == []
+    assert reporter.spooled() == []
+
+
+def test_restart_runs_one_worker(api, make_reporter):
+    reporter = make_reporter(api.url)
+    reporter.start()
+    reporter.stop(timeout=5)
+    reporter.start()
+    reporter.start()
+    for score in range(5):
+        reporter.submit({"score": score})
+    _wait_for(lambda: reporter.sent == 5)
+    workers = [t for t in threading.enumerate() if t.name == "submission-reporter"]
+    assert len(workers) == 1
+    assert len(api.posts) == 5